@@ -8,11 +8,13 @@ from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, Awaitable, Coroutine, Dict
 from enum import Enum
+import threading
+import time
 import uuid
 import models
 
 from python.helpers import extract_tools, files, errors, history, tokens
-from python.helpers import dirty_json
+from python.helpers import dirty_json, change_feed
 from python.helpers.print_style import PrintStyle
 from python.helpers.errors import SilentResponseException
 from langchain_core.prompts import (
@@ -21,7 +23,7 @@ from langchain_core.prompts import (
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
 
 import python.helpers.log as Log
-from python.helpers.dirty_json import DirtyJson
+from python.helpers.dirty_json import DirtyJsonStream
 from python.helpers.defer import DeferredTask
 from typing import Callable
 from python.helpers.localization import Localization
@@ -36,6 +38,11 @@ class AgentContextType(Enum):
 class AgentContext:
 
     _contexts: dict[str, "AgentContext"] = {}
+    # saved contexts that are not loaded yet, id -> chat index entry
+    _unloaded: dict[str, dict] = {}
+    # loads a saved context by id, set by persist_chat
+    _loader: "Callable[[str], AgentContext | None] | None" = None
+    _load_lock = threading.RLock()
     _counter: int = 0
 
     def __init__(
@@ -62,37 +69,116 @@ class AgentContext:
         self.task: DeferredTask | None = None
         self.created_at = created_at or datetime.now(timezone.utc)
         self.type = type
-        AgentContext._counter += 1
-        self.no = AgentContext._counter
+        # a lazily loaded context keeps its place in the chat list
+        entry = AgentContext._unloaded.pop(self.id, None)
+        if entry:
+            self.no = entry["no"]
+        else:
+            AgentContext._counter += 1
+            self.no = AgentContext._counter
         # set to start of unix epoch
         self.last_message = last_message or datetime.now(timezone.utc)
+        self.last_access = time.monotonic()
 
         existing = self._contexts.get(self.id, None)
         if existing:
             AgentContext.remove(self.id)
         self._contexts[self.id] = self
+        change_feed.notify("contexts")
 
     @staticmethod
     def get(id: str):
-        return AgentContext._contexts.get(id, None)
+        context = AgentContext._contexts.get(id, None)
+        if context is None and id in AgentContext._unloaded:
+            context = AgentContext._load(id)
+        if context:
+            context.last_access = time.monotonic()
+        return context
 
     @staticmethod
     def first():
-        if not AgentContext._contexts:
-            return None
-        return list(AgentContext._contexts.values())[0]
+        if AgentContext._contexts:
+            return list(AgentContext._contexts.values())[0]
+        for id in list(AgentContext._unloaded):
+            context = AgentContext.get(id)
+            if context:
+                return context
+        return None
 
     @staticmethod
     def all():
+        """Loaded contexts, see get_unloaded for saved ones not loaded yet."""
         return list(AgentContext._contexts.values())
 
+    @staticmethod
+    def get_unloaded() -> list[dict]:
+        return list(AgentContext._unloaded.values())
+
+    @staticmethod
+    def add_unloaded(entry: dict):
+        """Register a saved context to be loaded on first access, entry holds
+        id, name, created_at, last_message and type as in the chat index."""
+        if entry["id"] in AgentContext._contexts:
+            AgentContext.remove(entry["id"])
+        AgentContext._counter += 1
+        AgentContext._unloaded[entry["id"]] = {**entry, "no": AgentContext._counter}
+        change_feed.notify("contexts")
+
+    @staticmethod
+    def unload(id: str, entry: dict):
+        """Drop a loaded context from memory, it is loaded again on next access."""
+        with AgentContext._load_lock:
+            context = AgentContext._contexts.pop(id, None)
+            if context:
+                AgentContext._unloaded[id] = {**entry, "no": context.no}
+        change_feed.notify("contexts")
+        return context
+
+    @staticmethod
+    def _load(id: str):
+        with AgentContext._load_lock:
+            context = AgentContext._contexts.get(id, None)
+            if context or id not in AgentContext._unloaded or not AgentContext._loader:
+                return context
+            try:
+                context = AgentContext._loader(id)
+            except Exception as e:
+                PrintStyle.error(f"Error loading chat {id}: {errors.error_text(e)}")
+                context = None
+            if context is None:
+                AgentContext._unloaded.pop(id, None)
+                change_feed.notify("contexts")
+            return context
+
     @staticmethod
     def remove(id: str):
         context = AgentContext._contexts.pop(id, None)
+        AgentContext._unloaded.pop(id, None)
         if context and context.task:
             context.task.kill()
+        change_feed.notify("contexts")
         return context
 
+    @staticmethod
+    def serialize_unloaded(entry: dict):
+        """Same fields as serialize() for a context that is not loaded."""
+        return {
+            "id": entry["id"],
+            "name": entry.get("name"),
+            "created_at": Localization.get().serialize_datetime(
+                datetime.fromisoformat(entry["created_at"])
+            ),
+            "no": entry["no"],
+            "log_guid": entry.get("log_guid", ""),
+            "log_version": 0,
+            "log_length": entry.get("log_length", 0),
+            "paused": False,
+            "last_message": Localization.get().serialize_datetime(
+                datetime.fromisoformat(entry["last_message"])
+            ),
+            "type": entry.get("type", AgentContextType.USER.value),
+        }
+
     def serialize(self):
         return {
             "id": self.id,
@@ -278,6 +364,7 @@ class Agent:
     DATA_NAME_SUPERIOR = "_superior"
     DATA_NAME_SUBORDINATE = "_subordinate"
     DATA_NAME_CTX_WINDOW = "ctx_window"
+    DATA_NAME_CTX_WINDOW_PROMPT = "_ctx_window_prompt"
 
     def __init__(
         self, number: int, config: AgentConfig, context: AgentContext | None = None
@@ -295,6 +382,7 @@ class Agent:
         self.agent_name = "Aria" if self.number == 0 else f"A{self.number}"
 
         self.history = history.History(self)
+        self.prompt_cache = history.LangchainOutputCache()
         self.last_user_message: history.Message | None = None
         self.intervention: UserMessage | None = None
         self.data = {}  # free data object all the tools can use
@@ -449,8 +537,8 @@ class Agent:
         ).output()
         loop_data.extras_temporary.clear()
 
-        # convert history + extras to LLM format
-        history_langchain: list[BaseMessage] = history.output_langchain(
+        # convert history + extras to LLM format, only messages new since last iteration are converted
+        history_langchain, history_tokens = self.prompt_cache.convert(
             loop_data.history_output + extras
         )
 
@@ -459,14 +547,14 @@ class Agent:
             SystemMessage(content=system_text),
             *history_langchain,
         ]
-        full_text = ChatPromptTemplate.from_messages(full_prompt).format()
 
-        # store as last context window content
+        # store as last context window content, text is rendered when requested,
+        # the messages themselves are not persisted with the chat
+        self.set_data(Agent.DATA_NAME_CTX_WINDOW_PROMPT, full_prompt)
         self.set_data(
             Agent.DATA_NAME_CTX_WINDOW,
             {
-                "text": full_text,
-                "tokens": tokens.approximate_tokens(full_text),
+                "tokens": self.prompt_cache.count_tokens(system_text) + history_tokens,
             },
         )
 
@@ -864,13 +952,23 @@ class Agent:
         try:
             if len(stream) < 25:
                 return  # no reason to try
-            response = DirtyJson.parse_string(stream)
-            if isinstance(response, dict):
+            # parse only the new part of the stream, the parser keeps its state
+            parser = self.loop_data.params_temporary.get("response_parser")
+            if parser is None or parser.length > len(stream):
+                parser = DirtyJsonStream()
+                self.loop_data.params_temporary["response_parser"] = parser
+            parser.push(stream[parser.length :])
+            if isinstance(parser.root, dict):
+                # parsed holds the completed values, the value still streaming
+                # is described by partial (its path) and delta (its new text)
                 await self.call_extensions(
                     "response_stream",
                     loop_data=self.loop_data,
                     text=stream,
-                    parsed=response,
+                    parsed=parser.root,
+                    completed=parser.completed,
+                    partial=parser.partial,
+                    delta=parser.delta,
                 )
 
         except Exception as e:
@@ -880,48 +978,14 @@ class Agent:
         self, name: str, method: str | None, args: dict, message: str, loop_data: LoopData | None, **kwargs
     ):
         from python.tools.unknown import Unknown
-        from python.helpers.tool import Tool
-        import re
-
-        def normalize_tool_name(tool_name: str) -> str:
-            """Convert various tool name formats to snake_case."""
-            tool_name = tool_name.strip()
-            tool_name = re.sub(r"(?<!^)(?=[A-Z])", "_", tool_name)
-            tool_name = re.sub(r"[^\w]", "_", tool_name)
-            return tool_name.lower()
+        from python.helpers import tool_registry
 
-        normalized_name = normalize_tool_name(name)
-
-        classes = []
-
-        # try agent tools first
-        if self.config.profile:
-            try:
-                classes = extract_tools.load_classes_from_file(
-                    f"agents/{self.config.profile}/tools/{normalized_name}.py", Tool
-                )
-            except Exception:
-                pass
-
-        # try default tools
-        if not classes:
-            try:
-                classes = extract_tools.load_classes_from_file(
-                    f"python/tools/{normalized_name}.py", Tool
-                )
-            except Exception:
-                pass
-
-        # try screenwriting tools
-        if not classes:
-            try:
-                classes = extract_tools.load_classes_from_file(
-                    f"agents/screenwriting/tools/{normalized_name}.py", Tool
-                )
-            except Exception:
-                pass
-
-        tool_class = classes[0] if classes else Unknown
+        # profile tools first, then default and shared tools
+        normalized_name = tool_registry.normalize_tool_name(name)
+        tool_class = tool_registry.get_registry().get(
+            normalized_name, self.config.profile
+        )
+        tool_class = tool_class or Unknown
         return tool_class(
             agent=self, name=normalized_name, method=method, args=args, message=message, loop_data=loop_data, **kwargs
         )
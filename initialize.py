@@ -148,6 +148,12 @@ def initialize_job_loop():
     from python.helpers.job_loop import run_loop
     return defer.DeferredTask("JobLoop").start_task(run_loop)
 
+def initialize_tools():
+    from python.helpers import tool_registry
+    async def initialize_tools_async():
+        tool_registry.initialize()
+    return defer.DeferredTask().start_task(initialize_tools_async)
+
 def initialize_preload():
     import preload
     return defer.DeferredTask().start_task(preload.preload)
@@ -1,5 +1,7 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
+import asyncio
 import logging
 import os
 from typing import (
@@ -14,7 +16,7 @@ from typing import (
     TypedDict,
 )
 
-from litellm import completion, acompletion, embedding
+from litellm import completion, acompletion, embedding, aembedding
 import litellm
 
 from python.helpers import dotenv
@@ -341,6 +343,9 @@ class BrowserCompatibleChatWrapper(LiteLLMChatWrapper):
 class LiteLLMEmbeddingWrapper(Embeddings):
     model_name: str
     kwargs: dict = {}
+    # inputs per request and parallel requests used by EmbeddingScheduler
+    batch_size: int = 128
+    concurrency: int = 4
 
     def __init__(self, model: str, provider: str, **kwargs: Any):
         self.model_name = f"{provider}/{model}" if provider != "openai" else model
@@ -348,15 +353,33 @@ class LiteLLMEmbeddingWrapper(Embeddings):
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         resp = embedding(model=self.model_name, input=texts, **self.kwargs)
-        return [
-            item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
-            for item in resp.data  # type: ignore
-        ]
+        return _parse_embeddings(resp)
 
     def embed_query(self, text: str) -> List[float]:
         resp = embedding(model=self.model_name, input=[text], **self.kwargs)
-        item = resp.data[0]  # type: ignore
-        return item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
+        return _parse_embeddings(resp)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        resp = await aembedding(model=self.model_name, input=texts, **self.kwargs)
+        return _parse_embeddings(resp)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        resp = await aembedding(model=self.model_name, input=[text], **self.kwargs)
+        return _parse_embeddings(resp)[0]
+
+
+def _parse_embeddings(resp: Any) -> List[List[float]]:
+    return [
+        item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
+        for item in resp.data  # type: ignore
+    ]
+
+
+# shared worker pool for local embedding models, encode releases the GIL
+LOCAL_EMBEDDING_WORKERS = min(4, os.cpu_count() or 1)
+_local_embedding_executor = ThreadPoolExecutor(
+    max_workers=LOCAL_EMBEDDING_WORKERS, thread_name_prefix="LocalEmbeddings"
+)
 
 
 class LocalSentenceTransformerWrapper(Embeddings):
@@ -375,6 +398,8 @@ class LocalSentenceTransformerWrapper(Embeddings):
 
         self.model = SentenceTransformer(model, **kwargs)
         self.model_name = model
+        self.batch_size = 64
+        self.concurrency = LOCAL_EMBEDDING_WORKERS
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         embeddings = self.model.encode(texts, convert_to_tensor=False)  # type: ignore
@@ -387,6 +412,18 @@ class LocalSentenceTransformerWrapper(Embeddings):
         )
         return result  # type: ignore
 
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _local_embedding_executor, self.embed_documents, texts
+        )
+
+    async def aembed_query(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _local_embedding_executor, self.embed_query, text
+        )
+
 
 def _get_litellm_chat(
     cls: type = LiteLLMChatWrapper,
@@ -1,6 +1,7 @@
 from python.helpers.api import ApiHandler, Input, Output, Request, Response
 
-from python.helpers import tokens
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
 
 
 class GetCtxWindow(ApiHandler):
@@ -12,7 +13,17 @@ class GetCtxWindow(ApiHandler):
         if not window or not isinstance(window, dict):
             return {"content": "", "tokens": 0}
 
-        text = window["text"]
-        tokens = window["tokens"]
+        text = window.get("text")
+        if text is None:
+            # full text is only rendered when the window is viewed, the prompt
+            # is not persisted so it is missing in restored chats
+            prompt = agent.get_data(agent.DATA_NAME_CTX_WINDOW_PROMPT)
+            if not isinstance(prompt, list) or not all(
+                isinstance(message, BaseMessage) for message in prompt
+            ):
+                return {"content": "", "tokens": 0}
+            text = ChatPromptTemplate.from_messages(prompt).format()
+            window["text"] = text
+        tokens = window.get("tokens", 0)
 
         return {"content": text, "tokens": tokens}
@@ -1,13 +1,31 @@
+import asyncio
+import threading
+import time
+import uuid
+
 from python.helpers.api import ApiHandler, Request, Response
 
 from agents import AgentContext
 
-from python.helpers import persist_chat
+from python.helpers import persist_chat, change_feed
 from python.helpers.task_scheduler import TaskScheduler
 from python.helpers.localization import Localization
 from python.helpers.dotenv import get_dotenv_value
 
 
+# longest time a long-poll request may block
+MAX_WAIT = 30.0
+# context changes that do not notify (pause, rename) are noticed within this interval
+CHECK_INTERVAL = 1.0
+
+_lists_lock = threading.Lock()
+_lists_stamp: tuple | None = None
+_lists_version = 0
+# versions from before a restart must not match the restarted counter
+_boot_id = uuid.uuid4().hex[:8]
+_lists: tuple[list, list] = ([], [])
+
+
 class Poll(ApiHandler):
 
     async def process(self, input: dict, request: Request) -> dict | Response:
@@ -21,85 +39,146 @@ class Poll(ApiHandler):
         # context instance - get or create
         context = self.get_context(ctxid)
 
-        logs = context.log.output(start=from_no)
-
-        # loop AgentContext._contexts
-
-        # Get a task scheduler instance
-        scheduler = TaskScheduler.get()
-
-        # Always reload the scheduler on each poll to ensure we have the latest task state
-        # await scheduler.reload() # does not seem to be needed
-
-        # loop AgentContext._contexts and divide into contexts and tasks
+        # versions the client already has, contexts are only sent when changed
+        log_state = input.get("log_state")
+        contexts_version = input.get("contexts_version")
 
-        ctxs = []
-        tasks = []
-        processed_contexts = set()  # Track processed context IDs
+        # long-poll: block until this log or the context list changes
+        wait = min(float(input.get("wait") or 0), MAX_WAIT)
+        if wait > 0 and log_state is not None:
+            await self.wait_for_changes(context, log_state, contexts_version, wait)
 
-        all_ctxs = list(AgentContext._contexts.values())
-        # First, identify all tasks
-        for ctx in all_ctxs:
-            # Skip if already processed
-            if ctx.id in processed_contexts:
-                continue
-
-            # Create the base context data that will be returned
-            context_data = ctx.serialize()
-
-            context_task = scheduler.get_task_by_uuid(ctx.id)
-            # Determine if this is a task-dedicated context by checking if a task with this UUID exists
-            is_task_context = (
-                context_task is not None and context_task.context_id == ctx.id
-            )
-
-            if not is_task_context:
-                ctxs.append(context_data)
-            else:
-                # If this is a task, get task details from the scheduler
-                task_details = scheduler.serialize_task(ctx.id)
-                if task_details:
-                    # Add task details to context_data with the same field names
-                    # as used in scheduler endpoints to maintain UI compatibility
-                    context_data.update({
-                        "task_name": task_details.get("name"), # name is for context, task_name for the task name
-                        "uuid": task_details.get("uuid"),
-                        "state": task_details.get("state"),
-                        "type": task_details.get("type"),
-                        "system_prompt": task_details.get("system_prompt"),
-                        "prompt": task_details.get("prompt"),
-                        "last_run": task_details.get("last_run"),
-                        "last_result": task_details.get("last_result"),
-                        "attachments": task_details.get("attachments", []),
-                        "context_id": task_details.get("context_id"),
-                    })
-
-                    # Add type-specific fields
-                    if task_details.get("type") == "scheduled":
-                        context_data["schedule"] = task_details.get("schedule")
-                    elif task_details.get("type") == "planned":
-                        context_data["plan"] = task_details.get("plan")
-                    else:
-                        context_data["token"] = task_details.get("token")
-
-                tasks.append(context_data)
-
-            # Mark as processed
-            processed_contexts.add(ctx.id)
-
-        # Sort tasks and chats by their creation date, descending
-        ctxs.sort(key=lambda x: x["created_at"], reverse=True)
-        tasks.sort(key=lambda x: x["created_at"], reverse=True)
+        logs = context.log.output(start=from_no)
+        version, (ctxs, tasks) = get_context_lists()
 
         # data from this server
-        return {
+        response = {
             "context": context.id,
-            "contexts": ctxs,
-            "tasks": tasks,
             "logs": logs,
             "log_guid": context.log.guid,
             "log_version": len(context.log.updates),
+            "log_state": context.log.version,
             "log_progress": context.log.progress,
             "log_progress_active": context.log.progress_active,
             "paused": context.paused,
+            "contexts_version": version,
         }
+        if contexts_version != version:
+            response["contexts"] = ctxs
+            response["tasks"] = tasks
+        return response
+
+    async def wait_for_changes(
+        self, context: AgentContext, log_state: int, contexts_version: str | None, wait: float
+    ):
+        deadline = time.monotonic() + wait
+        seen = change_feed.get_version()
+        while context.log.version == log_state and (
+            contexts_version is None or get_context_lists()[0] == contexts_version
+        ):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            seen = await asyncio.to_thread(
+                change_feed.wait, seen, min(remaining, CHECK_INTERVAL)
+            )
+
+
+def get_context_lists() -> tuple[str, tuple[list, list]]:
+    """Serialized chats and tasks with their version, rebuilt only when a
+    context, its log, the scheduled tasks or the timezone changed."""
+    global _lists_stamp, _lists_version, _lists
+    contexts = AgentContext.all()
+    unloaded = AgentContext.get_unloaded()
+    stamp = (
+        Localization.get().get_timezone(),
+        change_feed.get_version("tasks"),
+        tuple(entry["id"] for entry in unloaded),
+        tuple(
+            (
+                ctx.id,
+                ctx.name,
+                ctx.paused,
+                ctx.last_message,
+                ctx.type,
+                ctx.log.guid,
+                len(ctx.log.logs),
+                len(ctx.log.updates),
+            )
+            for ctx in contexts
+        ),
+    )
+    with _lists_lock:
+        if stamp != _lists_stamp:
+            _lists = _serialize_contexts(contexts, unloaded)
+            _lists_stamp = stamp
+            _lists_version += 1
+        return f"{_boot_id}-{_lists_version}", _lists
+
+
+def _serialize_contexts(all_ctxs: list[AgentContext], unloaded: list[dict]) -> tuple[list, list]:
+    # Get a task scheduler instance
+    scheduler = TaskScheduler.get()
+
+    # loop AgentContext._contexts and divide into contexts and tasks
+
+    ctxs = []
+    tasks = []
+    processed_contexts = set()  # Track processed context IDs
+
+    # saved contexts that are not loaded are listed from the chat index
+    all_data = [ctx.serialize() for ctx in all_ctxs] + [
+        AgentContext.serialize_unloaded(entry) for entry in unloaded
+    ]
+
+    # First, identify all tasks
+    for context_data in all_data:
+        ctx_id = context_data["id"]
+        # Skip if already processed
+        if ctx_id in processed_contexts:
+            continue
+
+        context_task = scheduler.get_task_by_uuid(ctx_id)
+        # Determine if this is a task-dedicated context by checking if a task with this UUID exists
+        is_task_context = (
+            context_task is not None and context_task.context_id == ctx_id
+        )
+
+        if not is_task_context:
+            ctxs.append(context_data)
+        else:
+            # If this is a task, get task details from the scheduler
+            task_details = scheduler.serialize_task(ctx_id)
+            if task_details:
+                # Add task details to context_data with the same field names
+                # as used in scheduler endpoints to maintain UI compatibility
+                context_data.update({
+                    "task_name": task_details.get("name"), # name is for context, task_name for the task name
+                    "uuid": task_details.get("uuid"),
+                    "state": task_details.get("state"),
+                    "type": task_details.get("type"),
+                    "system_prompt": task_details.get("system_prompt"),
+                    "prompt": task_details.get("prompt"),
+                    "last_run": task_details.get("last_run"),
+                    "last_result": task_details.get("last_result"),
+                    "attachments": task_details.get("attachments", []),
+                    "context_id": task_details.get("context_id"),
+                })
+
+                # Add type-specific fields
+                if task_details.get("type") == "scheduled":
+                    context_data["schedule"] = task_details.get("schedule")
+                elif task_details.get("type") == "planned":
+                    context_data["plan"] = task_details.get("plan")
+                else:
+                    context_data["token"] = task_details.get("token")
+
+            tasks.append(context_data)
+
+        # Mark as processed
+        processed_contexts.add(ctx_id)
+
+    # Sort tasks and chats by their creation date, descending
+    ctxs.sort(key=lambda x: x["created_at"], reverse=True)
+    tasks.sort(key=lambda x: x["created_at"], reverse=True)
+    return ctxs, tasks
@@ -5,4 +5,5 @@ from python.helpers import persist_chat
 
 class SaveChat(Extension):
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
-        persist_chat.save_tmp_chat(self.agent.context)
\ No newline at end of file
+        # debounced, consecutive iterations are saved together in the background
+        persist_chat.save_tmp_chat_later(self.agent.context)
\ No newline at end of file
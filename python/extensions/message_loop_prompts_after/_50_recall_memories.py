@@ -10,6 +10,8 @@ DATA_NAME_TASK = "_recall_memories_task"
 
 class RecallMemories(Extension):
 
+    CONCURRENT = True
+
     # INTERVAL = 3
     # HISTORY = 10000
     # MEMORIES_MAX_SEARCH = 12
@@ -5,6 +5,8 @@ from python.helpers.localization import Localization
 
 
 class IncludeCurrentDatetime(Extension):
+    CONCURRENT = True
+
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
         # get current datetime
         current_datetime = Localization.get().utc_dt_to_localtime_str(
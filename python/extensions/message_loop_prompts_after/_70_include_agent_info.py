@@ -2,6 +2,8 @@ from python.helpers.extension import Extension
 from agents import LoopData
 
 class IncludeAgentInfo(Extension):
+    CONCURRENT = True
+
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
         
         # read prompt
@@ -5,6 +5,9 @@ from python.extensions.message_loop_prompts_after._50_recall_memories import DAT
 
 
 class RecallWait(Extension):
+    CONCURRENT = True
+    DEPENDS_ON = ("_50_recall_memories",)
+
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
 
             task = self.agent.get_data(DATA_NAME_TASK_MEMORIES)
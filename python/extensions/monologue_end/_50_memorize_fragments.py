@@ -1,7 +1,7 @@
 import asyncio
 from python.helpers import settings
 from python.helpers.extension import Extension
-from python.helpers.memory import Memory
+from python.helpers.memory import Memory, get_history_to_memorize, set_memorized
 from python.helpers.dirty_json import DirtyJson
 from agents import LoopData
 from python.helpers.log import LogItem
@@ -10,6 +10,8 @@ from python.tools.memory_load import DEFAULT_THRESHOLD as DEFAULT_MEMORY_THRESHO
 
 class MemorizeMemories(Extension):
 
+    CONCURRENT = True
+
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
         # try:
 
@@ -18,6 +20,11 @@ class MemorizeMemories(Extension):
         if not set["memory_memorize_enabled"]:
             return
 
+        # only messages added since the last memorization are summarized
+        msgs_text, last_no = get_history_to_memorize(self.agent, "fragments")
+        if not msgs_text:
+            return
+
         # show full util message
         log_item = self.agent.context.log.log(
             type="util",
@@ -25,10 +32,19 @@ class MemorizeMemories(Extension):
         )
 
         # memorize in background
-        task = asyncio.create_task(self.memorize(loop_data, log_item))
+        task = asyncio.create_task(
+            self.memorize(loop_data, log_item, msgs_text=msgs_text, last_no=last_no)
+        )
         return task
 
-    async def memorize(self, loop_data: LoopData, log_item: LogItem, **kwargs):
+    async def memorize(
+        self,
+        loop_data: LoopData,
+        log_item: LogItem,
+        msgs_text: str,
+        last_no: int,
+        **kwargs,
+    ):
 
         set = settings.get_settings()
 
@@ -36,7 +52,6 @@ class MemorizeMemories(Extension):
 
         # get system message and chat history for util llm
         system = self.agent.read_prompt("memory.memories_sum.sys.md")
-        msgs_text = self.agent.concat_messages(self.agent.history)
 
         # log query streamed by LLM
         async def log_callback(content):
@@ -83,6 +98,7 @@ class MemorizeMemories(Extension):
 
         if not isinstance(memories, list) or len(memories) == 0:
             log_item.update(heading="No useful information to memorize.")
+            set_memorized(self.agent, "fragments", last_no)
             return
         else:
             memories_txt = "\n\n".join([str(memory) for memory in memories]).strip()
@@ -92,76 +108,54 @@ class MemorizeMemories(Extension):
         total_processed = 0
         total_consolidated = 0
         rem = []
+        # the watermark only moves when every entry was stored
+        memorized = True
 
+        texts = []
         for memory in memories:
             # Convert memory to plain text
             txt = f"{memory}"
+            texts.append(txt)
+
+        if set["memory_memorize_consolidation"]:
+            try:
+                # Use intelligent consolidation system, all memories are consolidated
+                # together so similarity searches and utility calls are batched
+                from python.helpers.memory_consolidation import create_memory_consolidator
+                consolidator = create_memory_consolidator(
+                    self.agent,
+                    similarity_threshold=DEFAULT_MEMORY_THRESHOLD,  # More permissive for discovery
+                    max_similar_memories=8,
+                    max_llm_context_memories=4
+                )
 
-            if set["memory_memorize_consolidation"]:
-                
-                try:
-                    # Use intelligent consolidation system
-                    from python.helpers.memory_consolidation import create_memory_consolidator
-                    consolidator = create_memory_consolidator(
-                        self.agent,
-                        similarity_threshold=DEFAULT_MEMORY_THRESHOLD,  # More permissive for discovery
-                        max_similar_memories=8,
-                        max_llm_context_memories=4
-                    )
-
-                    # Create memory item-specific log for detailed tracking
-                    memory_log = None # too many utility messages, skip log for now
-                    # memory_log = self.agent.context.log.log(
-                    #     type="util",
-                    #     heading=f"Processing memory fragment: {txt[:50]}...",
-                    #     temp=False,
-                    #     update_progress="none"  # Don't affect status bar
-                    # )
-
-                    # Process with intelligent consolidation
-                    result_obj = await consolidator.process_new_memory(
-                        new_memory=txt,
-                        area=Memory.Area.FRAGMENTS.value,
-                        metadata={"area": Memory.Area.FRAGMENTS.value},
-                        log_item=memory_log
-                    )
-
-                    # Update the individual log item with completion status but keep it temporary
-                    if result_obj.get("success"):
-                        total_consolidated += 1
-                        if memory_log:
-                            memory_log.update(
-                                result="Fragment processed successfully",
-                                heading=f"Memory fragment completed: {txt[:50]}...",
-                                temp=False,  # Show completion message
-                                update_progress="none"  # Show briefly then disappear
-                            )
-                    else:
-                        if memory_log:
-                            memory_log.update(
-                                result="Fragment processing failed",
-                                heading=f"Memory fragment failed: {txt[:50]}...",
-                                temp=False,  # Show completion message
-                                update_progress="none"  # Show briefly then disappear
-                            )
-                    total_processed += 1
-
-                except Exception as e:
-                    # Log error but continue processing
-                    log_item.update(consolidation_error=str(e))
-                    total_processed += 1
-
-                # Update final results with structured logging
-                log_item.update(
-                    heading=f"Memorization completed: {total_processed} memories processed, {total_consolidated} intelligently consolidated",
-                    memories=memories_txt,
-                    result=f"{total_processed} memories processed, {total_consolidated} intelligently consolidated",
-                    memories_processed=total_processed,
-                    memories_consolidated=total_consolidated,
-                    update_progress="none"
+                results = await consolidator.process_new_memories(
+                    new_memories=texts,
+                    area=Memory.Area.FRAGMENTS.value,
+                    metadata={"area": Memory.Area.FRAGMENTS.value},
+                    log_item=None  # too many utility messages, skip log for now
                 )
+                total_consolidated = sum(1 for result_obj in results if result_obj.get("success"))
+                memorized = total_consolidated == len(texts)
+
+            except Exception as e:
+                # Log error, memories are memorized again at the next monologue end
+                log_item.update(consolidation_error=str(e))
+                memorized = False
+            total_processed = len(texts)
+
+            # Update final results with structured logging
+            log_item.update(
+                heading=f"Memorization completed: {total_processed} memories processed, {total_consolidated} intelligently consolidated",
+                memories=memories_txt,
+                result=f"{total_processed} memories processed, {total_consolidated} intelligently consolidated",
+                memories_processed=total_processed,
+                memories_consolidated=total_consolidated,
+                update_progress="none"
+            )
 
-            else:
+        else:
+            for txt in texts:
 
                 # remove previous fragments too similiar to this one
                 if set["memory_memorize_replace_threshold"] > 0:
@@ -183,8 +177,9 @@ class MemorizeMemories(Extension):
                 )
                 if rem:
                     log_item.stream(result=f"\nReplaced {len(rem)} previous memories.")
-            
 
+        if memorized:
+            set_memorized(self.agent, "fragments", last_no)
 
 
     # except Exception as e:
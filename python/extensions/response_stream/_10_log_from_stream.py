@@ -5,6 +5,7 @@ import asyncio
 from python.helpers.log import LogItem
 from python.helpers import log
 import math
+from collections import OrderedDict
 from python.extensions.before_main_llm_call._10_log_for_stream import build_heading, build_default_heading
 
 
@@ -15,23 +16,25 @@ class LogFromStream(Extension):
         loop_data: LoopData = LoopData(),
         text: str = "",
         parsed: dict = {},
+        completed: list[tuple] = [],
+        partial: tuple | None = None,
         **kwargs,
     ):
+        params = loop_data.params_temporary
 
         heading = build_default_heading(self.agent)
-        if "headline" in parsed:
+        if parsed.get("headline"):
             heading = build_heading(self.agent, parsed['headline'])
-        elif "tool_name" in parsed:
+        elif parsed.get("tool_name"):
             heading = build_heading(self.agent, f"Using tool {parsed['tool_name']}") # if the llm skipped headline
         elif "thoughts" in parsed:
-            # thought length indicator
-            thoughts = "\n".join(parsed["thoughts"])
-            pipes = "|" * math.ceil(math.sqrt(len(thoughts)))
+            # thought length indicator, thoughts are streamed first
+            pipes = "|" * math.ceil(math.sqrt(len(text)))
             heading = build_heading(self.agent, f"Thinking... {pipes}")
         
         # create log message and store it in loop data temporary params
-        if "log_item_generating" not in loop_data.params_temporary:
-            loop_data.params_temporary["log_item_generating"] = (
+        if "log_item_generating" not in params:
+            params["log_item_generating"] = (
                 self.agent.context.log.log(
                     type="agent",
                     heading=heading,
@@ -39,13 +42,28 @@ class LogFromStream(Extension):
             )
 
         # update log message
-        log_item = loop_data.params_temporary["log_item_generating"]
+        log_item = params["log_item_generating"]
 
-        # keep reasoning from previous logs in kvps
-        kvps = {}
-        if log_item.kvps is not None and "reasoning" in log_item.kvps:
-            kvps["reasoning"] = log_item.kvps["reasoning"]
-        kvps.update(parsed)
+        # only what changed since the last chunk is applied, the text is
+        # streamed and kvps are set when their values are completed
+        if heading != params.get("log_heading"):
+            log_item.update(heading=heading)
+            params["log_heading"] = heading
 
-        # update the log item
-        log_item.update(heading=heading, content=text, kvps=kvps)
\ No newline at end of file
+        logged = params.get("log_text_length", 0)
+        if 0 < logged <= len(text):
+            log_item.stream(content=text[logged:])
+        else:
+            log_item.update(content=text)
+        params["log_text_length"] = len(text)
+
+        changed = {path[0] for path in completed if path}
+        if partial:
+            changed.discard(partial[0])  # set once the value inside is completed
+        if changed:
+            # keep reasoning and values from previous chunks in kvps
+            kvps = OrderedDict(log_item.kvps or {})
+            for key in parsed:
+                if key in changed:
+                    kvps[key] = parsed[key]
+            log_item.update(kvps=kvps)
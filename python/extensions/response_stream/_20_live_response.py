@@ -5,6 +5,8 @@ import asyncio
 from python.helpers.log import LogItem
 from python.helpers import log
 
+RESPONSE_TEXT = ("tool_args", "text")
+
 
 class LiveResponse(Extension):
 
@@ -13,29 +15,40 @@ class LiveResponse(Extension):
         loop_data: LoopData = LoopData(),
         text: str = "",
         parsed: dict = {},
+        completed: list[tuple] = [],
+        partial: tuple | None = None,
+        delta: str = "",
         **kwargs,
     ):
         try:
-            if (
-                not "tool_name" in parsed
-                or parsed["tool_name"] != "response"
-                or "tool_args" not in parsed
-                or "text" not in parsed["tool_args"]
-                or not parsed["tool_args"]["text"]
-            ):
+            if parsed.get("tool_name") != "response":
                 return  # not a response
 
+            params = loop_data.params_temporary
+            if RESPONSE_TEXT in completed:
+                content, final = parsed["tool_args"]["text"], True
+            elif partial == RESPONSE_TEXT:
+                content, final = delta, False
+            else:
+                return
+            if not content and "log_item_response" not in params:
+                return
+
             # create log message and store it in loop data temporary params
-            if "log_item_response" not in loop_data.params_temporary:
-                loop_data.params_temporary["log_item_response"] = (
+            if "log_item_response" not in params:
+                params["log_item_response"] = (
                     self.agent.context.log.log(
                         type="response",
                         heading=f"icon://chat {self.agent.agent_name}: Responding",
                     )
                 )
 
-            # update log message
-            log_item = loop_data.params_temporary["log_item_response"]
-            log_item.update(content=parsed["tool_args"]["text"])
+            # update log message, the text is streamed and set in full once completed
+            log_item = params["log_item_response"]
+            if final or not params.get("log_response_streaming"):
+                log_item.update(content=content)
+            else:
+                log_item.stream(content=content)
+            params["log_response_streaming"] = not final
         except Exception as e:
             pass
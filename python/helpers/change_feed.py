@@ -0,0 +1,34 @@
+import threading
+
+# Process-wide change counter for UI state. Logs, contexts and scheduled tasks
+# call notify() when they change so pollers can wait for changes instead of
+# re-serializing everything on a fixed interval.
+
+_condition = threading.Condition()
+_version = 0
+_channels: dict[str, int] = {}
+
+
+def notify(channel: str = "") -> int:
+    """Record a change and wake up waiters, returns the new global version."""
+    global _version
+    with _condition:
+        _version += 1
+        if channel:
+            _channels[channel] = _version
+        _condition.notify_all()
+        return _version
+
+
+def get_version(channel: str = "") -> int:
+    """Global version, or the version of the last change on the channel."""
+    if channel:
+        return _channels.get(channel, 0)
+    return _version
+
+
+def wait(since: int, timeout: float) -> int:
+    """Block until the global version moves past since or the timeout expires."""
+    with _condition:
+        _condition.wait_for(lambda: _version > since, timeout=timeout)
+        return _version
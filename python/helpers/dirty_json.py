@@ -1,4 +1,5 @@
 import json
+import re
 
 def try_parse(json_string: str):
     try:
@@ -25,6 +26,7 @@ class DirtyJson:
         self.current_char = None
         self.result = None
         self.stack = []
+        self.stream = None
 
     @staticmethod
     def parse_string(json_string):
@@ -58,10 +60,10 @@ class DirtyJson:
         return self.result
 
     def feed(self, chunk):
-        self.json_string += chunk
-        if not self.current_char and self.json_string:
-            self.current_char = self.json_string[0]
-        self._parse()
+        # incremental parsing, only the new chunk is processed
+        if self.stream is None:
+            self.stream = DirtyJsonStream()
+        self.result = self.stream.feed(chunk)
         return self.result
 
     def _advance(self, count=1):
@@ -360,3 +362,380 @@ class DirtyJson:
         chars = ["{", "[", '"']
         indices = [input_str.find(char) for char in chars if input_str.find(char) != -1]
         return min(indices) if indices else 0
+
+
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_QUOTES = "\"'`"
+_NUMBER_CHARS = frozenset("0123456789-+.eE")
+_STRING_STOP = {q: re.compile("[\\\\" + re.escape(q) + "]") for q in _QUOTES}
+_VALUE_END = re.compile(r"[:,}\]]")
+_KEY_END = re.compile(r"[\s:,}\]]")
+_LITERALS = {"true": True, "false": False, "null": None, "undefined": None}
+
+# object and array states
+_KEY, _COLON, _VALUE, _COMMA = range(4)
+# token kinds
+_STRING, _MULTILINE, _NUMBER, _UNQUOTED, _KEY_STRING, _KEY_UNQUOTED, _LINE_COMMENT, _BLOCK_COMMENT = range(8)
+# token kinds of values, the others are keys and comments
+_VALUE_KINDS = (_STRING, _MULTILINE, _NUMBER, _UNQUOTED)
+_WAIT = -1  # more input is needed to decide
+
+
+class _Frame:
+    __slots__ = ("container", "path", "double", "state", "key")
+
+    def __init__(self, container: dict | list, path: tuple, double: bool):
+        self.container = container
+        self.path = path
+        self.double = double  # opened with {{, closes with }}
+        self.state = _KEY if isinstance(container, dict) else _VALUE
+        self.key = None
+
+
+class _Token:
+    __slots__ = ("kind", "quote", "parts", "target", "slot", "path")
+
+    def __init__(self, kind: int, quote: str = ""):
+        self.kind = kind
+        self.quote = quote
+        self.parts: list[str] = []
+        self.target: dict | list | None = None
+        self.slot = None
+        self.path: tuple = ()
+
+
+class DirtyJsonStream:
+    """Resumable DirtyJson parser for text that arrives in chunks.
+
+    push() only parses the new chunk, so a long stream is parsed in linear
+    total time. Paths of the values completed by the last chunk are listed in
+    `completed`, e.g. ("tool_args", "text"). The value still being streamed is
+    at path `partial`, `delta` holds the text the last chunk added to it when
+    it is a string.
+
+    `root` is built in place, the partial value in it may be missing or
+    outdated. `result` is the same object with the partial value filled in,
+    which joins the value on every read, so consumers of long streams follow
+    `delta` instead. feed() pushes a chunk and returns `result`.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.completed: list[tuple] = []
+        self.partial: tuple | None = None
+        self.delta = ""
+        self.length = 0  # characters fed so far
+        self.done = False
+        self._pending = ""
+        self._started = False
+        self._stack: list[_Frame] = []
+        self._token: _Token | None = None
+
+    @property
+    def result(self):
+        self._expose_partial()
+        return self.root
+
+    def feed(self, chunk: str):
+        self.push(chunk)
+        return self.result
+
+    def push(self, chunk: str):
+        self.length += len(chunk)
+        self.completed = []
+        self.delta = ""
+        if self.done or not chunk:
+            return
+        text = self._pending + chunk
+        if not self._started:
+            # same start position as DirtyJson.get_start_pos
+            indices = [i for i in (text.find(c) for c in '{["') if i != -1]
+            if not indices:
+                return
+            text = text[min(indices):]
+            self._started = True
+        previous = self._token
+        seen = len(previous.parts) if previous else 0
+        index = self._parse(text)
+        self._pending = text[index:]
+
+        token = self._token
+        if not token or token.kind not in _VALUE_KINDS:
+            self.partial = None
+            return
+        if token is not previous:
+            seen = 0  # value started in this chunk
+        self.partial = token.path
+        if token.kind in (_STRING, _MULTILINE):
+            self.delta = "".join(token.parts[seen:])
+
+    def _parse(self, text: str) -> int:
+        i, n = 0, len(text)
+        while i < n and not self.done:
+            if self._token:
+                i = self._continue_token(text, i)
+                if self._token:
+                    break  # out of input inside the token
+                continue
+
+            c = text[i]
+            if c.isspace():
+                i += 1
+                continue
+            if c == "/":
+                if i + 1 >= n:
+                    break
+                if text[i + 1] in "/*":
+                    self._token = _Token(_LINE_COMMENT if text[i + 1] == "/" else _BLOCK_COMMENT)
+                    i += 2
+                    continue
+
+            if not self._stack:
+                j = self._start_value(text, i)
+            elif isinstance(self._stack[-1].container, dict):
+                j = self._object_step(text, i, c)
+            else:
+                j = self._array_step(text, i, c)
+            if j == _WAIT:
+                break
+            i = j
+        return i
+
+    def _object_step(self, text: str, i: int, c: str) -> int:
+        frame = self._stack[-1]
+        if c == "}":
+            return self._close(text, i)
+        if frame.state == _KEY:
+            if c in ",:]":
+                return i + 1
+            if c in "\"'":
+                self._token = _Token(_KEY_STRING, c)
+                return i + 1
+            self._token = _Token(_KEY_UNQUOTED)
+            return i
+        if c == ",":
+            frame.state = _KEY
+            return i + 1
+        if frame.state == _COLON and c == ":":
+            frame.state = _VALUE
+            return i + 1
+        if frame.state == _COMMA:
+            frame.state = _KEY
+            return i
+        return self._start_value(text, i)
+
+    def _array_step(self, text: str, i: int, c: str) -> int:
+        frame = self._stack[-1]
+        if c == "]":
+            return self._close(text, i)
+        if c == ",":
+            frame.state = _VALUE
+            return i + 1
+        frame.state = _VALUE
+        return self._start_value(text, i)
+
+    def _start_value(self, text: str, i: int) -> int:
+        c, n = text[i], len(text)
+        if c == "{":
+            if i + 1 >= n:
+                return _WAIT
+            double = text[i + 1] == "{"
+            self._open({}, double)
+            return i + (2 if double else 1)
+        if c == "[":
+            self._open([], False)
+            return i + 1
+        if c in _QUOTES:
+            if i + 2 >= n:
+                return _WAIT
+            if text[i + 1 : i + 3] == c * 2:
+                self._begin_value(_Token(_MULTILINE, c))
+                return i + 3
+            self._begin_value(_Token(_STRING, c))
+            return i + 1
+        if c in ":,}]":
+            return i + 1  # stray delimiter
+        self._begin_value(_Token(_NUMBER if c.isdigit() or c in "-+" else _UNQUOTED))
+        return i
+
+    def _continue_token(self, text: str, i: int) -> int:
+        token = self._token
+        assert token
+        kind, n = token.kind, len(text)
+        if kind in (_STRING, _KEY_STRING):
+            return self._continue_string(text, i, token)
+        if kind == _MULTILINE:
+            marker = token.quote * 3
+            end = text.find(marker, i)
+            if end == -1:
+                # keep trailing quotes back, they may start the closing marker
+                end = n
+                while end > i and n - end < 2 and text[end - 1] == token.quote:
+                    end -= 1
+                token.parts.append(text[i:end])
+                return end
+            token.parts.append(text[i:end])
+            self._finish_value("".join(token.parts))
+            return end + 3
+        if kind == _NUMBER:
+            j = i
+            while j < n and text[j] in _NUMBER_CHARS:
+                j += 1
+            token.parts.append(text[i:j])
+            if j < n:
+                self._finish_value(_to_number("".join(token.parts)))
+            return j
+        if kind in (_UNQUOTED, _KEY_UNQUOTED):
+            match = (_VALUE_END if kind == _UNQUOTED else _KEY_END).search(text, i)
+            j = match.start() if match else n
+            token.parts.append(text[i:j])
+            if match:
+                if kind == _UNQUOTED:
+                    self._finish_value(_to_unquoted("".join(token.parts)))
+                else:
+                    self._finish_key("".join(token.parts))
+            return j
+        if kind == _LINE_COMMENT:
+            end = text.find("\n", i)
+            if end == -1:
+                return n
+            self._token = None
+            return end + 1
+        # block comment, a trailing * may start the closing */
+        end = text.find("*/", i)
+        if end == -1:
+            return max(i, n - 1)
+        self._token = None
+        return end + 2
+
+    def _continue_string(self, text: str, i: int, token: _Token) -> int:
+        stop, n = _STRING_STOP[token.quote], len(text)
+        while True:
+            match = stop.search(text, i)
+            if not match:
+                token.parts.append(text[i:])
+                return n
+            j = match.start()
+            token.parts.append(text[i:j])
+            if text[j] == token.quote:
+                value = "".join(token.parts)
+                if token.kind == _KEY_STRING:
+                    self._finish_key(value)
+                else:
+                    self._finish_value(value)
+                return j + 1
+            # escape sequence
+            if j + 1 >= n:
+                return j
+            escaped = text[j + 1]
+            if escaped != "u":
+                token.parts.append(_ESCAPES.get(escaped, escaped))
+                i = j + 2
+                continue
+            digits = ""
+            k = j + 2
+            while k < n and len(digits) < 4 and text[k].isalnum():
+                digits += text[k]
+                k += 1
+            if len(digits) < 4:
+                if k >= n:
+                    return j  # wait for the remaining digits
+                token.parts.append("\\u" + digits)
+            else:
+                try:
+                    token.parts.append(chr(int(digits, 16)))
+                except ValueError:
+                    token.parts.append("\\u" + digits)
+            i = k
+
+    def _place(self, value) -> tuple:
+        """Put a new value into the current slot and return its path."""
+        if not self._stack:
+            self.root = value
+            return ()
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+            return frame.path + (frame.key,)
+        frame.container.append(value)
+        return frame.path + (len(frame.container) - 1,)
+
+    def _open(self, container: dict | list, double: bool):
+        path = self._place(container)
+        self._stack.append(_Frame(container, path, double))
+
+    def _close(self, text: str, i: int) -> int:
+        frame = self._stack[-1]
+        if frame.double:
+            if i + 1 >= len(text):
+                return _WAIT
+            if text[i + 1] == "}":
+                i += 1
+        self._stack.pop()
+        self.completed.append(frame.path)
+        self._after_value()
+        return i + 1
+
+    def _begin_value(self, token: _Token):
+        token.path = self._place(None)
+        if self._stack:
+            frame = self._stack[-1]
+            token.target = frame.container
+            token.slot = frame.key if isinstance(frame.container, dict) else len(frame.container) - 1
+        self._token = token
+
+    def _assign(self, token: _Token, value):
+        if token.target is None:
+            self.root = value
+        else:
+            token.target[token.slot] = value  # type: ignore
+
+    def _finish_value(self, value):
+        token = self._token
+        assert token
+        self._token = None
+        self._assign(token, value)
+        self.completed.append(token.path)
+        self._after_value()
+
+    def _finish_key(self, key: str):
+        self._token = None
+        frame = self._stack[-1]
+        frame.key = key
+        frame.container[key] = None  # type: ignore
+        frame.state = _COLON
+
+    def _after_value(self):
+        if self._stack:
+            self._stack[-1].state = _COMMA
+        else:
+            self.done = True
+
+    def _expose_partial(self):
+        token = self._token
+        if not token or token.kind not in _VALUE_KINDS:
+            return
+        value = "".join(token.parts)
+        token.parts = [value]
+        if token.kind == _NUMBER:
+            self._assign(token, _to_number(value))
+        elif token.kind == _UNQUOTED:
+            self._assign(token, _to_unquoted(value))
+        else:
+            self._assign(token, value)
+
+
+def _to_number(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _to_unquoted(text: str):
+    text = text.strip()
+    return _LITERALS.get(text.lower(), text)
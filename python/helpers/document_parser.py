@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from python.helpers import files
+
+# Document parsing (PyMuPDF, OCR, unstructured) holds the GIL or blocks for
+# seconds, it runs in worker processes so the event loop and other chats keep
+# going. Extracted text is cached on disk by content hash.
+
+# at most this many documents are parsed at once, each in its own process
+PARSE_WORKERS = min(4, os.cpu_count() or 1)
+PARSE_TIMEOUT = 600
+# pages are OCRed in parallel within one worker, tesseract runs as a subprocess
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+CACHE_FOLDER = "tmp/document_cache"
+CACHE_MAX_FILES = 200
+# bump when parsing changes so cached text of older parsers is not used
+PARSER_VERSION = 1
+
+KINDS = ("html", "pdf", "unstructured")
+
+# workers are plain "python -m" processes, multiprocessing would re-import the
+# app's main module in every worker, the threads only wait for them
+_executor = ThreadPoolExecutor(
+    max_workers=PARSE_WORKERS, thread_name_prefix="DocumentParser"
+)
+
+
+async def parse(kind: str, content: bytes, suffix: str = "") -> str:
+    """Extract text of a document of the given kind, cached by content hash."""
+    if kind not in KINDS:
+        raise ValueError(f"Unsupported document kind: {kind}")
+    key = get_cache_key(kind, content)
+    cached = await asyncio.to_thread(_read_cache, key)
+    if cached is not None:
+        return cached
+
+    text = await asyncio.get_running_loop().run_in_executor(
+        _executor, _run_worker, kind, content, suffix
+    )
+    await asyncio.to_thread(_write_cache, key, text)
+    return text
+
+
+def get_cache_key(kind: str, content: bytes) -> str:
+    hasher = hashlib.sha256(content)
+    hasher.update(f":{kind}:{PARSER_VERSION}".encode())
+    return hasher.hexdigest()
+
+
+def _run_worker(kind: str, content: bytes, suffix: str) -> str:
+    with tempfile.TemporaryDirectory(prefix="document_parser_") as folder:
+        input_path = os.path.join(folder, f"document{suffix}")
+        output_path = os.path.join(folder, "document.txt")
+        with open(input_path, "wb") as f:
+            f.write(content)
+
+        base_dir = files.get_base_dir()
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(
+            filter(None, [base_dir, os.environ.get("PYTHONPATH", "")])
+        )}
+        result = subprocess.run(
+            [sys.executable, "-m", __name__, kind, input_path, output_path],
+            cwd=base_dir,
+            env=env,
+            capture_output=True,
+            timeout=PARSE_TIMEOUT,
+        )
+        if result.returncode != 0:
+            error = result.stderr.decode("utf-8", errors="replace").strip()
+            raise ValueError(
+                f"Document parsing failed: {error.splitlines()[-1] if error else result.returncode}"
+            )
+        with open(output_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+
+def _get_cache_path(key: str) -> str:
+    return files.get_abs_path(CACHE_FOLDER, f"{key}.txt")
+
+
+def _read_cache(key: str) -> str | None:
+    path = _get_cache_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return None
+    os.utime(path)  # most recently used files survive pruning
+    return text
+
+
+def _write_cache(key: str, text: str):
+    files.write_file_atomic(os.path.join(CACHE_FOLDER, f"{key}.txt"), text)
+    folder = files.get_abs_path(CACHE_FOLDER)
+    entries = [entry for entry in os.scandir(folder) if entry.name.endswith(".txt")]
+    if len(entries) > CACHE_MAX_FILES:
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - CACHE_MAX_FILES]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+# --- worker process side, loaders are imported here only ---
+
+
+def _parse_file(kind: str, file_path: str) -> str:
+    if kind == "html":
+        with open(file_path, "rb") as f:
+            return _parse_html(f.read())
+    if kind == "pdf":
+        return _parse_pdf(file_path)
+    return _parse_unstructured(file_path)
+
+
+def _parse_html(content: bytes) -> str:
+    from langchain_community.document_transformers import MarkdownifyTransformer
+    from langchain_core.documents import Document
+
+    parts = [Document(page_content=content.decode("utf-8", errors="replace"))]
+    return "\n".join(
+        [
+            element.page_content
+            for element in MarkdownifyTransformer().transform_documents(parts)
+        ]
+    )
+
+
+def _parse_pdf(file_path: str) -> str:
+    from langchain_community.document_loaders.pdf import PyMuPDFLoader
+    from python.helpers.print_style import PrintStyle
+
+    try:
+        from langchain_community.document_loaders.parsers.images import (
+            TesseractBlobParser,
+        )
+    except (ModuleNotFoundError, AttributeError):  # pragma: no cover
+        TesseractBlobParser = None  # type: ignore[assignment]
+
+    try:
+        loader_kwargs = dict(
+            mode="single",
+            extract_tables="markdown",
+            extract_images=True,
+            images_inner_format="text",
+            pages_delimiter="\n",
+        )
+        if TesseractBlobParser is not None:
+            loader_kwargs["images_parser"] = TesseractBlobParser()
+
+        loader = PyMuPDFLoader(file_path, **loader_kwargs)
+        elements = loader.load()
+        contents = "\n".join([element.page_content for element in elements])
+    except Exception as e:
+        PrintStyle.error(f"document_parser: Error loading with PyMuPDF: {e}")
+        contents = ""
+
+    if not contents:
+        PrintStyle.debug(f"document_parser: FALLBACK OCR of PDF pages: {file_path}")
+        contents = _ocr_pdf(file_path)
+    return contents
+
+
+def _ocr_pdf(file_path: str) -> str:
+    import pdf2image
+    import pytesseract
+
+    page_count = pdf2image.pdfinfo_from_path(file_path)["Pages"]
+
+    # one page at a time keeps memory flat, pdftoppm and tesseract are
+    # subprocesses so threads run them in parallel
+    def ocr_page(page: int) -> str:
+        images = pdf2image.convert_from_path(file_path, first_page=page, last_page=page)
+        return "".join(pytesseract.image_to_string(image) + "\n\n" for image in images)
+
+    with ThreadPoolExecutor(max_workers=OCR_WORKERS) as executor:
+        return "".join(executor.map(ocr_page, range(1, page_count + 1)))
+
+
+def _parse_unstructured(file_path: str) -> str:
+    from langchain_unstructured import UnstructuredLoader  # type: ignore
+
+    loader = UnstructuredLoader(
+        file_path=file_path,
+        mode="single",
+        partition_via_api=False,
+        # chunking_strategy="by_page",
+        strategy="hi_res",
+    )
+    return "\n".join([element.page_content for element in loader.load()])
+
+
+if __name__ == "__main__":
+    # worker: python -m python.helpers.document_parser <kind> <input> <output>
+    _kind, _input_path, _output_path = sys.argv[1:4]
+    _text = _parse_file(_kind, _input_path)
+    with open(_output_path, "w", encoding="utf-8") as _f:
+        _f.write(_text)
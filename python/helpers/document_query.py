@@ -1,8 +1,10 @@
 import mimetypes
 import os
 import asyncio
+import time
 import aiohttp
 import json
+import numpy as np
 
 from python.helpers.vector_db import VectorDB
 
@@ -19,29 +21,25 @@ from urllib.parse import urlparse
 from typing import Callable, Sequence, List, Optional, Tuple
 from datetime import datetime
 
-from langchain_community.document_loaders import AsyncHtmlLoader
-from langchain_community.document_loaders.text import TextLoader
-from langchain_community.document_loaders.pdf import PyMuPDFLoader
-from langchain_community.document_transformers import MarkdownifyTransformer
-
-try:  # pragma: no cover - optional dependency may not exist in older releases
-    from langchain_community.document_loaders.parsers.images import (
-        TesseractBlobParser,
-    )
-except (ModuleNotFoundError, AttributeError):  # pragma: no cover
-    TesseractBlobParser = None  # type: ignore[assignment]
-
 from langchain_core.documents import Document
 from langchain_core.messages import SystemMessage, HumanMessage
 
 from python.helpers.print_style import PrintStyle
-from python.helpers import files, errors
+from python.helpers import files, errors, document_parser
 from agents import Agent
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
 DEFAULT_SEARCH_THRESHOLD = 0.5
+MAX_DOCUMENT_MB = 50.0
+DOWNLOAD_TIMEOUT = 60.0
+# chunks passed to the Q&A model, picked by relevance and diversity across all questions
+QA_MAX_CHUNKS = 40
+# MMR trade-off, 0 ranks by relevance only, 1 by difference to already selected chunks only
+QA_DIVERSITY = 0.3
+# chunks this similar to an already selected one add nothing to the prompt
+QA_DUPLICATE_SIMILARITY = 0.95
 
 
 class DocumentQueryStore:
@@ -307,7 +305,13 @@ class DocumentQueryStore:
         Returns:
             List of matching documents
         """
+        return [
+            doc for doc, _ in await self._search(query, limit, threshold, filter)
+        ]
 
+    async def _search(
+        self, query: str, limit: int, threshold: float, filter: str
+    ) -> List[Tuple[Document, float]]:
         # DB not initialized, no documents inside
         if not self.vector_db:
             return []
@@ -319,7 +323,11 @@ class DocumentQueryStore:
         # Perform search
         try:
             results = await self.vector_db.search_by_similarity_threshold(
-                query=query, limit=limit, threshold=threshold, filter=filter
+                query=query,
+                limit=limit,
+                threshold=threshold,
+                filter=filter,
+                with_scores=True,
             )
 
             PrintStyle.standard(f"Search '{query}' returned {len(results)} results")
@@ -347,6 +355,25 @@ class DocumentQueryStore:
             query, limit, threshold, f"document_uri == '{document_uri}'"
         )
 
+    async def search_document_with_scores(
+        self, document_uri: str, query: str, limit: int = 10, threshold: float = 0.5
+    ) -> List[Tuple[Document, float]]:
+        """
+        Search for content within a specific document.
+
+        Returns:
+            List of (chunk, relevance score) pairs, most relevant first
+        """
+        return await self._search(
+            query, limit, threshold, f"document_uri == '{document_uri}'"
+        )
+
+    def get_chunk_vectors(self, ids: Sequence[str]) -> dict[str, np.ndarray]:
+        """Stored embeddings of the chunks, empty if they are not available."""
+        if not self.vector_db:
+            return {}
+        return self.vector_db.db.get_vectors(ids)
+
     async def list_documents(self) -> List[str]:
         """
         Get a list of all document URIs in the store.
@@ -369,6 +396,56 @@ class DocumentQueryStore:
         return sorted(list(uris))
 
 
+def select_chunks(
+    scored_chunks: Sequence[Tuple[Document, float]],
+    vectors: dict[str, np.ndarray],
+    limit: int = QA_MAX_CHUNKS,
+    diversity: float = QA_DIVERSITY,
+) -> List[Document]:
+    """
+    Pick chunks by maximal marginal relevance: each next chunk is the most
+    relevant one, penalized by its similarity to the chunks picked so far.
+    Chunks found by several queries count once with their best score, near
+    duplicates are skipped. Without vectors chunks are ranked by relevance.
+
+    Returns:
+        Selected chunks in document order
+    """
+    best: dict[str, Tuple[Document, float]] = {}
+    for chunk, score in scored_chunks:
+        id = chunk.metadata["id"]
+        if id not in best or score > best[id][1]:
+            best[id] = (chunk, score)
+
+    ranked = sorted(best.items(), key=lambda item: item[1][1], reverse=True)
+    ids = [id for id, _ in ranked]
+    relevance = np.array([score for _, (_, score) in ranked], dtype=np.float32)
+
+    if all(id in vectors for id in ids) and ids:
+        matrix = np.array([vectors[id] for id in ids], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    else:
+        matrix = None
+
+    selected: list[int] = []
+    remaining = np.ones(len(ids), dtype=bool)
+    # highest similarity of each candidate to any selected chunk
+    max_similarity = np.zeros(len(ids), dtype=np.float32)
+    while remaining.any() and len(selected) < limit:
+        mmr = (1 - diversity) * relevance - diversity * max_similarity
+        mmr[~remaining] = -np.inf
+        pick = int(np.argmax(mmr))
+        remaining[pick] = False
+        if matrix is not None:
+            if max_similarity[pick] >= QA_DUPLICATE_SIMILARITY:
+                continue
+            max_similarity = np.maximum(max_similarity, matrix @ matrix[pick])
+        selected.append(pick)
+
+    chunks = [best[ids[i]][0] for i in selected]
+    return sorted(chunks, key=lambda chunk: chunk.metadata.get("chunk_index", 0))
+
+
 class DocumentQueryHelper:
 
     def __init__(
@@ -390,50 +467,64 @@ class DocumentQueryHelper:
         self, document_uri: str, questions: Sequence[str]
     ) -> Tuple[bool, str]:
         self.progress_callback(f"Starting Q&A process")
+        started = time.perf_counter()
 
         # index document
+        phase = time.perf_counter()
         _ = await self.document_get_content(document_uri, True)
-        selected_chunks = {}
-        for question in questions:
-            self.progress_callback(f"Optimizing query: {question}")
-            human_content = f'Search Query: "{question}"'
-            system_content = self.agent.parse_prompt(
-                "fw.document_query.optmimize_query.md"
-            )
+        self.progress_callback(f"Document indexed in {time.perf_counter() - phase:.2f}s")
 
-            optimized_query = (
-                await self.agent.call_utility_model(
-                    system=system_content, message=human_content
-                )
-            ).strip()
+        # optimize all queries at once, the rate limiter still applies per call
+        phase = time.perf_counter()
+        self.progress_callback(f"Optimizing {len(questions)} queries")
+        optimized_queries = await asyncio.gather(
+            *(self._optimize_query(question) for question in questions)
+        )
+        self.progress_callback(
+            f"Queries optimized in {time.perf_counter() - phase:.2f}s"
+        )
 
+        phase = time.perf_counter()
+        for optimized_query in optimized_queries:
             self.progress_callback(f"Searching document with query: {optimized_query}")
-
-            normalized_uri = self.store.normalize_uri(document_uri)
-            chunks = await self.store.search_document(
-                document_uri=normalized_uri,
-                query=optimized_query,
-                limit=100,
-                threshold=DEFAULT_SEARCH_THRESHOLD,
+        normalized_uri = self.store.normalize_uri(document_uri)
+        results = await asyncio.gather(
+            *(
+                self.store.search_document_with_scores(
+                    document_uri=normalized_uri,
+                    query=optimized_query,
+                    limit=100,
+                    threshold=DEFAULT_SEARCH_THRESHOLD,
+                )
+                for optimized_query in optimized_queries
             )
+        )
+        scored_chunks = [scored for chunks in results for scored in chunks]
+        self.progress_callback(
+            f"Found {len(scored_chunks)} chunks in {time.perf_counter() - phase:.2f}s"
+        )
 
-            self.progress_callback(f"Found {len(chunks)} chunks")
-
-            for chunk in chunks:
-                selected_chunks[chunk.metadata["id"]] = chunk
-
-        if not selected_chunks:
+        if not scored_chunks:
             self.progress_callback(f"No relevant content found in the document")
             content = f"!!! No content found for document: {document_uri} matching queries: {json.dumps(questions)}"
             return False, content
 
+        phase = time.perf_counter()
+        ids = list({chunk.metadata["id"] for chunk, _ in scored_chunks})
+        selected_chunks = select_chunks(
+            scored_chunks, self.store.get_chunk_vectors(ids)
+        )
+        self.progress_callback(
+            f"Selected {len(selected_chunks)} of {len(ids)} distinct chunks in {time.perf_counter() - phase:.2f}s"
+        )
+
         self.progress_callback(
             f"Processing {len(questions)} questions in context of {len(selected_chunks)} chunks"
         )
 
         questions_str = "\n".join([f" *  {question}" for question in questions])
         content = "\n\n----\n\n".join(
-            [chunk.page_content for chunk in selected_chunks.values()]
+            [chunk.page_content for chunk in selected_chunks]
         )
 
         qa_system_message = self.agent.parse_prompt(
@@ -441,17 +532,32 @@ class DocumentQueryHelper:
         )
         qa_user_message = f"# Document:\n{content}\n\n# Queries:\n{questions_str}"
 
+        phase = time.perf_counter()
         ai_response, _reasoning = await self.agent.call_chat_model(
             messages=[
                 SystemMessage(content=qa_system_message),
                 HumanMessage(content=qa_user_message),
             ]
         )
+        self.progress_callback(f"Answered in {time.perf_counter() - phase:.2f}s")
 
-        self.progress_callback(f"Q&A process completed")
+        self.progress_callback(
+            f"Q&A process completed in {time.perf_counter() - started:.2f}s"
+        )
 
         return True, str(ai_response)
 
+    async def _optimize_query(self, question: str) -> str:
+        human_content = f'Search Query: "{question}"'
+        system_content = self.agent.parse_prompt(
+            "fw.document_query.optmimize_query.md"
+        )
+        return (
+            await self.agent.call_utility_model(
+                system=system_content, message=human_content
+            )
+        ).strip()
+
     async def document_get_content(
         self, document_uri: str, add_to_db: bool = False
     ) -> str:
@@ -492,9 +598,9 @@ class DocumentQueryHelper:
                     content_length = (
                         float(response.headers["content-length"]) / 1024 / 1024
                     )  # MB
-                    if content_length > 50.0:
+                    if content_length > MAX_DOCUMENT_MB:
                         raise ValueError(
-                            f"Document content length exceeds max. 50MB: {content_length} MB ({document_uri})"
+                            f"Document content length exceeds max. {MAX_DOCUMENT_MB:.0f}MB: {content_length} MB ({document_uri})"
                         )
                 if mimetype and "; charset=" in mimetype:
                     mimetype = mimetype.split("; charset=")[0]
@@ -521,17 +627,20 @@ class DocumentQueryHelper:
         exists = await self.store.document_exists(document_uri_norm)
         document_content = ""
         if not exists:
+            self.progress_callback(f"Parsing document")
             if mimetype.startswith("image/"):
-                document_content = self.handle_image_document(document_uri, scheme)
+                document_content = await self.handle_image_document(
+                    document_uri, scheme, mimetype
+                )
             elif mimetype == "text/html":
-                document_content = self.handle_html_document(document_uri, scheme)
+                document_content = await self.handle_html_document(document_uri, scheme)
             elif mimetype.startswith("text/") or mimetype == "application/json":
-                document_content = self.handle_text_document(document_uri, scheme)
+                document_content = await self.handle_text_document(document_uri, scheme)
             elif mimetype == "application/pdf":
-                document_content = self.handle_pdf_document(document_uri, scheme)
+                document_content = await self.handle_pdf_document(document_uri, scheme)
             else:
-                document_content = self.handle_unstructured_document(
-                    document_uri, scheme
+                document_content = await self.handle_unstructured_document(
+                    document_uri, scheme, mimetype
                 )
             if add_to_db:
                 self.progress_callback(f"Indexing document")
@@ -554,158 +663,56 @@ class DocumentQueryHelper:
                 )
         return document_content
 
-    def handle_image_document(self, document: str, scheme: str) -> str:
-        return self.handle_unstructured_document(document, scheme)
-
-    def handle_html_document(self, document: str, scheme: str) -> str:
-        if scheme in ["http", "https"]:
-            loader = AsyncHtmlLoader(web_path=document)
-            parts: list[Document] = loader.load()
-        elif scheme == "file":
-            # Use RFC file operations instead of TextLoader
-            file_content_bytes = files.read_file_bin(document)
-            file_content = file_content_bytes.decode("utf-8")
-            # Create Document manually since we're not using TextLoader
-            parts = [Document(page_content=file_content, metadata={"source": document})]
-        else:
-            raise ValueError(f"Unsupported scheme: {scheme}")
-
-        return "\n".join(
-            [
-                element.page_content
-                for element in MarkdownifyTransformer().transform_documents(parts)
-            ]
-        )
-
-    def handle_text_document(self, document: str, scheme: str) -> str:
-        if scheme in ["http", "https"]:
-            loader = AsyncHtmlLoader(web_path=document)
-            elements: list[Document] = loader.load()
-        elif scheme == "file":
-            # Use RFC file operations instead of TextLoader
-            file_content_bytes = files.read_file_bin(document)
-            file_content = file_content_bytes.decode("utf-8")
-            # Create Document manually since we're not using TextLoader
-            elements = [
-                Document(page_content=file_content, metadata={"source": document})
-            ]
-        else:
-            raise ValueError(f"Unsupported scheme: {scheme}")
-
-        return "\n".join([element.page_content for element in elements])
-
-    def handle_pdf_document(self, document: str, scheme: str) -> str:
-        temp_file_path = ""
+    async def read_document(self, document: str, scheme: str) -> bytes:
+        """Raw document content from a local file or an async download."""
         if scheme == "file":
-            # Use RFC file operations to read the PDF file as binary
-            file_content_bytes = files.read_file_bin(document)
-            # Create a temporary file for PyMuPDFLoader since it needs a file path
-            import tempfile
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(file_content_bytes)
-                temp_file_path = temp_file.name
-        elif scheme in ["http", "https"]:
-            # download the file from the web url to a temporary file using python libraries for downloading
-            import requests
-            import tempfile
+            return await asyncio.to_thread(files.read_file_bin, document)
+        if scheme not in ["http", "https"]:
+            raise ValueError(f"Unsupported scheme: {scheme}")
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                response = requests.get(document, timeout=10.0)
-                if response.status_code != 200:
+        max_bytes = int(MAX_DOCUMENT_MB * 1024 * 1024)
+        async with aiohttp.ClientSession(
+            headers={"User-Agent": os.environ["USER_AGENT"]},
+            timeout=aiohttp.ClientTimeout(total=DOWNLOAD_TIMEOUT),
+        ) as session:
+            async with session.get(document, allow_redirects=True) as response:
+                if response.status != 200:
                     raise ValueError(
-                        f"DocumentQueryHelper::handle_pdf_document: Failed to download PDF from {document}: {response.status_code}"
+                        f"DocumentQueryHelper::read_document: Failed to download {document}: {response.status}"
                     )
-                temp_file.write(response.content)
-                temp_file_path = temp_file.name
-        else:
-            raise ValueError(f"Unsupported scheme: {scheme}")
-
-        if not os.path.exists(temp_file_path):
-            raise ValueError(
-                f"DocumentQueryHelper::handle_pdf_document: Temporary file not found: {temp_file_path}"
-            )
-
-        try:
-            try:
-                loader_kwargs = dict(
-                    mode="single",
-                    extract_tables="markdown",
-                    extract_images=True,
-                    images_inner_format="text",
-                    pages_delimiter="\n",
-                )
-                if TesseractBlobParser is not None:
-                    loader_kwargs["images_parser"] = TesseractBlobParser()
+                content = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    content.extend(chunk)
+                    if len(content) > max_bytes:
+                        raise ValueError(
+                            f"Document content length exceeds max. {MAX_DOCUMENT_MB:.0f}MB ({document})"
+                        )
+                return bytes(content)
 
-                loader = PyMuPDFLoader(
-                    temp_file_path,
-                    **loader_kwargs,
-                )
-                elements: list[Document] = loader.load()
-                contents = "\n".join([element.page_content for element in elements])
-            except Exception as e:
-                PrintStyle.error(
-                    f"DocumentQueryHelper::handle_pdf_document: Error loading with PyMuPDF: {e}"
-                )
-                contents = ""
+    async def handle_image_document(
+        self, document: str, scheme: str, mimetype: str = ""
+    ) -> str:
+        return await self.handle_unstructured_document(document, scheme, mimetype)
 
-            if not contents:
-                import pdf2image
-                import pytesseract
+    async def handle_html_document(self, document: str, scheme: str) -> str:
+        content = await self.read_document(document, scheme)
+        return await document_parser.parse("html", content)
 
-                PrintStyle.debug(
-                    f"DocumentQueryHelper::handle_pdf_document: FALLBACK Converting PDF to images: {temp_file_path}"
-                )
+    async def handle_text_document(self, document: str, scheme: str) -> str:
+        content = await self.read_document(document, scheme)
+        return content.decode("utf-8")
 
-                # Convert PDF to images
-                pages = pdf2image.convert_from_path(temp_file_path)  # type: ignore
-                for page in pages:
-                    contents += pytesseract.image_to_string(page) + "\n\n"
+    async def handle_pdf_document(self, document: str, scheme: str) -> str:
+        content = await self.read_document(document, scheme)
+        return await document_parser.parse("pdf", content, ".pdf")
 
-            return contents
-        finally:
-            os.unlink(temp_file_path)
-
-    def handle_unstructured_document(self, document: str, scheme: str) -> str:
+    async def handle_unstructured_document(
+        self, document: str, scheme: str, mimetype: str = ""
+    ) -> str:
         self._ensure_unstructured_loader()
-        elements: list[Document] = []
-        if scheme in ["http", "https"]:
-            # loader = UnstructuredURLLoader(urls=[document], mode="single")
-            loader = UnstructuredLoader(
-                web_url=document,
-                mode="single",
-                partition_via_api=False,
-                # chunking_strategy="by_page",
-                strategy="hi_res",
-            )
-            elements = loader.load()
-        elif scheme == "file":
-            # Use RFC file operations to read the file as binary
-            file_content_bytes = files.read_file_bin(document)
-            # Create a temporary file for UnstructuredLoader since it needs a file path
-            import tempfile
-            import os
-
-            # Get file extension to preserve it for proper processing
-            _, ext = os.path.splitext(document)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-                temp_file.write(file_content_bytes)
-                temp_file_path = temp_file.name
-
-            try:
-                loader = UnstructuredLoader(
-                    file_path=temp_file_path,
-                    mode="single",
-                    partition_via_api=False,
-                    # chunking_strategy="by_page",
-                    strategy="hi_res",
-                )
-                elements = loader.load()
-            finally:
-                # Clean up temporary file
-                os.unlink(temp_file_path)
-        else:
-            raise ValueError(f"Unsupported scheme: {scheme}")
-
-        return "\n".join([element.page_content for element in elements])
+        content = await self.read_document(document, scheme)
+        # the extension tells unstructured how to partition the file
+        _, ext = os.path.splitext(urlparse(document).path)
+        if not ext and mimetype:
+            ext = mimetypes.guess_extension(mimetype) or ""
+        return await document_parser.parse("unstructured", content, ext)
@@ -0,0 +1,111 @@
+"""
+Batched, concurrent document embedding.
+
+Splits texts into provider-sized batches (by count and approximate tokens),
+embeds them concurrently through the model's async API and calls the rate
+limiter once per batch, so large imports neither send one huge request nor
+one request per chunk.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_BATCH_TOKENS = 100000
+DEFAULT_CONCURRENCY = 4
+
+
+def estimate_tokens(text: str) -> int:
+    # packing only needs an upper bound, tokenizing every chunk would cost more than it saves
+    return max(1, len(text) // 3)
+
+
+@dataclass
+class EmbeddingStats:
+    texts: int = 0
+    batches: int = 0
+    tokens: int = 0
+    seconds: float = 0.0
+
+    @property
+    def texts_per_second(self) -> float:
+        return self.texts / self.seconds if self.seconds else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Embedded {self.texts} chunks ({self.tokens} tokens) in {self.batches} "
+            f"batches, {self.seconds:.1f}s, {self.texts_per_second:.1f} chunks/s"
+        )
+
+
+class EmbeddingScheduler:
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        rate_limit: Callable[[str], Awaitable[Any]] | None = None,
+        batch_size: int | None = None,
+        batch_tokens: int = DEFAULT_BATCH_TOKENS,
+        concurrency: int | None = None,
+    ):
+        # cache wrappers expose the provider limits of the wrapped model
+        model = getattr(embeddings, "underlying_embeddings", embeddings)
+        self.embeddings = embeddings
+        self.rate_limit = rate_limit
+        self.batch_size = max(
+            1, batch_size or getattr(model, "batch_size", DEFAULT_BATCH_SIZE)
+        )
+        self.batch_tokens = batch_tokens
+        self.concurrency = max(
+            1, concurrency or getattr(model, "concurrency", DEFAULT_CONCURRENCY)
+        )
+        self.stats = EmbeddingStats()
+
+    def make_batches(self, texts: list[str]) -> list[tuple[int, list[str], int]]:
+        """Split texts into (start offset, texts, tokens) batches."""
+        batches = []
+        start, batch, tokens = 0, [], 0
+        for i, text in enumerate(texts):
+            text_tokens = estimate_tokens(text)
+            if batch and (
+                len(batch) >= self.batch_size
+                or tokens + text_tokens > self.batch_tokens
+            ):
+                batches.append((start, batch, tokens))
+                start, batch, tokens = i, [], 0
+            batch.append(text)
+            tokens += text_tokens
+        if batch:
+            batches.append((start, batch, tokens))
+        return batches
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        started = time.perf_counter()
+        batches = self.make_batches(texts)
+        results: list[list[float]] = [[] for _ in texts]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(start: int, batch: list[str]):
+            async with semaphore:
+                if self.rate_limit:
+                    await self.rate_limit("".join(batch))
+                vectors = await self.embeddings.aembed_documents(batch)
+            results[start : start + len(batch)] = vectors
+
+        await asyncio.gather(*(run(start, batch) for start, batch, _ in batches))
+
+        self.stats.texts += len(texts)
+        self.stats.batches += len(batches)
+        self.stats.tokens += sum(tokens for _, _, tokens in batches)
+        self.stats.seconds += time.perf_counter() - started
+        return results
@@ -1,12 +1,23 @@
 from abc import abstractmethod
+import asyncio
+import time
 from typing import Any
 from python.helpers import extract_tools, files 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from agents import Agent
 
+DATA_NAME_TIMINGS = "_extension_timings"
+
+
 class Extension:
 
+    # concurrent extensions run alongside the other concurrent extensions of the same
+    # extension point and only wait for the extensions (file names) in DEPENDS_ON,
+    # the others run alone after everything before them has finished
+    CONCURRENT: bool = False
+    DEPENDS_ON: tuple[str, ...] = ()
+
     def __init__(self, agent: "Agent|None", **kwargs):
         self.agent: "Agent" = agent # type: ignore < here we ignore the type check as there are currently no extensions without an agent
         self.kwargs = kwargs
@@ -35,8 +46,59 @@ async def call_extensions(extension_point: str, agent: "Agent|None" = None, **kw
             classes = sorted(unique.values(), key=lambda cls: _get_file_from_module(cls.__module__))
 
     # call extensions
-    for cls in classes:
+    timings: dict[str, float] = {}
+    tasks: dict[str, asyncio.Task] = {}
+    try:
+        for cls in classes:
+            name = _get_file_from_module(cls.__module__)
+            if cls.CONCURRENT:
+                deps = [tasks[dep] for dep in cls.DEPENDS_ON if dep in tasks]
+                tasks[name] = asyncio.create_task(
+                    _execute(cls, name, agent, timings, deps, kwargs)
+                )
+            else:
+                for task in list(tasks.values()):
+                    await task
+                await _execute(cls, name, agent, timings, [], kwargs)
+        for task in list(tasks.values()):
+            await task
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    finally:
+        if agent and timings:
+            _get_timings(agent)[extension_point] = timings
+
+
+async def _execute(
+    cls: type[Extension],
+    name: str,
+    agent: "Agent|None",
+    timings: dict[str, float],
+    deps: list[asyncio.Task],
+    kwargs: dict,
+):
+    for dep in deps:
+        await dep
+    start = time.perf_counter()
+    try:
         await cls(agent=agent).execute(**kwargs)
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def _get_timings(agent: "Agent") -> dict[str, dict[str, float]]:
+    timings = agent.get_data(DATA_NAME_TIMINGS)
+    if timings is None:
+        timings = {}
+        agent.set_data(DATA_NAME_TIMINGS, timings)
+    return timings
+
+
+def get_extension_timings(agent: "Agent") -> dict[str, dict[str, float]]:
+    """Seconds spent in each extension during the last call of each extension point."""
+    return _get_timings(agent)
 
 
 def _get_file_from_module(module_name: str) -> str:
@@ -94,46 +94,191 @@ from python.helpers.strings import sanitize_string
 
 
 def parse_file(_relative_path, _backup_dirs=None, _encoding="utf-8", **kwargs):
-    content = read_file(_relative_path, _backup_dirs, _encoding)
-    is_json = is_full_json_template(content)
-    content = remove_code_fences(content)
-    variables = load_plugin_variables(_relative_path, _backup_dirs) or {}  # type: ignore
-    variables.update(kwargs)
+    if _backup_dirs is None:
+        _backup_dirs = []
+    template = _get_template(_relative_path, _backup_dirs, _encoding)
+    variables = template.get_variables(_relative_path, _backup_dirs)
+    if variables or not template.is_static():
+        content = template.render(variables, _backup_dirs, _encoding)
+        is_json = is_full_json_template(content)
+        content = remove_code_fences(content)
+        variables.update(kwargs)
+        if is_json:
+            content = replace_placeholders_json(content, **variables)
+            return json.loads(content)
+        return replace_placeholders_text(content, **variables)
+
+    # without plugin variables the fenced-off template is compiled once
+    is_json, segments = template.get_parse_plan(_backup_dirs, _encoding)
     if is_json:
-        content = replace_placeholders_json(content, **variables)
-        obj = json.loads(content)
-        # obj = replace_placeholders_dict(obj, **variables)
-        return obj
-    else:
-        content = replace_placeholders_text(content, **variables)
-        return content
+        return json.loads(_render_segments(segments, kwargs, json.dumps))
+    return _render_segments(segments, kwargs, str)
 
 
 def read_file(_relative_path, _backup_dirs=None, _encoding="utf-8", **kwargs):
     if _backup_dirs is None:
         _backup_dirs = []
+    template = _get_template(_relative_path, _backup_dirs, _encoding)
+    variables = template.get_variables(_relative_path, _backup_dirs)
+    variables.update(kwargs)
+    # includes get the kwargs only, plugin variables are not inherited
+    return template.render(variables, _backup_dirs, _encoding, kwargs)
+
+
+_TEMPLATE_TOKEN_PATTERN = re.compile(
+    r"{{\s*include\s*['\"](.*?)['\"]\s*}}|{{(\w+)}}"
+)
+_TEXT, _VARIABLE, _INCLUDE = 0, 1, 2
+
+
+def _compile_segments(content: str, base_path: str, backup_dirs: list[str], deps: list):
+    """Split template text into literal, placeholder and resolved include segments."""
+    segments: list[tuple[int, str]] = []
+    pos = 0
+    for match in _TEMPLATE_TOKEN_PATTERN.finditer(content):
+        if match.start() > pos:
+            segments.append((_TEXT, content[pos : match.start()]))
+        if match.group(1) is not None:
+            path = _resolve_file(
+                os.path.join(base_path, match.group(1)), backup_dirs, deps
+            )
+            segments.append((_INCLUDE, path))
+        else:
+            segments.append((_VARIABLE, match.group(2)))
+        pos = match.end()
+    if pos < len(content):
+        segments.append((_TEXT, content[pos:]))
+    return segments
+
+
+def _render_segments(segments: list[tuple[int, str]], variables: dict, fmt) -> str:
+    parts = []
+    for kind, value in segments:
+        if kind == _TEXT:
+            parts.append(value)
+        elif value in variables:
+            parts.append(fmt(variables[value]))
+        else:
+            parts.append("{{" + value + "}}")
+    return "".join(parts)
 
-    # Try to get the absolute path for the file from the original directory or backup directories
-    absolute_path = find_file_in_dirs(_relative_path, _backup_dirs)
-
-    # Read the file content
-    with open(absolute_path, "r", encoding=_encoding) as f:
-        # content = remove_code_fences(f.read())
-        content = f.read()
 
-    variables = load_plugin_variables(_relative_path, _backup_dirs) or {}  # type: ignore
-    variables.update(kwargs)
+def _stat_mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
 
-    # Replace placeholders with values from kwargs
-    content = replace_placeholders_text(content, **variables)
 
-    # Process include statements
-    content = process_includes(
-        # here we use kwargs, the plugin variables are not inherited
-        content, os.path.dirname(_relative_path), _backup_dirs, **kwargs
+def _resolve_file(file_path: str, backup_dirs: list[str], deps: list) -> str:
+    # same lookup as find_file_in_dirs, recording every directory that was searched
+    # so a file added there later (e.g. a profile override) invalidates the template
+    candidates = [get_abs_path(file_path)] + [
+        get_abs_path(backup_dir, os.path.basename(file_path))
+        for backup_dir in backup_dirs
+    ]
+    for candidate in candidates:
+        deps.append((os.path.dirname(candidate), _stat_mtime(os.path.dirname(candidate))))
+        if os.path.isfile(candidate):
+            deps.append((candidate, _stat_mtime(candidate)))
+            return candidate
+    raise FileNotFoundError(
+        f"File '{file_path}' not found in the original path or backup directories."
     )
 
-    return content
+
+class _Template:
+    def __init__(self, relative_path: str, backup_dirs: list[str], encoding: str):
+        self.deps: list[tuple[str, int | None]] = []
+        self.path = _resolve_file(relative_path, backup_dirs, self.deps)
+        with open(self.path, "r", encoding=encoding) as f:
+            self.content = f.read()
+        self.segments = _compile_segments(
+            self.content, os.path.dirname(relative_path), backup_dirs, self.deps
+        )
+        self.plugins = self._load_plugins(relative_path, backup_dirs)
+        self.parse_plan: tuple[bool, list[tuple[int, str]]] | None = None
+
+    def _load_plugins(self, relative_path: str, backup_dirs: list[str]) -> list[type]:
+        if not relative_path.endswith(".md"):
+            return []
+        try:
+            plugin_file = _resolve_file(
+                get_abs_path(dirname(relative_path), basename(relative_path, ".md") + ".py"),
+                backup_dirs,
+                self.deps,
+            )
+        except FileNotFoundError:
+            return []
+        from python.helpers import extract_tools
+
+        return extract_tools.load_classes_from_file(
+            plugin_file, VariablesPlugin, one_per_file=False
+        )
+
+    def is_valid(self) -> bool:
+        return all(_stat_mtime(path) == mtime for path, mtime in self.deps)
+
+    def is_static(self) -> bool:
+        return not self.plugins and all(
+            kind != _INCLUDE for kind, _ in self.segments
+        )
+
+    def get_variables(self, relative_path: str, backup_dirs: list[str]) -> dict[str, Any]:
+        # plugin variables are dynamic, only the plugin class lookup is cached
+        for cls in self.plugins:
+            plugin = cls()
+            try:
+                return dict(plugin.get_variables(relative_path, backup_dirs) or {})  # type: ignore
+            except TypeError:
+                try:
+                    return dict(plugin.get_variables(relative_path) or {})  # type: ignore
+                except TypeError:
+                    return dict(plugin.get_variables() or {})  # type: ignore
+        return {}
+
+    def render(
+        self,
+        variables: dict,
+        backup_dirs: list[str],
+        encoding: str,
+        include_kwargs: dict | None = None,
+    ) -> str:
+        parts = []
+        for kind, value in self.segments:
+            if kind == _TEXT:
+                parts.append(value)
+            elif kind == _VARIABLE:
+                parts.append(
+                    str(variables[value]) if value in variables else "{{" + value + "}}"
+                )
+            else:
+                parts.append(
+                    read_file(value, backup_dirs, encoding, **(include_kwargs or {}))
+                )
+        return "".join(parts)
+
+    def get_parse_plan(self, backup_dirs: list[str], encoding: str):
+        if self.parse_plan is None:
+            content = self.render({}, backup_dirs, encoding)
+            is_json = is_full_json_template(content)
+            content = remove_code_fences(content)
+            self.parse_plan = (is_json, _compile_segments(content, "", [], []))
+        return self.parse_plan
+
+
+_template_cache: dict[tuple, _Template] = {}
+
+
+def _get_template(relative_path: str, backup_dirs: list[str], encoding: str) -> _Template:
+    """Compiled template for the path and profile (backup dirs), recompiled when
+    the file, its plugin, includes or searched directories change on disk."""
+    key = (relative_path, tuple(backup_dirs), encoding)
+    template = _template_cache.get(key)
+    if template is None or not template.is_valid():
+        template = _Template(relative_path, backup_dirs, encoding)
+        _template_cache[key] = template
+    return template
 
 
 def read_file_bin(_relative_path, _backup_dirs=None):
@@ -297,6 +442,26 @@ def write_file(relative_path: str, content: str, encoding: str = "utf-8"):
         f.write(content)
 
 
+def write_file_atomic(relative_path: str, content: str, encoding: str = "utf-8"):
+    """Write to a temporary file and rename it over the target, readers never
+    see a partially written file."""
+    abs_path = get_abs_path(relative_path)
+    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    content = sanitize_string(content, encoding)
+    tmp_path = f"{abs_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding=encoding) as f:
+        f.write(content)
+    os.replace(tmp_path, abs_path)
+
+
+def append_file(relative_path: str, content: str, encoding: str = "utf-8"):
+    abs_path = get_abs_path(relative_path)
+    os.makedirs(os.path.dirname(abs_path), exist_ok=True)
+    content = sanitize_string(content, encoding)
+    with open(abs_path, "a", encoding=encoding) as f:
+        f.write(content)
+
+
 def write_file_bin(relative_path: str, content: bytes):
     abs_path = get_abs_path(relative_path)
     os.makedirs(os.path.dirname(abs_path), exist_ok=True)
@@ -55,6 +55,16 @@ class Record:
     def output(self) -> list[OutputMessage]:
         pass
 
+    @abstractmethod
+    def get_last_no(self) -> int:
+        """Number of the newest message in the record, 0 if unknown"""
+        pass
+
+    @abstractmethod
+    def output_since(self, no: int) -> list[OutputMessage]:
+        """Output of the parts containing messages numbered above no"""
+        pass
+
     @abstractmethod
     async def summarize(self) -> str:
         pass
@@ -81,6 +91,7 @@ class Message(Record):
         self.content = content
         self.summary: str = ""
         self.tokens: int = tokens or self.calculate_tokens()
+        self.no: int = 0  # assigned by History.add_message, summaries take the newest summarized
 
     def get_tokens(self) -> int:
         if not self.tokens:
@@ -101,6 +112,12 @@ class Message(Record):
     def output(self):
         return [OutputMessage(ai=self.ai, content=self.summary or self.content)]
 
+    def get_last_no(self) -> int:
+        return self.no
+
+    def output_since(self, no: int) -> list[OutputMessage]:
+        return self.output() if self.no > no else []
+
     def output_langchain(self):
         return output_langchain(self.output())
 
@@ -114,6 +131,7 @@ class Message(Record):
             "content": self.content,
             "summary": self.summary,
             "tokens": self.tokens,
+            "no": self.no,
         }
 
     @staticmethod
@@ -122,6 +140,7 @@ class Message(Record):
         msg = Message(ai=data["ai"], content=content)
         msg.summary = data.get("summary", "")
         msg.tokens = data.get("tokens", 0)
+        msg.no = data.get("no", 0)
         return msg
 
 
@@ -131,6 +150,7 @@ class Topic(Record):
         self.summary: str = ""
         self.summary_tokens: int = 0
         self.messages: list[Message] = []
+        self._tokens: int | None = None  # cached sum of message tokens
 
     def get_tokens(self):
         if self.summary:
@@ -138,13 +158,20 @@ class Topic(Record):
                 self.summary_tokens = tokens.approximate_tokens(self.summary)
             return self.summary_tokens
         else:
-            return sum(msg.get_tokens() for msg in self.messages)
+            if self._tokens is None:
+                self._tokens = sum(msg.get_tokens() for msg in self.messages)
+            return self._tokens
+
+    def invalidate_tokens(self):
+        self._tokens = None
 
     def add_message(
         self, ai: bool, content: MessageContent, tokens: int = 0
     ) -> Message:
         msg = Message(ai=ai, content=content, tokens=tokens)
         self.messages.append(msg)
+        if self._tokens is not None:
+            self._tokens += msg.get_tokens()
         return msg
 
     def output(self) -> list[OutputMessage]:
@@ -154,6 +181,14 @@ class Topic(Record):
             msgs = [m for r in self.messages for m in r.output()]
             return msgs
 
+    def get_last_no(self) -> int:
+        return max((m.no for m in self.messages), default=0)
+
+    def output_since(self, no: int) -> list[OutputMessage]:
+        if self.summary:
+            return self.output() if self.get_last_no() > no else []
+        return [m for r in self.messages for m in r.output_since(no)]
+
     async def summarize(self):
         self.summary = await self.summarize_messages(self.messages)
         self.summary_tokens = tokens.approximate_tokens(self.summary)
@@ -205,6 +240,7 @@ class Topic(Record):
                 )
                 largest_msg.set_summary(_json_dumps(trunc))
 
+            self.invalidate_tokens()
             return True
 
         return False
@@ -225,7 +261,9 @@ class Topic(Record):
                 "fw.msg_summary.md", summary=summary
             )
             sum_msg = Message(False, sum_msg_content)
+            sum_msg.no = max(m.no for m in msg_to_sum)
             self.messages[1 : cnt_to_sum + 1] = [sum_msg]
+            self.invalidate_tokens()
             return True
         return False
 
@@ -264,6 +302,7 @@ class Bulk(Record):
         self.summary: str = ""
         self.summary_tokens: int = 0
         self.records: list[Record] = []
+        self._tokens: int | None = None  # cached sum of record tokens
 
     def get_tokens(self):
         if self.summary:
@@ -271,7 +310,12 @@ class Bulk(Record):
                 self.summary_tokens = tokens.approximate_tokens(self.summary)
             return self.summary_tokens
         else:
-            return sum([r.get_tokens() for r in self.records])
+            if self._tokens is None:
+                self._tokens = sum(r.get_tokens() for r in self.records)
+            return self._tokens
+
+    def invalidate_tokens(self):
+        self._tokens = None
 
     def output(
         self, human_label: str = "user", ai_label: str = "ai"
@@ -282,6 +326,14 @@ class Bulk(Record):
             msgs = [m for r in self.records for m in r.output()]
             return msgs
 
+    def get_last_no(self) -> int:
+        return max((r.get_last_no() for r in self.records), default=0)
+
+    def output_since(self, no: int) -> list[OutputMessage]:
+        if self.summary:
+            return self.output() if self.get_last_no() > no else []
+        return [m for r in self.records for m in r.output_since(no)]
+
     async def compress(self):
         return False
 
@@ -321,6 +373,13 @@ class History(Record):
         self.topics: list[Topic] = []
         self.current = Topic(history=self)
         self.agent: Agent = agent
+        # cached totals of closed topics and bulks, current topic caches its own
+        self._topics_tokens: int | None = None
+        self._bulks_tokens: int | None = None
+        # bumped on every change, chat persistence skips unchanged histories
+        self.version = 0
+        # number of the last added message, message numbers never repeat
+        self.counter = 0
 
     def get_tokens(self) -> int:
         return (
@@ -335,10 +394,19 @@ class History(Record):
         return total > limit
 
     def get_bulks_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.bulks)
+        if self._bulks_tokens is None:
+            self._bulks_tokens = sum(record.get_tokens() for record in self.bulks)
+        return self._bulks_tokens
 
     def get_topics_tokens(self) -> int:
-        return sum(record.get_tokens() for record in self.topics)
+        if self._topics_tokens is None:
+            self._topics_tokens = sum(record.get_tokens() for record in self.topics)
+        return self._topics_tokens
+
+    def invalidate_tokens(self):
+        self._topics_tokens = None
+        self._bulks_tokens = None
+        self.current.invalidate_tokens()
 
     def get_current_topic_tokens(self) -> int:
         return self.current.get_tokens()
@@ -346,10 +414,17 @@ class History(Record):
     def add_message(
         self, ai: bool, content: MessageContent, tokens: int = 0
     ) -> Message:
-        return self.current.add_message(ai, content=content, tokens=tokens)
+        self.version += 1
+        self.counter += 1
+        msg = self.current.add_message(ai, content=content, tokens=tokens)
+        msg.no = self.counter
+        return msg
 
     def new_topic(self):
         if self.current.messages:
+            self.version += 1
+            if self._topics_tokens is not None:
+                self._topics_tokens += self.current.get_tokens()
             self.topics.append(self.current)
             self.current = Topic(history=self)
 
@@ -360,11 +435,23 @@ class History(Record):
         result += self.current.output()
         return result
 
+    def get_last_no(self) -> int:
+        return self.counter
+
+    def output_since(self, no: int) -> list[OutputMessage]:
+        result: list[OutputMessage] = []
+        for record in [*self.bulks, *self.topics, self.current]:
+            result += record.output_since(no)
+        return result
+
     @staticmethod
     def from_dict(data: dict, history: "History"):
         history.bulks = [Bulk.from_dict(b, history=history) for b in data["bulks"]]
         history.topics = [Topic.from_dict(t, history=history) for t in data["topics"]]
         history.current = Topic.from_dict(data["current"], history=history)
+        history.counter = data.get("counter", 0)
+        history.invalidate_tokens()
+        history.version += 1
         return history
 
     def to_dict(self):
@@ -373,6 +460,7 @@ class History(Record):
             "bulks": [b.to_dict() for b in self.bulks],
             "topics": [t.to_dict() for t in self.topics],
             "current": self.current.to_dict(),
+            "counter": self.counter,
         }
 
     def serialize(self):
@@ -409,6 +497,7 @@ class History(Record):
 
             if compressed_part:
                 compressed = True
+                self.version += 1
                 continue
             else:
                 return compressed
@@ -418,6 +507,7 @@ class History(Record):
         for topic in self.topics:
             if not topic.summary:
                 await topic.summarize()
+                self._topics_tokens = None
                 return True
 
         # move oldest topic to bulks and summarize
@@ -430,6 +520,8 @@ class History(Record):
                 await bulk.summarize()
             self.bulks.append(bulk)
             self.topics.remove(topic)
+            self._topics_tokens = None
+            self._bulks_tokens = None
             return True
         return False
 
@@ -439,6 +531,7 @@ class History(Record):
         # remove oldest bulk if necessary
         if not compressed:
             self.bulks.pop(0)
+            self._bulks_tokens = None
             return True
         return compressed
 
@@ -454,6 +547,7 @@ class History(Record):
             ]
         )
         self.bulks = bulks
+        self._bulks_tokens = None
         return True
 
     async def merge_bulks(self, bulks: list[Bulk]) -> Bulk:
@@ -548,6 +642,51 @@ def output_langchain(messages: list[OutputMessage]):
     return result
 
 
+class LangchainOutputCache:
+    """Converts output messages to LangChain format, reusing conversions and
+    token counts of messages that were already converted in the last call."""
+
+    TEXTS_KEEP_COUNT = 32
+
+    def __init__(self):
+        self._entries: dict[tuple, tuple[MessageContent, BaseMessage, int]] = {}
+        self._texts: dict[str, int] = {}
+
+    @staticmethod
+    def _key(output: OutputMessage) -> tuple:
+        content = output["content"]
+        # strings are keyed by value (their hash is cached), structures by identity
+        if isinstance(content, str):
+            return (output["ai"], content)
+        return (output["ai"], id(content))
+
+    def convert(self, messages: list[OutputMessage]) -> tuple[list[BaseMessage], int]:
+        entries: dict[tuple, tuple[MessageContent, BaseMessage, int]] = {}
+        result: list[BaseMessage] = []
+        total = 0
+        for m in messages:
+            content = m["content"]
+            key = self._key(m)
+            entry = entries.get(key) or self._entries.get(key)
+            if entry is None or not (entry[0] is content or entry[0] == content):
+                msg = output_langchain([m])[0]
+                text = output_text([m], human_label="user")  # same as Message.calculate_tokens
+                entry = (content, msg, tokens.approximate_tokens(text))
+            entries[key] = entry
+            result.append(entry[1])
+            total += entry[2]
+        # keep only what the current prompt uses
+        self._entries = entries
+        return group_messages_abab(result), total
+
+    def count_tokens(self, text: str) -> int:
+        if text not in self._texts:
+            if len(self._texts) >= self.TEXTS_KEEP_COUNT:
+                self._texts.clear()
+            self._texts[text] = tokens.approximate_tokens(text)
+        return self._texts[text]
+
+
 def output_text(messages: list[OutputMessage], ai_label="ai", human_label="human"):
     return "\n".join(_stringify_output(o, ai_label, human_label) for o in messages)
 
@@ -3,7 +3,7 @@ from datetime import datetime
 import time
 from python.helpers.task_scheduler import TaskScheduler
 from python.helpers.print_style import PrintStyle
-from python.helpers import errors
+from python.helpers import errors, persist_chat
 from python.helpers import runtime
 
 
@@ -40,6 +40,10 @@ async def run_loop():
                 await scheduler_tick(interval=elapsed)
             except Exception as e:
                 PrintStyle().error(errors.format_error(e))
+        try:
+            persist_chat.evict_idle_chats()
+        except Exception as e:
+            PrintStyle().error(errors.format_error(e))
         await asyncio.sleep(SLEEP_TIME)
 
 
@@ -1,6 +1,7 @@
 import glob
 import os
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Literal, TypedDict
 from langchain_community.document_loaders import (
     CSVLoader,
@@ -13,6 +14,21 @@ from python.helpers.print_style import PrintStyle
 
 text_loader_kwargs = {"autodetect_encoding": True}
 
+# files are hashed, loaded and split on this many threads
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# Mapping file extensions to corresponding loader classes
+# Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
+file_types_loaders = {
+    "txt": TextLoader,
+    "pdf": PyPDFLoader,
+    "csv": CSVLoader,
+    "html": UnstructuredHTMLLoader,
+    "json": TextLoader,  # Use TextLoader for better consolidation compatibility
+    "md": TextLoader,    # Use TextLoader for better consolidation compatibility
+}
+
 
 class KnowledgeImport(TypedDict):
     file: str
@@ -20,16 +36,64 @@ class KnowledgeImport(TypedDict):
     ids: list[str]
     state: Literal["changed", "original", "removed"]
     documents: list[Any]
+    # stat of the file when checksum was computed, unchanged stat means unchanged file
+    mtime: int
+    size: int
+    inode: int
 
 
 def calculate_checksum(file_path: str) -> str:
     hasher = hashlib.md5()
     with open(file_path, "rb") as f:
-        buf = f.read()
-        hasher.update(buf)
+        while chunk := f.read(CHECKSUM_CHUNK_SIZE):
+            hasher.update(chunk)
     return hasher.hexdigest()
 
 
+def get_file_stat(file_path: str) -> dict[str, int]:
+    stat = os.stat(file_path)
+    return {"mtime": stat.st_mtime_ns, "size": stat.st_size, "inode": stat.st_ino}
+
+
+def _is_unchanged(file_data: dict[str, Any], stat: dict[str, int]) -> bool:
+    return bool(file_data.get("checksum")) and all(
+        file_data.get(key) == value for key, value in stat.items()
+    )
+
+
+def _import_file(
+    file_path: str, ext: str, checksum: str, metadata: dict[str, Any]
+) -> tuple[str, list[Any] | None]:
+    """Hash the file and load its documents if the checksum differs,
+    returns the new checksum and None for unchanged content."""
+    new_checksum = calculate_checksum(file_path)
+    if new_checksum == checksum:
+        return new_checksum, None
+
+    loader_cls = file_types_loaders[ext]
+    loader = loader_cls(
+        file_path,
+        **(text_loader_kwargs if ext in ["txt", "csv", "html", "md"] else {}),
+    )
+    documents = loader.load_and_split()
+
+    # Enhanced metadata for better consolidation compatibility
+    enhanced_metadata = {
+        **metadata,
+        "source_file": os.path.basename(file_path),
+        "source_path": file_path,
+        "file_type": ext,
+        "knowledge_source": True,  # Flag to distinguish from conversation memories
+        "import_timestamp": None,  # Will be set when inserted into memory
+    }
+
+    # Apply metadata to all documents
+    for doc in documents:
+        doc.metadata = {**doc.metadata, **enhanced_metadata}
+
+    return new_checksum, documents
+
+
 def load_knowledge(
     log_item: LogItem | None,
     knowledge_dir: str,
@@ -42,21 +106,14 @@ def load_knowledge(
 
     This function now includes enhanced error handling and compatibility with the
     intelligent memory consolidation system.
-    """
 
-    # Mapping file extensions to corresponding loader classes
-    # Note: Using TextLoader for JSON and MD to avoid parsing issues with consolidation
-    file_types_loaders = {
-        "txt": TextLoader,
-        "pdf": PyPDFLoader,
-        "csv": CSVLoader,
-        "html": UnstructuredHTMLLoader,
-        "json": TextLoader,  # Use TextLoader for better consolidation compatibility
-        "md": TextLoader,    # Use TextLoader for better consolidation compatibility
-    }
+    Files whose mtime, size and inode match the index are skipped without
+    reading them, the others are hashed and, if changed, loaded in parallel.
+    """
 
     cnt_files = 0
     cnt_docs = 0
+    cnt_skipped = 0
 
     # Validate and create knowledge directory if needed
     if not knowledge_dir:
@@ -113,6 +170,8 @@ def load_knowledge(
                 progress=f"\nFound {len(kn_files)} knowledge files in {knowledge_dir}, processing...",
             )
 
+    # fast path: files with unchanged stat keep their entry without being read
+    candidates: list[tuple[str, str, dict[str, int], KnowledgeImport]] = []
     for file_path in kn_files:
         try:
             # Get file extension safely
@@ -124,11 +183,8 @@ def load_knowledge(
             if ext not in file_types_loaders:
                 continue  # Skip unsupported file types
 
-            checksum = calculate_checksum(file_path)
-            if not checksum:
-                continue  # Skip files with checksum errors
-
             file_key = file_path
+            stat = get_file_stat(file_path)
 
             # Load existing data from the index or create a new entry
             file_data: KnowledgeImport = index.get(file_key, {
@@ -137,61 +193,62 @@ def load_knowledge(
                 "ids": [],
                 "state": "changed",
                 "documents": []
-            })
+            })  # type: ignore
 
-            # Check if file has changed
-            if file_data.get("checksum") == checksum:
+            if _is_unchanged(file_data, stat):
                 file_data["state"] = "original"
+                index[file_key] = file_data
+                cnt_skipped += 1
             else:
-                file_data["state"] = "changed"
-
-            # Process changed files
-            if file_data["state"] == "changed":
-                file_data["checksum"] = checksum
-                loader_cls = file_types_loaders[ext]
-
-                try:
-                    loader = loader_cls(
-                        file_path,
-                        **(
-                            text_loader_kwargs
-                            if ext in ["txt", "csv", "html", "md"]
-                            else {}
-                        ),
-                    )
-                    documents = loader.load_and_split()
-
-                    # Enhanced metadata for better consolidation compatibility
-                    enhanced_metadata = {
-                        **metadata,
-                        "source_file": os.path.basename(file_path),
-                        "source_path": file_path,
-                        "file_type": ext,
-                        "knowledge_source": True,  # Flag to distinguish from conversation memories
-                        "import_timestamp": None,  # Will be set when inserted into memory
-                    }
-
-                    # Apply metadata to all documents
-                    for doc in documents:
-                        doc.metadata = {**doc.metadata, **enhanced_metadata}
-
-                    file_data["documents"] = documents
-                    cnt_files += 1
-                    cnt_docs += len(documents)
-
-                except Exception as e:
-                    PrintStyle(font_color="red").print(f"Error loading {file_path}: {e}")
-                    if log_item:
-                        log_item.stream(progress=f"\nError loading {os.path.basename(file_path)}: {e}")
-                    continue
-
-            # Update the index
-            index[file_key] = file_data
+                candidates.append((file_path, ext, stat, file_data))
 
         except Exception as e:
             PrintStyle(font_color="red").print(f"Error processing {file_path}: {e}")
             continue
 
+    # hash candidates and load changed ones on worker threads
+    def import_candidate(candidate):
+        file_path, ext, _, file_data = candidate
+        try:
+            return _import_file(file_path, ext, file_data.get("checksum", ""), metadata)
+        except Exception as e:
+            return e
+
+    if candidates:
+        with ThreadPoolExecutor(
+            max_workers=LOAD_WORKERS, thread_name_prefix="KnowledgeImport"
+        ) as executor:
+            results = list(executor.map(import_candidate, candidates))
+    else:
+        results = []
+
+    for (file_path, ext, stat, file_data), result in zip(candidates, results):
+        if isinstance(result, Exception):
+            # keep the previous entry and its documents, the file is retried next time
+            PrintStyle(font_color="red").print(f"Error loading {file_path}: {result}")
+            if log_item:
+                log_item.stream(progress=f"\nError loading {os.path.basename(file_path)}: {result}")
+            if file_data.get("checksum"):
+                file_data["state"] = "original"
+                index[file_path] = file_data
+            continue
+
+        checksum, documents = result
+        file_data.update(stat)  # type: ignore
+        if documents is None:
+            # touched but same content
+            file_data["state"] = "original"
+            cnt_skipped += 1
+        else:
+            file_data["checksum"] = checksum
+            file_data["state"] = "changed"
+            file_data["documents"] = documents
+            cnt_files += 1
+            cnt_docs += len(documents)
+
+        # Update the index
+        index[file_path] = file_data
+
     # Mark removed files
     current_files = set(kn_files)
     for file_key, file_data in list(index.items()):
@@ -199,11 +256,13 @@ def load_knowledge(
             index[file_key]["state"] = "removed"
 
     # Log results
-    if cnt_files > 0 or cnt_docs > 0:
-        PrintStyle.standard(f"Processed {cnt_docs} documents from {cnt_files} files.")
+    if cnt_files > 0 or cnt_docs > 0 or cnt_skipped > 0:
+        report = (
+            f"Processed {cnt_docs} documents from {cnt_files} changed files, "
+            f"skipped {cnt_skipped} unchanged files."
+        )
+        PrintStyle.standard(report)
         if log_item:
-            log_item.stream(
-                progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files."
-            )
+            log_item.stream(progress=f"\n{report}")
 
     return index
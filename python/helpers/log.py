@@ -1,9 +1,11 @@
 from dataclasses import dataclass, field
 import json
+import threading
 from typing import Any, Literal, Optional, Dict
 import uuid
 from collections import OrderedDict  # Import OrderedDict
 from python.helpers.strings import truncate_text_by_ratio
+from python.helpers import change_feed
 
 Type = Literal[
     "agent",
@@ -102,6 +104,13 @@ class LogItem:
     kvps: Optional[OrderedDict] = None  # Use OrderedDict for kvps
     id: Optional[str] = None  # Add id field
     guid: str = ""
+    _buffers: dict[str, list[str]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    # the agent loop writes while poll requests and the chat writer read
+    _lock: threading.RLock = field(
+        default_factory=threading.RLock, init=False, repr=False, compare=False
+    )
 
     def __post_init__(self):
         self.guid = self.log.guid
@@ -134,33 +143,97 @@ class LogItem:
         content: str | None = None,
         **kwargs,
     ):
-        if heading is not None:
-            self.update(heading=self.heading + heading)
-        if content is not None:
-            self.update(content=self.content + content)
-
-        for k, v in kwargs.items():
-            prev = self.kvps.get(k, "") if self.kvps else ""
-            self.update(**{k: prev + v})
+        with self._lock:
+            if heading is not None:
+                self.update(heading=self.heading + heading)
+            if self.guid != self.log.guid:
+                return
+
+            # content and kvps chunks are buffered and joined on the next output
+            if content is not None:
+                self._buffers.setdefault("content", []).append(content)
+            for k, v in kwargs.items():
+                self._buffers.setdefault(k, []).append(v)
+        if content is not None or kwargs:
+            self.log._stream_item(self.no)
+
+    def flush(self):
+        """Apply buffered stream chunks, call before reading streamed fields."""
+        with self._lock:
+            if not self._buffers:
+                return
+            buffers, self._buffers = self._buffers, {}
+            content = buffers.pop("content", None)
+            if content is not None:
+                self.content = _truncate_content(self.content + "".join(content))
+            if buffers:
+                if self.kvps is None:
+                    self.kvps = OrderedDict()
+                for k, parts in buffers.items():
+                    key = _truncate_key(k)
+                    self.kvps[key] = _truncate_value(self.kvps.get(key, "") + "".join(parts))
 
     def output(self):
-        return {
-            "no": self.no,
-            "id": self.id,  # Include id in output
-            "type": self.type,
-            "heading": self.heading,
-            "content": self.content,
-            "temp": self.temp,
-            "kvps": self.kvps,
-        }
+        with self._lock:
+            self.flush()
+            return {
+                "no": self.no,
+                "id": self.id,  # Include id in output
+                "type": self.type,
+                "heading": self.heading,
+                "content": self.content,
+                "temp": self.temp,
+                # copied, the agent loop keeps updating the item's kvps
+                "kvps": OrderedDict(self.kvps) if self.kvps is not None else None,
+            }
+
+
+class UpdateJournal:
+    """Log items changed since a client cursor. Repeated updates of one item
+    collapse into a single entry, so the size is bounded by the item count
+    and not by the number of streamed chunks."""
+
+    def __init__(self):
+        self.count = 0  # updates recorded so far, used as the client cursor
+        self._last: dict[int, int] = {}  # item no -> last update, oldest first
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, no: int):
+        self.count += 1
+        self._last.pop(no, None)
+        self._last[no] = self.count
+
+    def since(self, start: int = 0, end: int | None = None) -> list[int]:
+        """Numbers of items updated after start (and last updated by end)."""
+        try:
+            changed = self._changed_since(reversed(self._last.items()), start, end)
+        except RuntimeError:
+            # updated by another thread meanwhile, walk a snapshot instead
+            changed = self._changed_since(reversed(list(self._last.items())), start, end)
+        changed.sort()
+        return changed
+
+    @staticmethod
+    def _changed_since(items, start: int, end: int | None) -> list[int]:
+        changed = []
+        for no, last in items:
+            if last <= start:
+                break
+            if end is None or last <= end:
+                changed.append(no)
+        return changed
 
 
 class Log:
 
     def __init__(self):
         self.guid: str = str(uuid.uuid4())
-        self.updates: list[int] = []
+        self.updates = UpdateJournal()
         self.logs: list[LogItem] = []
+        # changes on any mutation incl. progress, unique across logs
+        self.version: int = 0
         self.set_initial_progress()
 
     def log(
@@ -206,8 +279,9 @@ class Log:
             id=id,  # Pass id to LogItem
         )
         self.logs.append(item)
-        self.updates += [item.no]
+        self.updates.append(item.no)
         self._update_progress_from_item(item)
+        self._changed()
         return item
 
     def _update_item(
@@ -222,38 +296,45 @@ class Log:
         **kwargs,
     ):
         item = self.logs[no]
-        # Apply truncation where necessary
-        if type is not None:
-            item.type = type
-
-        if update_progress is not None:
-            item.update_progress = update_progress
-
-        if heading is not None:
-            item.heading = _truncate_heading(heading)
-
-        if content is not None:
-            item.content = _truncate_content(content)
-
-        if kvps is not None:
-            # No need to deepcopy, _truncate_value creates new copies
-            item.kvps = OrderedDict({
-                _truncate_key(k): _truncate_value(v) for k, v in kvps.items()
-            })  # Ensure order
-
-        if temp is not None:
-            item.temp = temp
-
-        if kwargs:
-            # No need to deepcopy, _truncate_value creates new copies
-            if item.kvps is None:
-                item.kvps = OrderedDict()  # Ensure kvps is an OrderedDict
-            for k, v in kwargs.items():
-                item.kvps[_truncate_key(k)] = _truncate_value(v)
-
-
-        self.updates += [item.no]
+        with item._lock:
+            item.flush()
+            # Apply truncation where necessary
+            if type is not None:
+                item.type = type
+
+            if update_progress is not None:
+                item.update_progress = update_progress
+
+            if heading is not None:
+                item.heading = _truncate_heading(heading)
+
+            if content is not None:
+                item.content = _truncate_content(content)
+
+            if kvps is not None:
+                # No need to deepcopy, _truncate_value creates new copies
+                item.kvps = OrderedDict({
+                    _truncate_key(k): _truncate_value(v) for k, v in kvps.items()
+                })  # Ensure order
+
+            if temp is not None:
+                item.temp = temp
+
+            if kwargs:
+                # No need to deepcopy, _truncate_value creates new copies
+                if item.kvps is None:
+                    item.kvps = OrderedDict()  # Ensure kvps is an OrderedDict
+                for k, v in kwargs.items():
+                    item.kvps[_truncate_key(k)] = _truncate_value(v)
+
+        self.updates.append(item.no)
         self._update_progress_from_item(item)
+        self._changed()
+
+    def _stream_item(self, no: int):
+        self.updates.append(no)
+        self._update_progress_from_item(self.logs[no])
+        self._changed()
 
     def set_progress(self, progress: str, no: int = 0, active: bool = True):
         self.progress = _truncate_progress(progress)
@@ -261,28 +342,20 @@ class Log:
             no = len(self.logs)
         self.progress_no = no
         self.progress_active = active
+        self._changed()
+
+    def _changed(self):
+        self.version = change_feed.notify()
 
     def set_initial_progress(self):
         self.set_progress("Waiting for input", 0, False)
 
     def output(self, start=None, end=None):
-        if start is None:
-            start = 0
-        if end is None:
-            end = len(self.updates)
-
-        out = []
-        seen = set()
-        for update in self.updates[start:end]:
-            if update not in seen:
-                out.append(self.logs[update].output())
-                seen.add(update)
-
-        return out
+        return [self.logs[no].output() for no in self.updates.since(start or 0, end)]
 
     def reset(self):
         self.guid = str(uuid.uuid4())
-        self.updates = []
+        self.updates = UpdateJournal()
         self.logs = []
         self.set_initial_progress()
 
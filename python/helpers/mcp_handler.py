@@ -21,6 +21,7 @@ from contextlib import AsyncExitStack
 from shutil import which
 from datetime import timedelta
 import json
+import hashlib
 from python.helpers import errors
 from python.helpers import settings
 from python.helpers import files
@@ -29,8 +30,15 @@ from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
 from mcp.shared.message import SessionMessage
-from mcp.types import CallToolResult, ListToolsResult
+from mcp.types import (
+    CONNECTION_CLOSED,
+    INVALID_REQUEST,
+    PARSE_ERROR,
+    CallToolResult,
+    ListToolsResult,
+)
 from anyio.streams.memory import (
     MemoryObjectReceiveStream,
     MemoryObjectSendStream,
@@ -41,6 +49,17 @@ from python.helpers import dirty_json
 from python.helpers.files import read_file, replace_placeholders_text
 from python.helpers.print_style import PrintStyle
 from python.helpers.tool import Tool, Response
+from python.helpers.mcp_pool import SessionPool, unwrap_exception
+
+# read timeout of the SSE stream of a pooled remote session, tool calls use
+# their own timeout, this only bounds how long an idle stream may stay silent
+SESSION_READ_TIMEOUT = 300
+# listing tools (connect, initialize, list, one retry) may take this many init timeouts,
+# a server that does not answer by then is reported as failed and does not block others
+TOOLS_UPDATE_TIMEOUT_FACTOR = 2
+# McpError codes of a closed transport, broken framing or a request timeout (HTTP 408),
+# the pooled session is replaced, other McpErrors are answers of a healthy session
+SESSION_ERROR_CODES = {CONNECTION_CLOSED, PARSE_ERROR, INVALID_REQUEST, 408}
 
 
 def normalize_name(name: str) -> str:
@@ -267,16 +286,31 @@ class MCPServerRemote(BaseModel):
         with self.__lock:
             return self.__client.has_tool(tool_name)  # type: ignore
 
+    def get_metrics(self) -> dict[str, Any]:
+        with self.__lock:
+            return self.__client.get_metrics()  # type: ignore
+
+    def get_catalog_hash(self) -> str:
+        """Hash of the current tool list, changes whenever the tools do"""
+        with self.__lock:
+            return self.__client.catalog_hash  # type: ignore
+
     async def call_tool(
         self, tool_name: str, input_data: Dict[str, Any]
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # the lock is not held while waiting, calls to one server run concurrently
+        return await client.call_tool(tool_name, input_data)  # type: ignore
+
+    async def close(self):
+        """Close the pooled sessions of the server"""
+        await self.__client.close()  # type: ignore
 
     async def update(self, config: dict[str, Any]) -> "MCPServerRemote":
         self._apply_config_sync(config)
+        await self.close()  # sessions were opened with the old config
         return await self.__on_update()
 
     async def initialize(self):
@@ -348,16 +382,31 @@ class MCPServerLocal(BaseModel):
         with self.__lock:
             return self.__client.has_tool(tool_name)  # type: ignore
 
+    def get_metrics(self) -> dict[str, Any]:
+        with self.__lock:
+            return self.__client.get_metrics()  # type: ignore
+
+    def get_catalog_hash(self) -> str:
+        """Hash of the current tool list, changes whenever the tools do"""
+        with self.__lock:
+            return self.__client.catalog_hash  # type: ignore
+
     async def call_tool(
         self, tool_name: str, input_data: Dict[str, Any]
     ) -> CallToolResult:
         """Call a tool with the given input data"""
         with self.__lock:
-            # We already run in an event loop, dont believe Pylance
-            return await self.__client.call_tool(tool_name, input_data)  # type: ignore
+            client = self.__client
+        # the lock is not held while waiting, calls to one server run concurrently
+        return await client.call_tool(tool_name, input_data)  # type: ignore
+
+    async def close(self):
+        """Close the pooled sessions of the server"""
+        await self.__client.close()  # type: ignore
 
     async def update(self, config: dict[str, Any]) -> "MCPServerLocal":
         self._apply_config_sync(config)
+        await self.close()  # sessions were opened with the old config
         return await self.__on_update()
 
     async def initialize(self):
@@ -383,6 +432,10 @@ class MCPConfig(BaseModel):
     __lock: ClassVar[threading.Lock] = PrivateAttr(default=threading.Lock())
     __instance: ClassVar[Any] = PrivateAttr(default=None)
     __initialized: ClassVar[bool] = PrivateAttr(default=False)
+    # rendered tools prompt per server and combined, keyed by catalog hashes,
+    # kept across config updates so unchanged servers are not re-rendered
+    __prompt_fragments: ClassVar[dict[str, tuple[str, str]]] = {}
+    __prompt_cache: ClassVar[tuple[tuple, str]] = ((), "")
 
     @classmethod
     def get_instance(cls) -> "MCPConfig":
@@ -439,10 +492,20 @@ class MCPConfig(BaseModel):
 
             # Initialize/update the singleton instance with the (potentially empty) list of server data
             instance = cls.get_instance()
+            previous_servers = list(instance.servers)
 
             # Option 1: Re-initialize the existing instance (if __init__ is idempotent for other fields)
             # This is synchronous and creates the server objects
             instance.__init__(servers_list=servers_data)
+            # forget rendered prompts of servers that were removed
+            names = {server.name for server in instance.servers}
+            for name in MCPConfig.__prompt_fragments.keys() - names:
+                del MCPConfig.__prompt_fragments[name]
+
+            # stop sessions (and local server processes) of the replaced servers
+            await asyncio.gather(
+                *(server.close() for server in previous_servers), return_exceptions=True
+            )
 
             # Mark as initialized
             cls.__initialized = True
@@ -583,8 +646,10 @@ class MCPConfig(BaseModel):
                 )
 
     async def initialize_servers(self):
-        """Initialize all servers (fetch tools) asynchronously."""
-        # Using gather to initialize in parallel
+        """Initialize all servers (fetch tools) concurrently."""
+        # Each server bounds its own tools update by its init timeout (see
+        # MCPClientBase.update_tools), so a slow or hanging server only delays
+        # the whole initialization by its own timeout, not by the sum of all.
         # We need to be careful with logging if multiple threads/tasks print at once
         # but PrintStyle seems to handle it OK
 
@@ -621,6 +686,8 @@ class MCPConfig(BaseModel):
                 error = server.get_error()
                 # get log bool
                 has_log = server.get_log() != ""
+                # call latencies and pooled sessions
+                metrics = server.get_metrics()
 
                 # add server status to result
                 result.append(
@@ -630,6 +697,7 @@ class MCPConfig(BaseModel):
                         "error": error,
                         "tool_count": tool_count,
                         "has_log": has_log,
+                        "latency": metrics,
                     }
                 )
 
@@ -679,13 +747,12 @@ class MCPConfig(BaseModel):
             return tools
 
     def get_tools_prompt(self, server_name: str = "") -> str:
-        """Get a prompt for all tools"""
+        """Get a prompt for all tools, re-rendered only when a catalog changes"""
 
         # just to wait for pending initialization
         with self.__lock:
             pass
 
-        prompt = '## "Remote (MCP Server) Agent Tools" available:\n\n'
         server_names = []
         for server in self.servers:
             if not server_name or server.name == server_name:
@@ -694,47 +761,73 @@ class MCPConfig(BaseModel):
         if server_name and server_name not in server_names:
             raise ValueError(f"Server {server_name} not found")
 
-        usage_template = read_file("prompts/agent.system.mcp_tool_usage.md")
         usage_template = files.read_file("prompts/agent.system.mcp_tool_usage.md")
 
+        fragments: list[tuple[str, str]] = []
         for server in self.servers:
             if server.name in server_names:
-                server_name = server.name
-                prompt += f"### {server_name}\n"
-                prompt += f"{server.description}\n"
-                tools = server.get_tools()
-
-                for tool in tools:
-                    prompt += (
-                        f"\n### {server_name}.{tool['name']}:\n"
-                        f"{tool['description']}\n\n"
-                        # f"#### Categories:\n"
-                        # f"* kind: MCP Server Tool\n"
-                        # f'* server: "{server_name}" ({server.description})\n\n'
-                        # f"#### Arguments:\n"
-                    )
+                fragments.append(self._get_prompt_fragment(server, usage_template))
 
-                    input_schema = (
-                        json.dumps(tool["input_schema"]) if tool["input_schema"] else ""
-                    )
+        cache_key = tuple(key for key, _ in fragments)
+        cached_key, cached_prompt = MCPConfig.__prompt_cache
+        if cached_key == cache_key:
+            return cached_prompt
 
-                    prompt += f"#### Input schema for tool_args:\n{input_schema}\n"
+        prompt = '## "Remote (MCP Server) Agent Tools" available:\n\n'
+        prompt += "".join(fragment for _, fragment in fragments)
+        MCPConfig.__prompt_cache = (cache_key, prompt)
+        return prompt
 
-                    prompt += "\n"
+    def _get_prompt_fragment(
+        self, server: MCPServer, usage_template: str
+    ) -> tuple[str, str]:
+        """Prompt section of one server with its cache key"""
+        key = _hash_text(
+            json.dumps(
+                [server.name, server.description, server.get_catalog_hash(), usage_template]
+            )
+        )
+        cached = MCPConfig.__prompt_fragments.get(server.name)
+        if cached and cached[0] == key:
+            return cached
+
+        server_name = server.name
+        prompt = f"### {server_name}\n"
+        prompt += f"{server.description}\n"
+        tools = server.get_tools()
+
+        for tool in tools:
+            prompt += (
+                f"\n### {server_name}.{tool['name']}:\n"
+                f"{tool['description']}\n\n"
+                # f"#### Categories:\n"
+                # f"* kind: MCP Server Tool\n"
+                # f'* server: "{server_name}" ({server.description})\n\n'
+                # f"#### Arguments:\n"
+            )
 
-                    usage_str = replace_placeholders_text(
-                        usage_template, tool_name=f"{server_name}.{tool['name']}"
-                    )
-                    prompt += f"#### Usage:\n{usage_str}\n"
-                    tool_usage = files.replace_placeholders_text(
-                        usage_template,
-                        tool_name=f"{server_name}.{tool['name']}",
-                        observations="",
-                        reflection="",
-                    )
-                    prompt += tool_usage + "\n"
+            input_schema = (
+                json.dumps(tool["input_schema"]) if tool["input_schema"] else ""
+            )
 
-        return prompt
+            prompt += f"#### Input schema for tool_args:\n{input_schema}\n"
+
+            prompt += "\n"
+
+            usage_str = replace_placeholders_text(
+                usage_template, tool_name=f"{server_name}.{tool['name']}"
+            )
+            prompt += f"#### Usage:\n{usage_str}\n"
+            tool_usage = files.replace_placeholders_text(
+                usage_template,
+                tool_name=f"{server_name}.{tool['name']}",
+                observations="",
+                reflection="",
+            )
+            prompt += tool_usage + "\n"
+
+        MCPConfig.__prompt_fragments[server.name] = (key, prompt)
+        return key, prompt
 
     def has_tool(self, tool_name: str) -> bool:
         """Check if a tool is available"""
@@ -760,28 +853,55 @@ class MCPConfig(BaseModel):
             raise ValueError(f"Tool {tool_name} not found")
         server_name_part, tool_name_part = tool_name.split(".")
         with self.__lock:
-            for server in self.servers:
-                if server.name == server_name_part and server.has_tool(tool_name_part):
-                    return await server.call_tool(tool_name_part, input_data)
+            server = next(
+                (
+                    server for server in self.servers
+                    if server.name == server_name_part and server.has_tool(tool_name_part)
+                ),
+                None,
+            )
+        if server is None:
             raise ValueError(f"Tool {tool_name} not found")
+        # the lock is not held while waiting, tool calls run concurrently
+        return await server.call_tool(tool_name_part, input_data)
 
 
 T = TypeVar("T")
 
 
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _catalog_hash(tools: List[dict[str, Any]]) -> str:
+    return _hash_text(json.dumps(tools, sort_keys=True, default=str))
+
+
+def _is_application_error(e: BaseException) -> bool:
+    """An error response of the server, the session that got it is still usable"""
+    return isinstance(e, McpError) and e.error.code not in SESSION_ERROR_CODES
+
+
 class MCPClientBase(ABC):
     # server: Union[MCPServerLocal, MCPServerRemote] # Defined in __init__
     # tools: List[dict[str, Any]] # Defined in __init__
-    # No self.session, self.exit_stack, self.stdio, self.write as persistent instance fields
+    # pool: long-lived sessions, owned by tasks on the MCP session loop (see mcp_pool)
 
     __lock: ClassVar[threading.Lock] = threading.Lock()
 
     def __init__(self, server: Union[MCPServerLocal, MCPServerRemote]):
         self.server = server
         self.tools: List[dict[str, Any]] = []  # Tools are cached on the client instance
+        self.catalog_hash: str = _catalog_hash(self.tools)
         self.error: str = ""
         self.log: List[str] = []
         self.log_file: Optional[TextIO] = None
+        # long-lived sessions reused across calls, reconnected when broken
+        self.pool: SessionPool[ClientSession] = SessionPool(
+            self._open_session,
+            ping=lambda session: session.send_ping(),
+            application_error=_is_application_error,
+        )
 
     # Protected method
     @abstractmethod
@@ -794,68 +914,47 @@ class MCPClientBase(ABC):
         """Create stdio/write streams using the provided exit_stack."""
         ...
 
+    async def _open_session(self, exit_stack: AsyncExitStack) -> ClientSession:
+        """Open transport and session, both stay open until exit_stack closes."""
+        set = settings.get_settings()
+        read_timeout_seconds = self.server.init_timeout or set["mcp_client_init_timeout"]
+        stdio, write = await self._create_stdio_transport(exit_stack)
+        session = await exit_stack.enter_async_context(
+            ClientSession(
+                stdio,  # type: ignore
+                write,  # type: ignore
+                read_timeout_seconds=timedelta(seconds=read_timeout_seconds),
+            )
+        )
+        await session.initialize()
+        return session
+
     async def _execute_with_session(
         self,
         coro_func: Callable[[ClientSession], Awaitable[T]],
-        read_timeout_seconds=60,
+        retry: bool = False,
     ) -> T:
         """
-        Manages the lifecycle of an MCP session for a single operation.
-        Creates a temporary session, executes coro_func with it, and ensures cleanup.
+        Executes coro_func with a pooled session of the server.
+        The session is reused by later operations, broken sessions are replaced.
         """
         operation_name = coro_func.__name__  # For logging
-        # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Creating new session for operation '{operation_name}'...")
-        # Store the original exception outside the async block
-        original_exception = None
         try:
-            async with AsyncExitStack() as temp_stack:
-                try:
-
-                    stdio, write = await self._create_stdio_transport(temp_stack)
-                    # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name} - {operation_name}): Transport created. Initializing session...")
-                    session = await temp_stack.enter_async_context(
-                        ClientSession(
-                            stdio,  # type: ignore
-                            write,  # type: ignore
-                            read_timeout_seconds=timedelta(
-                                seconds=read_timeout_seconds
-                            ),
-                        )
-                    )
-                    await session.initialize()
-
-                    result = await coro_func(session)
-
-                    return result
-                except Exception as e:
-                    # Store the original exception and raise a dummy exception
-                    excs = getattr(e, "exceptions", None)  # Python 3.11+ ExceptionGroup
-                    if excs:
-                        original_exception = excs[0]
-                    else:
-                        original_exception = e
-                    # Create a dummy exception to break out of the async block
-                    raise RuntimeError("Dummy exception to break out of async block")
+            return await self.pool.run(coro_func, retry=retry)
         except Exception as e:
-            # Check if this is our dummy exception
-            if original_exception is not None:
-                e = original_exception
-            # We have the original exception stored
+            e = unwrap_exception(e)
             PrintStyle(
                 background_color="#AA4455", font_color="white", padding=False
             ).print(
                 f"MCPClientBase ({self.server.name} - {operation_name}): Error during operation: {type(e).__name__}: {e}"
             )
             raise e  # Re-raise the original exception
-        # finally:
-        #     PrintStyle(font_color="cyan").print(
-        #         f"MCPClientBase ({self.server.name} - {operation_name}): Session and transport will be closed by AsyncExitStack."
-        #     )
-        # This line should ideally be unreachable if the try/except/finally logic within the 'async with' is exhaustive.
-        # Adding it to satisfy linters that might not fully trace the raise/return paths through async context managers.
-        raise RuntimeError(
-            f"MCPClientBase ({self.server.name} - {operation_name}): _execute_with_session exited 'async with' block unexpectedly."
-        )
+
+    async def close(self):
+        await self.pool.close()
+
+    def get_metrics(self) -> dict[str, Any]:
+        return {**self.pool.metrics.summary(), "sessions": self.pool.open_sessions}
 
     async def update_tools(self) -> "MCPClientBase":
         # PrintStyle(font_color="cyan").print(f"MCPClientBase ({self.server.name}): Starting 'update_tools' operation...")
@@ -871,17 +970,24 @@ class MCPClientBase(ABC):
                     }
                     for tool in response.tools
                 ]
+                self.catalog_hash = _catalog_hash(self.tools)
             PrintStyle(font_color="green").print(
                 f"MCPClientBase ({self.server.name}): Tools updated. Found {len(self.tools)} tools."
             )
 
+        set = settings.get_settings()
+        timeout = (
+            self.server.init_timeout or set["mcp_client_init_timeout"]
+        ) * TOOLS_UPDATE_TIMEOUT_FACTOR
+
         try:
-            set = settings.get_settings()
-            await self._execute_with_session(
-                list_tools_op,
-                read_timeout_seconds=self.server.init_timeout
-                or set["mcp_client_init_timeout"],
-            )
+            # listing is safe to repeat on a fresh session if a stale one fails
+            try:
+                await asyncio.wait_for(
+                    self._execute_with_session(list_tools_op, retry=True), timeout
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Tools were not listed within {timeout} seconds")
         except Exception as e:
             # e = eg.exceptions[0]
             error_text = errors.format_error(e, 0, 0)
@@ -893,6 +999,7 @@ class MCPClientBase(ABC):
             )
             with self.__lock:
                 self.tools = []  # Ensure tools are cleared on failure
+                self.catalog_hash = _catalog_hash(self.tools)
                 self.error = f"Failed to initialize. {error_text[:200]}{'...' if len(error_text) > 200 else ''}"  # store error from tools fetch
         return self
 
@@ -1030,7 +1137,10 @@ class MCPClientRemote(MCPClientBase):
 
         # Use lower timeouts for faster failure detection
         init_timeout = min(server.init_timeout or set["mcp_client_init_timeout"], 5)
-        tool_timeout = min(server.tool_timeout or set["mcp_client_tool_timeout"], 10)
+        # the session is kept open between calls, do not drop an idle stream early
+        sse_read_timeout = max(
+            server.tool_timeout or set["mcp_client_tool_timeout"], SESSION_READ_TIMEOUT
+        )
 
         # Check if this is a streaming HTTP type
         if _is_streaming_http_type(server.type):
@@ -1040,7 +1150,7 @@ class MCPClientRemote(MCPClientBase):
                     url=server.url,
                     headers=server.headers,
                     timeout=timedelta(seconds=init_timeout),
-                    sse_read_timeout=timedelta(seconds=tool_timeout),
+                    sse_read_timeout=timedelta(seconds=sse_read_timeout),
                 )
             )
             # streamablehttp_client returns (read_stream, write_stream, get_session_id_callback)
@@ -1057,7 +1167,7 @@ class MCPClientRemote(MCPClientBase):
                     url=server.url,
                     headers=server.headers,
                     timeout=init_timeout,
-                    sse_read_timeout=tool_timeout,
+                    sse_read_timeout=sse_read_timeout,
                 )
             )
             return stdio_transport
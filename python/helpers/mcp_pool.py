@@ -0,0 +1,238 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+from python.helpers.defer import EventLoopThread
+
+T = TypeVar("T")
+S = TypeVar("S")
+
+# all pooled sessions live on this event loop thread, callers on other loops
+# are bridged to it, anyio transports must be closed by the task that opened them
+LOOP_THREAD_NAME = "MCPSessions"
+POOL_SIZE = 4
+# sessions idle for longer are pinged before they are reused
+HEALTH_CHECK_AFTER = 30.0
+HEALTH_CHECK_TIMEOUT = 5.0
+CLOSE_TIMEOUT = 5.0
+LATENCY_SAMPLES = 100
+
+
+class SessionMetrics:
+    """Call latencies and connection counts of one server."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.connects = 0
+        self.dropped = 0  # sessions closed after an error or a failed health check
+        self.connect_seconds = 0.0
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, seconds: float, ok: bool):
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self._latencies.append(seconds)
+
+    def summary(self) -> dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "connects": self.connects,
+            "dropped": self.dropped,
+            "connect_ms": round(self.connect_seconds * 1000, 1),
+            "last_ms": round(self._latencies[-1] * 1000, 1) if latencies else 0.0,
+            "avg_ms": (
+                round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0
+            ),
+            "p95_ms": (
+                round(latencies[math.ceil(len(latencies) * 0.95) - 1] * 1000, 1)
+                if latencies
+                else 0.0
+            ),
+        }
+
+
+class PooledSession(Generic[S]):
+    """A session kept open by its own task until close() is called."""
+
+    def __init__(self, connect: Callable[[AsyncExitStack], Awaitable[S]]):
+        self._connect = connect
+        self.session: S | None = None
+        self.last_used = time.monotonic()
+        self.generation = 0
+        self._task: asyncio.Task | None = None
+        self._stop: asyncio.Event | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and bool(self._task) and not self._task.done()  # type: ignore
+
+    async def open(self):
+        ready: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._own(ready))
+        try:
+            self.session = await ready
+        except BaseException:
+            self._task.cancel()
+            raise
+
+    async def _own(self, ready: asyncio.Future):
+        try:
+            async with AsyncExitStack() as stack:
+                session = await self._connect(stack)
+                if ready.done():
+                    return
+                ready.set_result(session)
+                await self._stop.wait()  # type: ignore
+        except asyncio.CancelledError:
+            if not ready.done():
+                ready.cancel()
+            raise
+        except BaseException as e:
+            if not ready.done():
+                ready.set_exception(unwrap_exception(e))
+        finally:
+            self.session = None
+
+    async def close(self):
+        self.session = None
+        if self._stop:
+            self._stop.set()
+        task = self._task
+        if task and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), CLOSE_TIMEOUT)
+            except BaseException:
+                task.cancel()
+
+
+class SessionPool(Generic[S]):
+    """Long-lived sessions of one server, at most size of them are in use at
+    once. Broken sessions are dropped and replaced on the next call, errors
+    for which application_error is true were answered by a healthy session,
+    it is kept and the error is raised without a retry."""
+
+    def __init__(
+        self,
+        connect: Callable[[AsyncExitStack], Awaitable[S]],
+        ping: Callable[[S], Awaitable[Any]] | None = None,
+        size: int = POOL_SIZE,
+        application_error: Callable[[BaseException], bool] | None = None,
+    ):
+        self.connect = connect
+        self.ping = ping
+        self.application_error = application_error
+        self.size = size
+        self.metrics = SessionMetrics()
+        self._idle: list[PooledSession[S]] = []
+        self._open = 0
+        self._generation = 0  # bumped by close(), older sessions are not reused
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def open_sessions(self) -> int:
+        return self._open
+
+    async def run(self, operation: Callable[[S], Awaitable[T]], retry: bool = False) -> T:
+        """Run operation with a pooled session, from any event loop. With retry,
+        a failed operation is repeated once on a new session."""
+        return await _on_pool_loop(self._run(operation, retry))
+
+    async def close(self):
+        """Close all idle sessions, sessions in use are closed when released."""
+        await _on_pool_loop(self._close_idle())
+
+    async def _run(self, operation: Callable[[S], Awaitable[T]], retry: bool) -> T:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        async with self._semaphore:
+            attempt = 1
+            while True:
+                pooled = await self._acquire()
+                start = time.perf_counter()
+                try:
+                    result = await operation(pooled.session)  # type: ignore
+                except Exception as e:
+                    self.metrics.record(time.perf_counter() - start, ok=False)
+                    if self.application_error and self.application_error(unwrap_exception(e)):
+                        await self._release(pooled)
+                        raise
+                    # the session may be broken or out of sync, do not reuse it
+                    await self._drop(pooled)
+                    if not retry or attempt > 1:
+                        raise
+                    attempt += 1
+                    continue
+                except BaseException:
+                    await self._drop(pooled)  # cancelled mid-call
+                    raise
+                self.metrics.record(time.perf_counter() - start, ok=True)
+                await self._release(pooled)
+                return result
+
+    async def _acquire(self) -> PooledSession[S]:
+        while self._idle:
+            pooled = self._idle.pop()  # most recently used first
+            if not pooled.alive:
+                await self._drop(pooled)
+                continue
+            if self.ping and time.monotonic() - pooled.last_used > HEALTH_CHECK_AFTER:
+                try:
+                    await asyncio.wait_for(self.ping(pooled.session), HEALTH_CHECK_TIMEOUT)  # type: ignore
+                except Exception:
+                    await self._drop(pooled)
+                    continue
+            return pooled
+
+        pooled = PooledSession(self.connect)
+        pooled.generation = self._generation
+        start = time.perf_counter()
+        await pooled.open()
+        self.metrics.connect_seconds = time.perf_counter() - start
+        self.metrics.connects += 1
+        self._open += 1
+        return pooled
+
+    async def _release(self, pooled: PooledSession[S]):
+        if pooled.generation != self._generation:
+            # the pool was closed while the session was in use
+            self._open -= 1
+            await pooled.close()
+            return
+        pooled.last_used = time.monotonic()
+        self._idle.append(pooled)
+
+    async def _drop(self, pooled: PooledSession[S]):
+        self.metrics.dropped += 1
+        self._open -= 1
+        await pooled.close()
+
+    async def _close_idle(self):
+        self._generation += 1
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._open -= 1
+            await pooled.close()
+
+
+async def _on_pool_loop(coro: Awaitable[T]) -> T:
+    loop = EventLoopThread(LOOP_THREAD_NAME)
+    if asyncio.get_running_loop() is loop.loop:
+        return await coro
+    return await asyncio.wrap_future(loop.run_coroutine(coro))
+
+
+def unwrap_exception(e: BaseException) -> BaseException:
+    """First exception of an (anyio) exception group, or e itself."""
+    while True:
+        excs = getattr(e, "exceptions", None)
+        if not excs:
+            return e
+        e = excs[0]
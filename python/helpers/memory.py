@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 from typing import Any, List, Sequence
 from langchain_core.stores import InMemoryByteStore
@@ -38,6 +39,11 @@ from . import files
 from langchain_core.documents import Document
 import uuid
 from python.helpers import knowledge_import
+from python.helpers.memory_wal import MemoryWal
+from python.helpers.embedding_scheduler import EmbeddingScheduler
+from python.helpers import memory_index, settings
+from python.helpers.metadata_index import MetadataIndexedFaiss
+from python.helpers.query_embeddings import CachedQueryEmbeddings, is_cached
 from python.helpers.log import Log, LogItem
 from enum import Enum
 from agents import Agent
@@ -49,7 +55,7 @@ import logging
 logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
 
-class MyFaiss(FAISS):
+class MyFaiss(MetadataIndexedFaiss):
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -71,6 +77,8 @@ class Memory:
         INSTRUMENTS = "instruments"
 
     index: dict[str, "MyFaiss"] = {}
+    # write-ahead logs survive reload() so a running compaction keeps its state
+    wal: dict[str, MemoryWal] = {}
 
     @staticmethod
     async def get(agent: Agent):
@@ -143,9 +151,13 @@ class Memory:
             model_config.provider + "_" + model_config.name
         )
 
-        # here we setup the embeddings model with the chosen cache storage
-        embedder = CacheBackedEmbeddings.from_bytes_store(
-            embeddings_model, store, namespace=embeddings_model_id
+        # here we setup the embeddings model with the chosen cache storage,
+        # queries are cached in memory by the shared query cache
+        embedder = CachedQueryEmbeddings(
+            CacheBackedEmbeddings.from_bytes_store(
+                embeddings_model, store, namespace=embeddings_model_id
+            ),
+            model_id=embeddings_model_id,
         )
 
         # initial DB and docs variables
@@ -153,6 +165,10 @@ class Memory:
         docs: dict[str, Document] | None = None
 
         created = False
+        emb_ok = False
+        wal = Memory._get_wal(memory_subdir)
+        # complete or discard a snapshot interrupted by a crash
+        wal.recover()
 
         # if db folder exists and is not empty:
         if os.path.exists(db_dir) and files.exists(db_dir, "index.faiss"):
@@ -192,11 +208,21 @@ class Memory:
                     # model matches
                     emb_ok = True
 
+            if db and not db.index_in_sync():
+                # index and docstore do not match, rebuild the index from the docstore
+                PrintStyle.warning("VectorDB index out of sync. Re-indexing it.")
+                docs = db.get_all_docs()
+                db = None
+
             # re-index -  create new DB and insert existing docs
             if db and not emb_ok:
                 docs = db.get_all_docs()
                 db = None
 
+        if db:
+            # apply changes logged since the last snapshot
+            Memory._replay_wal(db, wal)
+
         # DB not loaded, create one
         if not db:
             index = faiss.IndexFlatIP(len(embedder.embed_query("example")))
@@ -211,6 +237,10 @@ class Memory:
                 relevance_score_fn=Memory._cosine_normalizer,
             )
 
+            # logged changes are re-indexed from their texts, their vectors may
+            # come from another embeddings model
+            docs = wal.replay_documents(docs or {})
+
             # insert docs if reindexing
             if docs:
                 PrintStyle.standard("Indexing memories...")
@@ -218,8 +248,8 @@ class Memory:
                     log_item.stream(progress="\nIndexing memories")
                 db.add_documents(documents=list(docs.values()), ids=list(docs.keys()))
 
-            # save DB
-            Memory._save_db_file(db, memory_subdir)
+            # save DB, the snapshot now contains everything logged before
+            wal.save(db)
             # save meta file
             meta_file_path = files.get_abs_path(db_dir, "embedding.json")
             files.write_file(
@@ -234,8 +264,41 @@ class Memory:
 
             created = True
 
+        # switch between flat and approximate index based on size
+        if Memory._migrate_index(db):
+            PrintStyle.standard(
+                f"VectorDB index migrated to {memory_index.get_index_type(db.index)}"
+            )
+            if log_item:
+                log_item.stream(progress="\nVectorDB index migrated")
+            wal.save(db)
+
         return db, created
 
+    @staticmethod
+    def _migrate_index(db: MyFaiss) -> bool:
+        set = settings.get_settings()
+        target = memory_index.resolve_index_type(
+            set["memory_index_type"],
+            len(db.index_to_docstore_id),
+            set["memory_index_ann_threshold"],
+        )
+        current = memory_index.get_index_type(db.index)
+        # an approximate index is kept until the subdir shrinks below half the threshold
+        if (
+            target == "flat"
+            and current != "flat"
+            and set["memory_index_type"] != "flat"
+            and len(db.index_to_docstore_id) >= set["memory_index_ann_threshold"] // 2
+        ):
+            return False
+        if target == current:
+            return False
+        # vectors are copied by position, deleted ones must not be carried over
+        db.compact_index()
+        db.index = memory_index.migrate_index(db.index, target)
+        return True
+
     def __init__(
         self,
         agent: Agent,
@@ -245,6 +308,7 @@ class Memory:
         self.agent = agent
         self.db = db
         self.memory_subdir = memory_subdir
+        self.wal = Memory._get_wal(memory_subdir)
 
     async def preload_knowledge(
         self, log_item: LogItem | None, kn_dirs: list[str], memory_subdir: str
@@ -270,6 +334,7 @@ class Memory:
         # preload knowledge folders
         index = self._preload_knowledge_folders(log_item, kn_dirs, index)
 
+        changed: list[str] = []
         for file in index:
             if index[file]["state"] in ["changed", "removed"] and index[file].get(
                 "ids", []
@@ -278,9 +343,16 @@ class Memory:
                     index[file]["ids"]
                 )  # remove original version
             if index[file]["state"] == "changed":
-                index[file]["ids"] = await self.insert_documents(
-                    index[file]["documents"]
-                )  # insert new version
+                changed.append(file)
+
+        # insert new versions of all changed files in one batched embedding run
+        docs = [doc for file in changed for doc in index[file]["documents"]]
+        ids = await self.insert_documents(docs, log_item)
+        offset = 0
+        for file in changed:
+            count = len(index[file]["documents"])
+            index[file]["ids"] = ids[offset : offset + count]
+            offset += count
 
         # remove index where state="removed"
         index = {k: v for k, v in index.items() if v["state"] != "removed"}
@@ -325,20 +397,73 @@ class Memory:
         self, query: str, limit: int, threshold: float, filter: str = ""
     ):
         comparator = Memory._get_comparator(filter) if filter else None
+        # restrict the vector search to documents the metadata index allows
+        candidates = self.db.filter_candidates(filter) if filter else None
 
-        # rate limiter
-        await self.agent.rate_limiter(
-            model_config=self.agent.config.embeddings_model, input=query
-        )
+        # rate limiter, cached queries are not sent to the model
+        if not is_cached(self.db.embedding_function, query):  # type: ignore
+            await self.agent.rate_limiter(
+                model_config=self.agent.config.embeddings_model, input=query
+            )
 
+        kwargs = {} if candidates is None else {"candidate_ids": candidates}
         return await self.db.asearch(
             query,
             search_type="similarity_score_threshold",
             k=limit,
             score_threshold=threshold,
             filter=comparator,
+            **kwargs,
         )
 
+    async def search_similarity_threshold_by_vectors(
+        self, vectors: list[list[float]], limit: int, threshold: float, filter: str = ""
+    ) -> list[list[Document]]:
+        """Similarity searches of several query vectors in one index query, one
+        result list per vector."""
+        comparator = Memory._get_comparator(filter) if filter else None
+        candidates = self.db.filter_candidates(filter) if filter else None
+
+        results = await asyncio.to_thread(
+            self.db.similarity_search_with_score_by_vectors,
+            vectors,
+            k=limit,
+            filter=comparator,
+            candidate_ids=candidates,
+        )
+        return [
+            [doc for doc, score in docs if Memory._cosine_normalizer(score) >= threshold]
+            for docs in results
+        ]
+
+    async def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts in batched requests. Vectors are cached, inserting the same
+        texts afterwards does not embed them again."""
+
+        # rate limiter is applied per embedding batch
+        async def rate_limit(text: str):
+            await self.agent.rate_limiter(
+                model_config=self.agent.config.embeddings_model, input=text
+            )
+
+        scheduler = EmbeddingScheduler(self.db.embedding_function, rate_limit)  # type: ignore
+        return await scheduler.embed_documents(texts)
+
+    async def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed search queries. Vectors are kept in the shared query cache, unlike
+        embed_texts they are not written to the document embedding cache."""
+        embedder = self.db.embedding_function
+
+        async def embed(text: str) -> list[float]:
+            # rate limiter, cached queries are not sent to the model
+            if not is_cached(embedder, text):  # type: ignore
+                await self.agent.rate_limiter(
+                    model_config=self.agent.config.embeddings_model, input=text
+                )
+            return await embedder.aembed_query(text)  # type: ignore
+
+        return list(await asyncio.gather(*(embed(text) for text in texts)))
+
     async def delete_documents_by_query(
         self, query: str, threshold: float, filter: str = ""
     ):
@@ -363,6 +488,7 @@ class Memory:
                 # if fnd["ids"]: self.db.delete(ids=fnd["ids"])
                 # tot += len(fnd["ids"])
                 await self.db.adelete(ids=document_ids)
+                self.wal.append_delete(document_ids)  # persist
                 tot += len(document_ids)
 
             # If fewer than K document IDs, break the loop
@@ -370,7 +496,7 @@ class Memory:
                 break
 
         if tot:
-            self._save_db()  # persist
+            self._compact_if_needed()
         return removed
 
     async def delete_documents_by_ids(self, ids: list[str]):
@@ -381,9 +507,8 @@ class Memory:
         if rem_docs:
             rem_ids = [doc.metadata["id"] for doc in rem_docs]  # ids to remove
             await self.db.adelete(ids=rem_ids)
-
-        if rem_docs:
-            self._save_db()  # persist
+            self.wal.append_delete(rem_ids)  # persist
+            self._compact_if_needed()
         return rem_docs
 
     async def insert_text(self, text, metadata: dict = {}):
@@ -391,7 +516,9 @@ class Memory:
         ids = await self.insert_documents([doc])
         return ids[0]
 
-    async def insert_documents(self, docs: list[Document]):
+    async def insert_documents(
+        self, docs: list[Document], log_item: LogItem | None = None
+    ):
         ids = [str(uuid.uuid4()) for _ in range(len(docs))]
         timestamp = self.get_timestamp()
 
@@ -402,23 +529,39 @@ class Memory:
                 if not doc.metadata.get("area", ""):
                     doc.metadata["area"] = Memory.Area.MAIN.value
 
-            # rate limiter
-            docs_txt = "".join(self.format_docs_plain(docs))
-            await self.agent.rate_limiter(
-                model_config=self.agent.config.embeddings_model, input=docs_txt
-            )
+            # rate limiter is applied per embedding batch
+            async def rate_limit(text: str):
+                await self.agent.rate_limiter(
+                    model_config=self.agent.config.embeddings_model, input=text
+                )
 
-            await self.db.aadd_documents(documents=docs, ids=ids)
-            self._save_db()  # persist
+            # embed here instead of aadd_documents so the vectors can be logged
+            texts = [doc.page_content for doc in docs]
+            metadatas = [doc.metadata for doc in docs]
+            scheduler = EmbeddingScheduler(self.db.embedding_function, rate_limit)  # type: ignore
+            vectors = await scheduler.embed_documents(texts)
+            if log_item:
+                log_item.stream(progress=f"\n{scheduler.stats.summary()}")
+            self.db.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+            self.wal.append_insert(ids, texts, vectors, metadatas)  # persist
+            self._compact_if_needed()
         return ids
 
-    def _save_db(self):
-        Memory._save_db_file(self.db, self.memory_subdir)
+    def _compact_if_needed(self):
+        if self.wal.needs_compaction():
+            self.wal.compact(self.db)
+
+    @staticmethod
+    def _replay_wal(db: MyFaiss, wal: MemoryWal):
+        replayed = wal.replay(db)
+        if replayed:
+            PrintStyle.standard(f"Replayed {replayed} memory log records")
 
     @staticmethod
-    def _save_db_file(db: MyFaiss, memory_subdir: str):
-        abs_dir = Memory._abs_db_dir(memory_subdir)
-        db.save_local(folder_path=abs_dir)
+    def _get_wal(memory_subdir: str) -> MemoryWal:
+        if memory_subdir not in Memory.wal:
+            Memory.wal[memory_subdir] = MemoryWal(Memory._abs_db_dir(memory_subdir))
+        return Memory.wal[memory_subdir]
 
     @staticmethod
     def _clear_db_files(db_dir: str):
@@ -488,6 +631,36 @@ class Memory:
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+# agent data with the number of the last memorized message per kind, persisted with the chat
+MEMORIZED_DATA_NAME = "memorized_until"
+# already memorized messages repeated as context for the new ones
+MEMORIZE_OVERLAP = 2
+
+
+def get_history_to_memorize(agent: Agent, kind: str) -> tuple[str, int]:
+    """History text added since the last memorization of this kind, with a
+    small overlap, and the number of the last message it contains. The text is
+    empty when there is nothing new."""
+    last_no = agent.history.get_last_no()
+    memorized = (agent.get_data(MEMORIZED_DATA_NAME) or {}).get(kind, 0)
+    if memorized > last_no:
+        memorized = 0  # history was replaced
+    if last_no <= memorized:
+        return "", last_no
+    messages = agent.history.output_since(max(memorized - MEMORIZE_OVERLAP, 0))
+    return agent.concat_messages(messages), last_no
+
+
+def set_memorized(agent: Agent, kind: str, no: int):
+    """Move the memorization watermark after a successful memorization."""
+    from python.helpers import persist_chat
+
+    memorized = dict(agent.get_data(MEMORIZED_DATA_NAME) or {})
+    memorized[kind] = max(no, memorized.get(kind, 0))
+    agent.set_data(MEMORIZED_DATA_NAME, memorized)
+    persist_chat.save_tmp_chat_later(agent.context)
+
+
 def get_memory_subdir_abs(agent: Agent) -> str:
     return files.get_abs_path("memory", agent.config.memory_subdir or "default")
 
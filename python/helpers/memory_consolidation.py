@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 from enum import Enum
 
+import numpy as np
 from langchain_core.documents import Document
 
 from python.helpers.memory import Memory
@@ -34,6 +35,12 @@ class ConsolidationConfig:
     max_llm_context_memories: int = 5
     keyword_extraction_sys_prompt: str = "memory.keyword_extraction.sys.md"
     keyword_extraction_msg_prompt: str = "memory.keyword_extraction.msg.md"
+    keyword_extraction_batch_msg_prompt: str = "memory.keyword_extraction_batch.msg.md"
+    consolidation_batch_msg_prompt: str = "memory.consolidation_batch.msg.md"
+    # new memories analyzed together in one utility model request
+    max_batch_memories: int = 10
+    # new memories of a batch this similar to an earlier one of the batch are not stored again
+    batch_duplicate_threshold: float = 0.95
     processing_timeout_seconds: int = 60
     # Add safety threshold for REPLACE actions
     replace_similarity_threshold: float = 0.9  # Higher threshold for replacement safety
@@ -216,6 +223,219 @@ class MemoryConsolidator:
 
         consolidation_result = await self._analyze_memory_consolidation(analysis_context, log_item)
 
+        return await self._apply_analysis(analysis_context, consolidation_result, log_item)
+
+    async def process_new_memories(
+        self,
+        new_memories: List[str],
+        area: str,
+        metadata: Dict[str, Any],
+        log_item: Optional[LogItem] = None
+    ) -> List[dict]:
+        """
+        Process several new memories of one area through the consolidation pipeline
+        together. Keywords of all memories are extracted in one utility model call,
+        memories are embedded in one batched run and keywords as cached queries, all
+        are searched as one matrix query, and consolidation decisions are requested
+        in groups.
+
+        Args:
+            new_memories: The new memory contents to process
+            area: Memory area (MAIN, FRAGMENTS, SOLUTIONS, INSTRUMENTS)
+            metadata: Initial metadata for every memory
+            log_item: Optional log item for progress tracking
+
+        Returns:
+            list: {"success": bool, "memory_ids": [str, ...]} per new memory
+        """
+        if not new_memories:
+            return []
+        try:
+            # the batch gets the time its memories would have had one by one
+            return await asyncio.wait_for(
+                self._process_memories_with_consolidation(new_memories, area, metadata, log_item),
+                timeout=self.config.processing_timeout_seconds * len(new_memories)
+            )
+
+        except asyncio.TimeoutError:
+            PrintStyle().error(f"Memory consolidation timeout for area {area}")
+
+        except Exception as e:
+            PrintStyle().error(f"Memory consolidation error for area {area}: {str(e)}")
+
+        return [{"success": False, "memory_ids": []} for _ in new_memories]
+
+    async def _process_memories_with_consolidation(
+        self,
+        new_memories: List[str],
+        area: str,
+        metadata: Dict[str, Any],
+        log_item: Optional[LogItem] = None
+    ) -> List[dict]:
+        """Execute the consolidation pipeline for a batch of memories."""
+
+        if log_item:
+            log_item.update(progress=f"Consolidating {len(new_memories)} memories...", temp=True)
+
+        db = await Memory.get(self.agent)
+
+        # Step 1: Keywords of all memories in one request
+        keywords = await self._extract_search_keywords_batch(new_memories, log_item)
+
+        # Step 2: Memories are embedded as documents, their vectors are cached and
+        # reused when they are inserted, keywords as queries that are only kept in
+        # the query cache
+        memory_texts = list(dict.fromkeys(new_memories))
+        queries = list(dict.fromkeys(q.strip() for qs in keywords for q in qs if q.strip()))
+        memory_vectors, query_vectors = await asyncio.gather(
+            db.embed_texts(memory_texts), db.embed_queries(queries)
+        )
+
+        # Step 3: All similarity searches as one matrix query
+        results = await db.search_similarity_threshold_by_vectors(
+            [*memory_vectors, *query_vectors],
+            limit=self.config.max_similar_memories,
+            threshold=self.config.similarity_threshold,
+            filter=f"area == '{area}'"
+        )
+        by_text = dict(zip(memory_texts, results))
+        by_query = dict(zip(queries, results[len(memory_texts):]))
+        vectors_by_text = dict(zip(memory_texts, memory_vectors))
+
+        # memories repeating an earlier memory of the batch share its result
+        duplicates = self._find_batch_duplicates(
+            [vectors_by_text[new_memory] for new_memory in new_memories]
+        )
+
+        contexts = []
+        for new_memory, memory_keywords in zip(new_memories, keywords):
+            all_similar = list(by_text[new_memory])
+            queries_count = max(1, len(memory_keywords))
+            keyword_limit = max(3, self.config.max_similar_memories // queries_count)
+            for query in memory_keywords:
+                if query.strip():
+                    all_similar.extend(by_query[query.strip()][:keyword_limit])
+            contexts.append(MemoryAnalysisContext(
+                new_memory=new_memory,
+                similar_memories=self._rank_similar_memories(all_similar),
+                area=area,
+                timestamp=self._get_timestamp(),
+                existing_metadata=dict(metadata)
+            ))
+
+        results_by_index: Dict[int, dict] = {}
+
+        # Step 4: Insert memories without similar memories directly in one run
+        direct = [
+            i for i, context in enumerate(contexts)
+            if i not in duplicates and not context.similar_memories
+        ]
+        if direct:
+            docs = []
+            for i in direct:
+                doc_metadata = contexts[i].existing_metadata
+                if 'timestamp' not in doc_metadata:
+                    doc_metadata['timestamp'] = self._get_timestamp()
+                docs.append(Document(contexts[i].new_memory, metadata=doc_metadata))
+            try:
+                memory_ids = await db.insert_documents(docs)
+                for i, memory_id in zip(direct, memory_ids):
+                    results_by_index[i] = {"success": True, "memory_ids": [memory_id]}
+            except Exception as e:
+                PrintStyle().error(f"Direct memory insertion failed: {str(e)}")
+                for i in direct:
+                    results_by_index[i] = {"success": False, "memory_ids": []}
+
+        # Step 5: Analyze the others in groups, one utility model request per group
+        pending = [
+            i for i in range(len(contexts)) if i not in results_by_index and i not in duplicates
+        ]
+        size = max(1, self.config.max_batch_memories)
+        groups = [pending[start:start + size] for start in range(0, len(pending), size)]
+        analyses = await asyncio.gather(*[
+            self._analyze_memory_consolidation_batch([contexts[i] for i in group], log_item)
+            for group in groups
+        ])
+
+        # Step 6: Apply the decisions one after another, later decisions see the
+        # changes of earlier ones. A memory removed or updated by one decision is
+        # gone for the others, their decisions fall back to inserting the memory.
+        consumed: set = set()
+        for group, group_results in zip(groups, analyses):
+            for i, consolidation_result in zip(group, group_results):
+                targets = self._get_target_ids(consolidation_result)
+                if targets & consumed:
+                    consolidation_result = ConsolidationResult(
+                        action=ConsolidationAction.SKIP,
+                        reasoning="Memories of this decision were consolidated by an earlier one"
+                    )
+                    targets = set()
+                results_by_index[i] = await self._apply_analysis(
+                    contexts[i], consolidation_result, log_item
+                )
+                if results_by_index[i]["success"]:
+                    consumed |= targets
+
+        for i, original in duplicates.items():
+            results_by_index[i] = dict(results_by_index[original])
+
+        if log_item:
+            log_item.update(
+                result=f"Consolidated {len(new_memories)} memories",
+                memories_processed=len(new_memories),
+                direct_inserts=len(direct),
+                batch_duplicates=len(duplicates),
+                consolidation_requests=len(groups)
+            )
+
+        return [results_by_index[i] for i in range(len(new_memories))]
+
+    def _find_batch_duplicates(self, vectors: List[List[float]]) -> Dict[int, int]:
+        """Map memories of a batch to the earlier memory they repeat, by the cosine
+        similarity of their embeddings."""
+        if len(vectors) < 2:
+            return {}
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+        similarity = matrix @ matrix.T
+
+        duplicates: Dict[int, int] = {}
+        kept: List[int] = []
+        for i in range(len(vectors)):
+            original = next(
+                (j for j in kept if similarity[i, j] >= self.config.batch_duplicate_threshold),
+                None
+            )
+            if original is None:
+                kept.append(i)
+            else:
+                duplicates[i] = original
+        return duplicates
+
+    def _get_target_ids(self, result: ConsolidationResult) -> set:
+        """IDs of existing memories a decision removes or rewrites."""
+        if result.action in (ConsolidationAction.SKIP, ConsolidationAction.KEEP_SEPARATE):
+            return set()
+        ids = {str(memory_id) for memory_id in result.memories_to_remove or []}
+        for update_info in result.memories_to_update or []:
+            if isinstance(update_info, dict) and update_info.get('id'):
+                ids.add(str(update_info['id']))
+        return ids
+
+    async def _apply_analysis(
+        self,
+        analysis_context: MemoryAnalysisContext,
+        consolidation_result: ConsolidationResult,
+        log_item: Optional[LogItem] = None
+    ) -> dict:
+        """Insert or consolidate a new memory according to the LLM decision."""
+
+        new_memory = analysis_context.new_memory
+        area = analysis_context.area
+        metadata = analysis_context.existing_metadata
+        similar_memories = analysis_context.similar_memories
+
         if consolidation_result.action == ConsolidationAction.SKIP:
             if log_item:
                 log_item.update(
@@ -363,6 +583,11 @@ class MemoryConsolidator:
                 )
                 all_similar.extend(keyword_similar)
 
+        return self._rank_similar_memories(all_similar)
+
+    def _rank_similar_memories(self, all_similar: List[Document]) -> List[Document]:
+        """Deduplicate search results, estimate their similarity and limit them to the LLM context."""
+
         # Step 4: Deduplicate by document ID and store similarity info
         seen_ids = set()
         unique_similar = []
@@ -448,14 +673,66 @@ class MemoryConsolidator:
 
         except Exception as e:
             PrintStyle().warning(f"Keyword extraction failed: {str(e)}")
-            # Fallback: use intelligent truncation for search
-            # Take first 200 chars if short, or first sentence if longer, but cap at 200 chars
-            if len(new_memory) <= 200:
-                fallback_content = new_memory
+            return self._fallback_keywords(new_memory)
+
+    async def _extract_search_keywords_batch(
+        self,
+        new_memories: List[str],
+        log_item: Optional[LogItem] = None
+    ) -> List[List[str]]:
+        """Extract search keywords of several memories in one utility LLM call."""
+
+        if len(new_memories) == 1:
+            return [await self._extract_search_keywords(new_memories[0], log_item)]
+
+        keywords_json: Any = {}
+        try:
+            system_prompt = self.agent.read_prompt(
+                self.config.keyword_extraction_sys_prompt,
+            )
+
+            message_prompt = self.agent.read_prompt(
+                self.config.keyword_extraction_batch_msg_prompt,
+                memories="\n\n".join(
+                    f"## Memory {i}\n{memory}" for i, memory in enumerate(new_memories, 1)
+                )
+            )
+
+            keywords_response = await self.agent.call_utility_model(
+                system=system_prompt,
+                message=message_prompt,
+                background=True
+            )
+
+            # Parse the response - expect JSON object of memory number to array of strings
+            keywords_json = DirtyJson.parse_string(keywords_response.strip())
+            if not isinstance(keywords_json, dict):
+                raise ValueError("LLM response is not a valid JSON object")
+
+        except Exception as e:
+            PrintStyle().warning(f"Keyword extraction failed: {str(e)}")
+            keywords_json = {}
+
+        result = []
+        for i, new_memory in enumerate(new_memories, 1):
+            keywords = keywords_json.get(str(i))
+            if isinstance(keywords, list):
+                result.append([str(k) for k in keywords if k])
+            elif isinstance(keywords, str):
+                result.append([keywords])
             else:
-                first_sentence = new_memory.split('.')[0]
-                fallback_content = first_sentence[:200] if len(first_sentence) <= 200 else new_memory[:200]
-            return [fallback_content.strip()]
+                result.append(self._fallback_keywords(new_memory))
+        return result
+
+    def _fallback_keywords(self, new_memory: str) -> List[str]:
+        # Fallback: use intelligent truncation for search
+        # Take first 200 chars if short, or first sentence if longer, but cap at 200 chars
+        if len(new_memory) <= 200:
+            fallback_content = new_memory
+        else:
+            first_sentence = new_memory.split('.')[0]
+            fallback_content = first_sentence[:200] if len(first_sentence) <= 200 else new_memory[:200]
+        return [fallback_content.strip()]
 
     async def _analyze_memory_consolidation(
         self,
@@ -466,11 +743,7 @@ class MemoryConsolidator:
 
         try:
             # Prepare similar memories text
-            similar_memories_text = ""
-            for i, doc in enumerate(context.similar_memories):
-                timestamp = doc.metadata.get('timestamp', 'unknown')
-                doc_id = doc.metadata.get('id', f'doc_{i}')
-                similar_memories_text += f"ID: {doc_id}\nTimestamp: {timestamp}\nContent: {doc.page_content}\n\n"
+            similar_memories_text = self._format_similar_memories(context.similar_memories)
 
             # Build system prompt
             system_prompt = self.agent.read_prompt(
@@ -481,7 +754,7 @@ class MemoryConsolidator:
             message_prompt = self.agent.read_prompt(
                 self.config.consolidation_msg_prompt,
                 new_memory=context.new_memory,
-                similar_memories=similar_memories_text.strip(),
+                similar_memories=similar_memories_text,
                 area=context.area,
                 current_timestamp=context.timestamp,
                 new_memory_metadata=json.dumps(context.existing_metadata, indent=2)
@@ -500,29 +773,7 @@ class MemoryConsolidator:
             if not isinstance(result_json, dict):
                 raise ValueError("LLM response is not a valid JSON object")
 
-            # Parse consolidation result
-            action_str = result_json.get('action', 'skip')
-            try:
-                action = ConsolidationAction(action_str.lower())
-            except ValueError:
-                action = ConsolidationAction.SKIP
-
-            # Determine appropriate fallback for new_memory_content based on action
-            if action in [ConsolidationAction.MERGE, ConsolidationAction.REPLACE]:
-                # For MERGE/REPLACE, if no content provided, it's an error - don't use original
-                default_content = ""
-            else:
-                # For KEEP_SEPARATE/UPDATE/SKIP, original memory is appropriate fallback
-                default_content = context.new_memory
-
-            return ConsolidationResult(
-                action=action,
-                memories_to_remove=result_json.get('memories_to_remove', []),
-                memories_to_update=result_json.get('memories_to_update', []),
-                new_memory_content=result_json.get('new_memory_content', default_content),
-                metadata=result_json.get('metadata', {}),
-                reasoning=result_json.get('reasoning', '')
-            )
+            return self._parse_consolidation_result(result_json, context.new_memory)
 
         except Exception as e:
             PrintStyle().warning(f"LLM consolidation analysis failed: {str(e)}")
@@ -532,6 +783,117 @@ class MemoryConsolidator:
                 reasoning=f"Analysis failed: {str(e)}"
             )
 
+    async def _analyze_memory_consolidation_batch(
+        self,
+        contexts: List[MemoryAnalysisContext],
+        log_item: Optional[LogItem] = None
+    ) -> List[ConsolidationResult]:
+        """Use LLM to analyze consolidation options of several memories in one request."""
+
+        if len(contexts) == 1:
+            return [await self._analyze_memory_consolidation(contexts[0], log_item)]
+
+        try:
+            memories_text = "\n\n".join(
+                f"## New Memory {i}\n\n"
+                f"**New Memory to Process**:\n{context.new_memory}\n\n"
+                f"**Existing Similar Memories**:\n{self._format_similar_memories(context.similar_memories)}"
+                for i, context in enumerate(contexts, 1)
+            )
+
+            system_prompt = self.agent.read_prompt(
+                self.config.consolidation_sys_prompt,
+            )
+
+            # memories of one batch share area and metadata
+            message_prompt = self.agent.read_prompt(
+                self.config.consolidation_batch_msg_prompt,
+                memories=memories_text,
+                area=contexts[0].area,
+                current_timestamp=contexts[0].timestamp,
+                new_memory_metadata=json.dumps(contexts[0].existing_metadata, indent=2)
+            )
+
+            analysis_response = await self.agent.call_utility_model(
+                system=system_prompt,
+                message=message_prompt,
+                callback=None,
+                background=True
+            )
+
+            # Parse LLM response - expect JSON array with one decision per new memory
+            result_json = DirtyJson.parse_string(analysis_response.strip())
+            if isinstance(result_json, dict):
+                result_json = [result_json]
+            if not isinstance(result_json, list):
+                raise ValueError("LLM response is not a valid JSON array")
+
+        except Exception as e:
+            PrintStyle().warning(f"LLM consolidation analysis failed: {str(e)}")
+            # Fallback: skip consolidation
+            return [
+                ConsolidationResult(
+                    action=ConsolidationAction.SKIP,
+                    reasoning=f"Analysis failed: {str(e)}"
+                )
+                for _ in contexts
+            ]
+
+        decisions: Dict[int, dict] = {}
+        for position, decision in enumerate(result_json, 1):
+            if not isinstance(decision, dict):
+                continue
+            try:
+                number = int(decision.get('memory', position))
+            except (TypeError, ValueError):
+                number = position
+            decisions.setdefault(number, decision)
+
+        results = []
+        for i, context in enumerate(contexts, 1):
+            decision = decisions.get(i)
+            if decision is None:
+                results.append(ConsolidationResult(
+                    action=ConsolidationAction.SKIP,
+                    reasoning="No decision returned for this memory"
+                ))
+            else:
+                results.append(self._parse_consolidation_result(decision, context.new_memory))
+        return results
+
+    def _format_similar_memories(self, similar_memories: List[Document]) -> str:
+        similar_memories_text = ""
+        for i, doc in enumerate(similar_memories):
+            timestamp = doc.metadata.get('timestamp', 'unknown')
+            doc_id = doc.metadata.get('id', f'doc_{i}')
+            similar_memories_text += f"ID: {doc_id}\nTimestamp: {timestamp}\nContent: {doc.page_content}\n\n"
+        return similar_memories_text.strip()
+
+    def _parse_consolidation_result(self, result_json: dict, new_memory: str) -> ConsolidationResult:
+        # Parse consolidation result
+        action_str = result_json.get('action', 'skip')
+        try:
+            action = ConsolidationAction(str(action_str).lower())
+        except ValueError:
+            action = ConsolidationAction.SKIP
+
+        # Determine appropriate fallback for new_memory_content based on action
+        if action in [ConsolidationAction.MERGE, ConsolidationAction.REPLACE]:
+            # For MERGE/REPLACE, if no content provided, it's an error - don't use original
+            default_content = ""
+        else:
+            # For KEEP_SEPARATE/UPDATE/SKIP, original memory is appropriate fallback
+            default_content = new_memory
+
+        return ConsolidationResult(
+            action=action,
+            memories_to_remove=result_json.get('memories_to_remove', []),
+            memories_to_update=result_json.get('memories_to_update', []),
+            new_memory_content=result_json.get('new_memory_content', default_content),
+            metadata=result_json.get('metadata', {}),
+            reasoning=result_json.get('reasoning', '')
+        )
+
     async def _apply_consolidation_result(
         self,
         result: ConsolidationResult,
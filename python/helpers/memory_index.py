@@ -0,0 +1,161 @@
+"""
+FAISS index factory for the memory databases.
+
+Small memory subdirs use an exact ``IndexFlatIP``. Once a subdir grows past
+the configured threshold, ``Memory.initialize`` migrates it to an approximate
+index trained on the vectors already stored:
+
+- ``ivf``: inverted file index, supports in-place deletes.
+- ``hnsw``: graph index, fastest recall but it has no removal. Deleted vectors
+  stay in the graph as tombstones that searches skip, the graph is rebuilt
+  once they make up ``HNSW_MAX_TOMBSTONES`` of it.
+
+Positions in a flat or IVF index always match the keys of
+``index_to_docstore_id`` (0..n-1) like the flat index langchain expects,
+``remove_positions`` keeps that invariant for every index type. In an HNSW
+index the positions missing from ``index_to_docstore_id`` are tombstones.
+"""
+
+import math
+from typing import Literal
+
+import numpy as np
+
+from python.helpers.faiss_loader import faiss
+
+IndexType = Literal["flat", "ivf", "hnsw"]
+INDEX_TYPES: tuple[str, ...] = ("auto", "flat", "ivf", "hnsw")
+
+# default size above which "auto" switches from flat to IVF
+ANN_THRESHOLD = 20000
+
+IVF_MAX_LISTS = 4096
+IVF_PROBE_RATIO = 0.1  # share of inverted lists visited per query
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+# share of deleted vectors kept in an HNSW graph before it is rebuilt
+HNSW_MAX_TOMBSTONES = 0.1
+
+
+def get_index_type(index) -> IndexType:
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def resolve_index_type(setting: str, size: int, threshold: int) -> IndexType:
+    """Pick the index type for a subdir with the given number of vectors."""
+    if setting not in INDEX_TYPES:
+        setting = "auto"
+    if setting == "auto":
+        setting = "ivf"
+    if setting == "flat" or size < threshold:
+        return "flat"
+    return setting  # type: ignore
+
+
+def create_index(dim: int, index_type: IndexType, vectors: np.ndarray | None = None):
+    """Create an index of the given type, training it on vectors if needed, and add them."""
+    if vectors is None:
+        vectors = np.empty((0, dim), dtype=np.float32)
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    if index_type == "ivf" and len(vectors):
+        nlist = _ivf_lists(len(vectors))
+        index = faiss.IndexIVFFlat(
+            faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(vectors)
+        index.nprobe = max(1, math.ceil(nlist * IVF_PROBE_RATIO))
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        # IVF cannot be trained without data, start flat
+        index = faiss.IndexFlatIP(dim)
+
+    if len(vectors):
+        index.add(vectors)
+    return index
+
+
+def get_vectors(index) -> np.ndarray:
+    """Reconstruct all stored vectors in position order."""
+    index = faiss.downcast_index(index)
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    if isinstance(index, faiss.IndexIVF):
+        # direct map is only needed for reconstruction and blocks remove_ids
+        index.make_direct_map()
+        vectors = index.reconstruct_n(0, index.ntotal)
+        index.make_direct_map(False)
+        return vectors
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def uses_tombstones(index) -> bool:
+    """True if deletes on index only mark positions, see remove_positions."""
+    return get_index_type(index) == "hnsw"
+
+
+def migrate_index(index, index_type: IndexType):
+    """Return an index of index_type holding the same vectors, or the same index if it already matches."""
+    if get_index_type(index) == index_type:
+        return index
+    return create_index(index.d, index_type, get_vectors(index))
+
+
+def remove_positions(index, positions: np.ndarray):
+    """Remove vectors at positions and shift the following ones down, returns the updated index.
+
+    On HNSW this rebuilds the graph, callers keep tombstones instead and remove
+    them in bulk.
+    """
+    positions = np.unique(np.asarray(positions, dtype=np.int64))
+    if not len(positions):
+        return index
+    # the downcast wrapper does not own the index, always hand back the original
+    original = index
+    index = faiss.downcast_index(index)
+
+    if isinstance(index, faiss.IndexHNSW):
+        # HNSW has no removal, rebuild the graph from the remaining vectors
+        keep = np.ones(index.ntotal, dtype=bool)
+        keep[positions] = False
+        rebuilt = create_index(index.d, "hnsw", get_vectors(index)[keep])
+        rebuilt.hnsw.efSearch = index.hnsw.efSearch
+        return rebuilt
+
+    index.remove_ids(positions)
+
+    if isinstance(index, faiss.IndexIVF):
+        # IVF keeps explicit ids, renumber them to stay contiguous
+        invlists = index.invlists
+        for list_no in range(index.nlist):
+            size = invlists.list_size(list_no)
+            if not size:
+                continue
+            ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+            ids -= np.searchsorted(positions, ids)
+
+    return original
+
+
+def search_params(index, selector):
+    """Search parameters restricting a search on index to the positions accepted by selector."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def _ivf_lists(size: int) -> int:
+    # ~4*sqrt(n) lists, keeping the 39 training points per list faiss asks for
+    return max(1, min(int(4 * math.sqrt(size)), size // 39, IVF_MAX_LISTS))
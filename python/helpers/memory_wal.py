@@ -0,0 +1,278 @@
+"""
+Append-only write-ahead log for the FAISS memory databases.
+
+Every insert/delete on a memory subdir is appended to ``index.wal`` (one JSON
+record per line, vectors stored as base64 float32) instead of rewriting the
+whole ``index.faiss`` / ``index.pkl`` snapshot. Once the log grows past a
+threshold it is compacted: the log is rotated to ``index.wal.compacting``, the
+in-memory index is serialized and written to disk on a background thread, and
+the rotated log is dropped. On startup the snapshot is loaded and both logs are
+replayed; replay is idempotent, so a crash at any point loses nothing.
+
+A snapshot is written as a ``*.new`` pair next to the current one and switched
+to by a commit marker: once the marker exists the new pair is complete and is
+moved into place, on startup as well if the process died halfway through.
+"""
+
+import base64
+import json
+import os
+import pickle
+import threading
+from typing import Any, Iterator, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+
+from python.helpers.faiss_loader import faiss
+from python.helpers.print_style import PrintStyle
+
+WAL_FILE = "index.wal"
+COMPACTING_FILE = "index.wal.compacting"
+SNAPSHOT_FILES = ("index.faiss", "index.pkl")
+NEW_SUFFIX = ".new"
+COMMIT_FILE = "index.snapshot.commit"
+
+# number of logged records after which the snapshot is rewritten
+COMPACT_AFTER = 500
+
+
+class MemoryWal:
+
+    def __init__(self, db_dir: str, compact_after: int = COMPACT_AFTER):
+        self.db_dir = db_dir
+        self.path = os.path.join(db_dir, WAL_FILE)
+        self.compacting_path = os.path.join(db_dir, COMPACTING_FILE)
+        self.commit_path = os.path.join(db_dir, COMMIT_FILE)
+        self.compact_after = compact_after
+        self.entries = _count_lines(self.path)
+        self._lock = threading.Lock()
+        self._compaction: threading.Thread | None = None
+
+    def append_insert(
+        self,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Sequence[dict[str, Any]],
+    ):
+        self._append(
+            [
+                {
+                    "op": "insert",
+                    "id": id,
+                    "text": text,
+                    "metadata": metadata,
+                    "vector": _encode_vector(vector),
+                }
+                for id, text, vector, metadata in zip(ids, texts, vectors, metadatas)
+            ]
+        )
+
+    def append_delete(self, ids: Sequence[str]):
+        if ids:
+            self._append([{"op": "delete", "ids": list(ids)}])
+
+    def _append(self, records: list[dict[str, Any]]):
+        if not records:
+            return
+        lines = "".join(
+            json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            for record in records
+        )
+        with self._lock:
+            os.makedirs(self.db_dir, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self.entries += len(records)
+
+    def replay(self, db) -> int:
+        """Apply logged operations on top of a loaded snapshot, returns number of applied records."""
+        applied = 0
+        for path in (self.compacting_path, self.path):
+            for record in _read_records(path):
+                if _apply_record(db, record):
+                    applied += 1
+        return applied
+
+    def replay_documents(self, docs: dict[str, Any]) -> dict[str, Any]:
+        """Apply logged operations to documents by id, used when the index is rebuilt from texts."""
+        for path in (self.compacting_path, self.path):
+            for record in _read_records(path):
+                op = record.get("op")
+                if op == "insert" and record["id"] not in docs:
+                    docs[record["id"]] = Document(
+                        page_content=record["text"],
+                        metadata=record.get("metadata") or {},
+                    )
+                elif op == "delete":
+                    for id in record.get("ids", []):
+                        docs.pop(id, None)
+        return docs
+
+    def recover(self):
+        """Finish a snapshot switch interrupted by a crash, or drop a half written snapshot."""
+        with self._lock:
+            if os.path.exists(self.commit_path):
+                self._install_snapshot()
+            else:
+                for name in SNAPSHOT_FILES:
+                    path = os.path.join(self.db_dir, name + NEW_SUFFIX)
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def save(self, db):
+        """Write a full snapshot of db now and drop all log files."""
+        with self._lock:
+            # a running compaction must not install its older snapshot after this one
+            self.wait()
+            index_bytes = faiss.serialize_index(db.index)
+            store_bytes = pickle.dumps((db.docstore, db.index_to_docstore_id))
+            os.makedirs(self.db_dir, exist_ok=True)
+            self._commit_snapshot(index_bytes, store_bytes)
+            for path in (self.compacting_path, self.path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.entries = 0
+
+    def needs_compaction(self) -> bool:
+        return self.entries >= self.compact_after
+
+    def is_compacting(self) -> bool:
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def compact(self, db, background: bool = True) -> bool:
+        """Write a fresh snapshot of db and drop the log records it contains."""
+        with self._lock:
+            if self.is_compacting():
+                return False
+            self._rotate()
+            self.entries = 0
+            # serialize while holding the lock so no record can slip between
+            # the rotated log and the snapshot, disk writes happen outside of it
+            index_bytes = faiss.serialize_index(db.index)
+            store_bytes = pickle.dumps((db.docstore, db.index_to_docstore_id))
+
+            if not background:
+                self._write_snapshot(index_bytes, store_bytes)
+                return True
+
+            self._compaction = threading.Thread(
+                target=self._write_snapshot,
+                args=(index_bytes, store_bytes),
+                name="MemoryCompaction",
+                daemon=True,
+            )
+            self._compaction.start()
+            return True
+
+    def wait(self, timeout: float | None = None):
+        compaction = self._compaction
+        if compaction:
+            compaction.join(timeout)
+
+    def _rotate(self):
+        if not os.path.exists(self.path):
+            return
+        if os.path.exists(self.compacting_path):
+            # previous compaction did not finish, keep its records as well
+            with open(self.path, "r", encoding="utf-8") as src, open(
+                self.compacting_path, "a", encoding="utf-8"
+            ) as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self.compacting_path)
+
+    def _write_snapshot(self, index_bytes: np.ndarray, store_bytes: bytes):
+        try:
+            self._commit_snapshot(index_bytes, store_bytes)
+            if os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+        except Exception as e:
+            # the rotated log stays on disk and will be replayed/compacted again
+            PrintStyle.error(f"Memory compaction failed in '{self.db_dir}': {e}")
+
+    def _commit_snapshot(self, index_bytes: np.ndarray, store_bytes: bytes):
+        faiss_file, pkl_file = (
+            os.path.join(self.db_dir, name + NEW_SUFFIX) for name in SNAPSHOT_FILES
+        )
+        _write_atomic(faiss_file, index_bytes.tobytes())
+        _write_atomic(pkl_file, store_bytes)
+        # the marker is the switch point, before it the old pair is current
+        _write_atomic(self.commit_path, b"")
+        self._install_snapshot()
+
+    def _install_snapshot(self):
+        for name in SNAPSHOT_FILES:
+            path = os.path.join(self.db_dir, name)
+            if os.path.exists(path + NEW_SUFFIX):
+                os.replace(path + NEW_SUFFIX, path)
+        os.remove(self.commit_path)
+
+
+def _apply_record(db, record: dict[str, Any]) -> bool:
+    docs = db.docstore._dict  # type: ignore
+    op = record.get("op")
+    if op == "insert":
+        id = record["id"]
+        if id in docs:
+            return False
+        db.add_embeddings(
+            [(record["text"], _decode_vector(record["vector"]))],
+            metadatas=[record.get("metadata") or {}],
+            ids=[id],
+        )
+        return True
+    if op == "delete":
+        ids = [id for id in record.get("ids", []) if id in docs]
+        if not ids:
+            return False
+        db.delete(ids=ids)
+        return True
+    return False
+
+
+def _read_records(path: str) -> Iterator[dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # torn last line after a crash, everything before it is valid
+                PrintStyle.warning(f"Skipping incomplete memory log record in '{path}'")
+
+
+def _count_lines(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def _write_atomic(path: str, content: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _encode_vector(vector: Sequence[float]) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode(
+        "ascii"
+    )
+
+
+def _decode_vector(data: str) -> list[float]:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32).tolist()
@@ -0,0 +1,482 @@
+"""
+Secondary metadata index for the FAISS stores.
+
+Keeps an inverted index (key -> value -> ids) over scalar document metadata and
+a sorted list of timestamps, so filter strings like ``area == 'main'`` or
+``area in ['main', 'fragments'] and timestamp >= '2025-01-01'`` resolve to a
+candidate id set without evaluating the filter on every document. The
+candidates restrict the FAISS search up front through an ID selector; the
+original filter is still evaluated on them, so conditions the index cannot
+answer keep working unchanged.
+"""
+
+import ast
+import bisect
+import operator
+from typing import Any, Callable, Iterable, Sequence
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+
+from python.helpers.faiss_loader import faiss
+from python.helpers import memory_index
+
+# keys answered from a sorted list instead of value sets
+SORTED_KEYS = ("timestamp",)
+# unique per document, answered from the docstore directly
+ID_KEY = "id"
+# candidates of a metadata search covering at least this share of the docstore are
+# found by scanning it in order, smaller sets are sorted by their index positions
+SCAN_CANDIDATES_SHARE = 0.1
+
+_RANGE_OPS = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+
+
+class MetadataIndex:
+
+    def __init__(self):
+        self.values: dict[str, dict[Any, set[str]]] = {}
+        self.sorted: dict[str, list[tuple[Any, str]]] = {key: [] for key in SORTED_KEYS}
+
+    @staticmethod
+    def from_documents(docs: dict[str, Document]) -> "MetadataIndex":
+        index = MetadataIndex()
+        for id, doc in docs.items():
+            index.add(id, doc.metadata)
+        for entries in index.sorted.values():
+            entries.sort()
+        return index
+
+    def add(self, id: str, metadata: dict[str, Any]):
+        for key, value in metadata.items():
+            if key == ID_KEY or not _is_indexable(value):
+                continue
+            if key in self.sorted:
+                try:
+                    bisect.insort(self.sorted[key], (value, id))
+                except TypeError:
+                    pass  # value not comparable with the others, filter falls back to eval
+            else:
+                self.values.setdefault(key, {}).setdefault(value, set()).add(id)
+
+    def remove(self, id: str, metadata: dict[str, Any]):
+        for key, value in metadata.items():
+            if key == ID_KEY or not _is_indexable(value):
+                continue
+            if key in self.sorted:
+                entries = self.sorted[key]
+                try:
+                    pos = bisect.bisect_left(entries, (value, id))
+                except TypeError:
+                    continue
+                if pos < len(entries) and entries[pos] == (value, id):
+                    del entries[pos]
+            else:
+                ids = self.values.get(key, {}).get(value)
+                if ids is not None:
+                    ids.discard(id)
+                    if not ids:
+                        del self.values[key][value]
+
+    def ids_by_value(self, key: str, value: Any) -> set[str]:
+        if key in self.sorted:
+            return set(self.ids_by_range(key, value, value))
+        return self.values.get(key, {}).get(value, set())
+
+    def ids_by_range(
+        self, key: str, lower: Any = None, upper: Any = None,
+        include_lower: bool = True, include_upper: bool = True,
+    ) -> list[str]:
+        """Ids with lower <= value <= upper (bounds optional), ordered by value."""
+        entries = self.sorted.get(key, [])
+        start, end = 0, len(entries)
+        try:
+            if lower is not None:
+                find = bisect.bisect_left if include_lower else bisect.bisect_right
+                start = find(entries, (lower,) if include_lower else (lower, _MAX))
+            if upper is not None:
+                find = bisect.bisect_right if include_upper else bisect.bisect_left
+                end = find(entries, (upper, _MAX) if include_upper else (upper,))
+        except TypeError:
+            # bound not comparable with stored values
+            return []
+        return [id for _, id in entries[start:end]]
+
+    def latest(self, key: str = "timestamp", limit: int = 0) -> list[str]:
+        """Ids ordered from the newest value of a sorted key."""
+        entries = self.sorted.get(key, [])
+        selected = entries[-limit:] if limit > 0 else entries
+        return [id for _, id in reversed(selected)]
+
+    def candidates(self, condition: str, docs: dict[str, Any]) -> set[str] | None:
+        """Superset of ids matching condition, or None when the index cannot narrow it down."""
+        try:
+            tree = ast.parse(condition.strip(), mode="eval")
+        except SyntaxError:
+            return None
+        result = self._plan(tree.body, docs)
+        return None if result is None else set(result)
+
+    def _plan(self, node: ast.AST, docs: dict[str, Any]) -> set[str] | None:
+        if isinstance(node, ast.BoolOp):
+            parts = [self._plan(value, docs) for value in node.values]
+            if isinstance(node.op, ast.And):
+                known = sorted((p for p in parts if p is not None), key=len)
+                if not known:
+                    return None
+                return known[0].intersection(*known[1:])
+            if any(p is None for p in parts):
+                return None
+            return set().union(*parts)  # type: ignore
+
+        if not isinstance(node, ast.Compare) or len(node.ops) != 1:
+            return None
+        left, op, right = node.left, node.ops[0], node.comparators[0]
+        if isinstance(left, ast.Constant) and isinstance(right, ast.Name):
+            # 'main' == area -> area == 'main'
+            left, right, op = right, left, _flip(op)
+        if not isinstance(left, ast.Name) or op is None:
+            return None
+        key = left.id
+
+        if isinstance(op, ast.Eq) and isinstance(right, ast.Constant):
+            return self._lookup(key, right.value, docs)
+        if isinstance(op, ast.In) and isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+            if not all(isinstance(e, ast.Constant) for e in right.elts):
+                return None
+            return set().union(
+                *(self._lookup(key, e.value, docs) for e in right.elts)  # type: ignore
+            )
+        if (
+            isinstance(op, _RANGE_OPS)
+            and isinstance(right, ast.Constant)
+            and key in self.sorted
+        ):
+            if isinstance(op, (ast.Gt, ast.GtE)):
+                ids = self.ids_by_range(
+                    key, lower=right.value, include_lower=isinstance(op, ast.GtE)
+                )
+            else:
+                ids = self.ids_by_range(
+                    key, upper=right.value, include_upper=isinstance(op, ast.LtE)
+                )
+            return set(ids)
+        return None
+
+    def _lookup(self, key: str, value: Any, docs: dict[str, Any]) -> set[str]:
+        if key == ID_KEY:
+            doc = docs.get(value) if _is_indexable(value) else None
+            return {value} if doc is not None and doc.metadata.get(ID_KEY) == value else set()
+        if not _is_indexable(value):
+            return set()
+        return self.ids_by_value(key, value)
+
+
+class MetadataIndexedFaiss(FAISS):
+    """FAISS store keeping a MetadataIndex in sync with its docstore.
+
+    Pass ``candidate_ids`` to the search methods to restrict the vector search to
+    those documents. Deletes go through memory_index.remove_positions, so any
+    index type created by memory_index can be used. On HNSW deleted positions
+    are dropped from ``index_to_docstore_id`` only and excluded from searches,
+    the index is compacted once there are too many of them.
+    """
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        index = getattr(self, "_metadata_index", None)
+        if index is None:
+            # built lazily, snapshots only persist the docstore
+            index = MetadataIndex.from_documents(self.docstore._dict)  # type: ignore
+            self._metadata_index = index
+        return index
+
+    def filter_candidates(self, condition: str) -> set[str] | None:
+        return self.metadata_index.candidates(condition, self.docstore._dict)  # type: ignore
+
+    def add_texts(self, texts: Iterable[str], metadatas=None, ids=None, **kwargs: Any) -> list[str]:
+        ids = super().add_texts(texts, metadatas=metadatas, ids=ids, **kwargs)
+        self._index_added(ids)
+        return ids
+
+    async def aadd_texts(self, texts: Iterable[str], metadatas=None, ids=None, **kwargs: Any) -> list[str]:
+        ids = await super().aadd_texts(texts, metadatas=metadatas, ids=ids, **kwargs)
+        self._index_added(ids)
+        return ids
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs: Any) -> list[str]:
+        ids = super().add_embeddings(text_embeddings, metadatas=metadatas, ids=ids, **kwargs)
+        self._index_added(ids)
+        return ids
+
+    # new vectors are appended after the last position, which is not the
+    # length of index_to_docstore_id if the index has tombstones
+    def _FAISS__add(self, texts, embeddings, metadatas=None, ids=None) -> list[str]:
+        start = self.index.ntotal
+        positions = self.index_to_docstore_id
+        self.index_to_docstore_id = {}
+        try:
+            ids = FAISS._FAISS__add(self, texts, embeddings, metadatas=metadatas, ids=ids)  # type: ignore
+            added = self.index_to_docstore_id
+        finally:
+            self.index_to_docstore_id = positions
+        positions.update({start + j: id_ for j, id_ in added.items()})
+        positions_map = getattr(self, "_positions_map", None)
+        if positions_map is not None:
+            for j, id_ in added.items():
+                positions_map[id_] = start + j
+        return ids
+
+    def index_in_sync(self) -> bool:
+        """False if index_to_docstore_id does not fit the index, e.g. after an interrupted write."""
+        if memory_index.uses_tombstones(self.index):
+            return max(self.index_to_docstore_id, default=-1) < self.index.ntotal
+        return len(self.index_to_docstore_id) == self.index.ntotal
+
+    def compact_index(self):
+        """Remove the tombstones of deleted vectors from the index."""
+        tombstones = self._tombstones()
+        if len(tombstones):
+            self._remove_positions(tombstones)
+
+    # override delete, langchain only handles flat indexes that shift on removal
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool | None:
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        reversed_index = {id_: idx for idx, id_ in self.index_to_docstore_id.items()}
+        missing_ids = set(ids).difference(reversed_index)
+        if missing_ids:
+            raise ValueError(
+                f"Some specified ids do not exist in the current store. Ids not found: "
+                f"{missing_ids}"
+            )
+
+        docs = self.docstore._dict  # type: ignore
+        removed = [(id_, docs[id_].metadata) for id_ in ids if id_ in docs]
+
+        index_to_delete = np.fromiter(
+            {reversed_index[id_] for id_ in ids}, dtype=np.int64
+        )
+        self.docstore.delete(ids)  # type: ignore
+        if memory_index.uses_tombstones(self.index):
+            # the vectors stay in the graph, searches skip their positions
+            positions_map = getattr(self, "_positions_map", None)
+            for id_ in ids:
+                del self.index_to_docstore_id[reversed_index[id_]]
+                if positions_map is not None:
+                    positions_map.pop(id_, None)
+            self._tombstone_params = None
+            tombstones = self._tombstones()
+            if len(tombstones) > self.index.ntotal * memory_index.HNSW_MAX_TOMBSTONES:
+                self._remove_positions(tombstones)
+        else:
+            self._remove_positions(index_to_delete)
+
+        metadata_index = getattr(self, "_metadata_index", None)
+        if metadata_index is not None:
+            for id_, metadata in removed:
+                metadata_index.remove(id_, metadata)
+        return True
+
+    def _remove_positions(self, positions: np.ndarray):
+        self.index = memory_index.remove_positions(self.index, positions)
+        removed = set(positions.tolist())
+        remaining_ids = [
+            id_
+            for i, id_ in sorted(self.index_to_docstore_id.items())
+            if i not in removed
+        ]
+        self.index_to_docstore_id = {i: id_ for i, id_ in enumerate(remaining_ids)}
+        self._positions_map = None
+        self._tombstone_params = None
+
+    def _tombstones(self) -> np.ndarray:
+        if len(self.index_to_docstore_id) == self.index.ntotal:
+            return np.empty(0, dtype=np.int64)
+        live = np.fromiter(self.index_to_docstore_id, dtype=np.int64)
+        return np.setdiff1d(np.arange(self.index.ntotal, dtype=np.int64), live)
+
+    def _search_params(self, candidate_ids: set[str] | None) -> tuple[int, Any]:
+        """Number of searchable vectors and the search parameters restricting the search to them."""
+        if candidate_ids is not None:
+            positions = self._positions(candidate_ids)
+            if not len(positions):
+                return 0, None
+            selector = faiss.IDSelectorBatch(positions)
+            return len(positions), memory_index.search_params(self.index, selector)
+
+        size = len(self.index_to_docstore_id)
+        if size == self.index.ntotal:
+            return size, None
+        # skip tombstones, cached until the next delete
+        params = getattr(self, "_tombstone_params", None)
+        if params is None:
+            selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(self._tombstones()))
+            params = memory_index.search_params(self.index, selector)
+            self._tombstone_params = params
+        return size, params
+
+    def _index_added(self, ids: Sequence[str]):
+        metadata_index = getattr(self, "_metadata_index", None)
+        if metadata_index is None:
+            return
+        docs = self.docstore._dict  # type: ignore
+        for id_ in ids:
+            metadata_index.add(id_, docs[id_].metadata)
+
+    def search_by_metadata(
+        self, condition: str, comparator: Callable[[dict[str, Any]], bool], limit: int = 0
+    ) -> list[Document]:
+        docs = self.docstore._dict  # type: ignore
+        candidates = self.filter_candidates(condition)
+        # matches are returned in docstore order, a limit keeps the first ones
+        if candidates is None:
+            pool = docs.values()
+        elif len(candidates) >= len(docs) * SCAN_CANDIDATES_SHARE:
+            pool = (doc for id_, doc in docs.items() if id_ in candidates)
+        else:
+            pool = (docs[id_] for id_ in self._in_docstore_order(candidates) if id_ in docs)
+        result = []
+        for doc in pool:
+            if comparator(doc.metadata):
+                result.append(doc)
+                # stop if limit reached and limit > 0
+                if limit > 0 and len(result) >= limit:
+                    break
+        return result
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        filter=None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        candidate_ids = kwargs.pop("candidate_ids", None)
+        size, params = self._search_params(candidate_ids)
+        if params is None and candidate_ids is None:
+            return super().similarity_search_with_score_by_vector(
+                embedding, k, filter=filter, fetch_k=fetch_k, **kwargs
+            )
+        if not size:
+            return []
+
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+        # every hit already passed the index, fetch_k only covers residual conditions
+        fetch = min(size, k if filter is None else max(k, fetch_k))
+        scores, indices = self.index.search(vector, fetch, params=params)
+
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+        docs = []
+        for j, i in enumerate(indices[0]):
+            if i == -1:
+                continue
+            doc = self.docstore.search(self.index_to_docstore_id[i])
+            if not isinstance(doc, Document):
+                continue
+            if filter_func is None or filter_func(doc.metadata):
+                docs.append((doc, scores[0][j]))
+
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            cmp = (
+                operator.ge
+                if self.distance_strategy
+                in (DistanceStrategy.MAX_INNER_PRODUCT, DistanceStrategy.JACCARD)
+                else operator.le
+            )
+            docs = [(doc, score) for doc, score in docs if cmp(score, score_threshold)]
+        return docs[:k]
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[list[float]],
+        k: int = 4,
+        filter=None,
+        fetch_k: int = 20,
+        candidate_ids: set[str] | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """Search several query vectors as one matrix query, one result list per vector."""
+        if not len(embeddings):
+            return []
+        size, params = self._search_params(candidate_ids)
+        if not size:
+            return [[] for _ in embeddings]
+
+        vectors = np.array(embeddings, dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vectors)
+        fetch = min(size, k if filter is None else max(k, fetch_k))
+        scores, indices = self.index.search(vectors, fetch, params=params)
+
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            docs = []
+            for score, i in zip(row_scores, row_indices):
+                if i == -1:
+                    continue
+                doc = self.docstore.search(self.index_to_docstore_id[i])
+                if not isinstance(doc, Document):
+                    continue
+                if filter_func is None or filter_func(doc.metadata):
+                    docs.append((doc, float(score)))
+            results.append(docs[:k])
+        return results
+
+    def get_vectors(self, ids: Iterable[str]) -> dict[str, np.ndarray]:
+        """Stored vectors by document id, empty if the index cannot reconstruct them."""
+        ids = [id_ for id_ in ids if id_ in self.docstore._dict]  # type: ignore
+        positions = self._positions(ids)
+        if not len(positions):
+            return {}
+        try:
+            vectors = self.index.reconstruct_batch(positions)
+        except RuntimeError:
+            return {}
+        by_position = {pos: vector for pos, vector in zip(positions.tolist(), vectors)}
+        return {id_: by_position[self._positions_map[id_]] for id_ in ids}  # type: ignore
+
+    def _in_docstore_order(self, ids: Iterable[str]) -> list[str]:
+        # vectors are appended to the index as documents are added to the docstore
+        # and removals keep the order, so index positions follow the docstore order
+        self._positions([])
+        positions_map = self._positions_map
+        return sorted(ids, key=lambda id_: positions_map.get(id_, -1))
+
+    def _positions(self, ids: Iterable[str]) -> np.ndarray:
+        positions_map = getattr(self, "_positions_map", None)
+        if positions_map is None:
+            positions_map = {id_: pos for pos, id_ in self.index_to_docstore_id.items()}
+            self._positions_map = positions_map
+        return np.fromiter(
+            (positions_map[id_] for id_ in ids if id_ in positions_map), dtype=np.int64
+        )
+
+
+class _Max:
+    # sorts after any id, used as the upper sentinel of (value, id) tuples
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_MAX = _Max()
+
+
+def _flip(op: ast.cmpop) -> ast.cmpop | None:
+    flipped = {
+        ast.Eq: ast.Eq, ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE,
+    }.get(type(op))
+    return flipped() if flipped else None
+
+
+def _is_indexable(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool)) or value is None
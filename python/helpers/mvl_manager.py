@@ -5,115 +5,75 @@ from typing import Optional, List, Any, Dict, Tuple
 import logging
 from datetime import datetime
 import json
-from contextlib import contextmanager
+import threading
+
+import numpy as np
 
 from python.helpers import loom_logic
 from python.helpers import files
+from python.helpers import mvl_store
+from python.helpers.query_embeddings import CachedQueryEmbeddings
 from python.helpers.print_style import PrintStyle
 from python.helpers.dirty_json import DirtyJson
 from difflib import SequenceMatcher
 
-class MVLManager:
-    def __init__(self, db_path: str = "loom.db", agent: Any = None):
-        self.db_path = files.get_abs_path(db_path)
-        self.agent = agent
-        self._init_db()
+INSERT_PATTERN_SQL = '''
+    INSERT INTO pattern_echo (
+        id, user_id, type, summary, evidence_event_ids,
+        first_seen_ts, last_seen_ts, strength, recency,
+        lore_weight, status, embedding_id
+    ) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?)
+'''
 
-    @contextmanager
-    def _get_db(self):
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        cursor.execute('PRAGMA journal_mode=WAL;')
-        cursor.execute('PRAGMA synchronous=NORMAL;')
-        try:
-            yield conn
-            conn.commit()
-        finally:
-            conn.close()
+# recent messages of a user that novelty is measured against, message_embedding
+# only keeps as many vectors per user and model as the largest window of the
+# managers of the database, older ones are pruned on insert
+NOVELTY_WINDOW_SIZE = 20
 
-    def _init_db(self) -> None:
-        with self._get_db() as conn:
-            cursor = conn.cursor()
+PRUNE_EMBEDDINGS_SQL = '''
+    DELETE FROM message_embedding WHERE user_id = ? AND model = ? AND rowid NOT IN (
+        SELECT rowid FROM message_embedding WHERE user_id = ? AND model = ?
+        ORDER BY rowid DESC LIMIT ?
+    )
+'''
 
-            # Always run CREATE TABLE IF NOT EXISTS
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS interaction_event (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                ts DATETIME DEFAULT CURRENT_TIMESTAMP,
-                role TEXT CHECK(role IN ('user', 'aria', 'system')),
-                text TEXT,
-                tokens INTEGER,
-                channel TEXT CHECK(channel IN ('chat', 'voice', 'image', 'file')),
-                intent_tag TEXT,
-                utility_flag BOOLEAN,
-                novelty REAL CHECK(novelty BETWEEN 0 AND 1),
-                narrative_weight REAL CHECK(narrative_weight BETWEEN 0 AND 1),
-                entropy_delta REAL CHECK(entropy_delta BETWEEN -1 AND 1),
-                meaningfulness REAL CHECK(meaningfulness BETWEEN 0 AND 1),
-                mt_gate TEXT CHECK(mt_gate IN ('silence', 'reply', 'refuse', 'delay', 'confront')),
-                pattern_ids TEXT,
-                embedding_id TEXT
-            )
-            ''')
+# embedding models by model id, shared by all managers
+_embeddings: Dict[str, CachedQueryEmbeddings] = {}
+_embeddings_lock = threading.Lock()
 
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS pattern_echo (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                type TEXT CHECK(type IN ('contradiction', 'loop', 'confession', 'boundary', 'desire', 'fear', 'goal', 'identity_claim', 'trigger')),
-                summary TEXT,
-                evidence_event_ids TEXT,
-                first_seen_ts DATETIME,
-                last_seen_ts DATETIME,
-                strength REAL CHECK(strength BETWEEN 0 AND 1),
-                recency REAL CHECK(recency BETWEEN 0 AND 1),
-                lore_weight REAL CHECK(lore_weight BETWEEN 0 AND 1),
-                status TEXT CHECK(status IN ('active', 'resolved', 'dormant', 'retired')),
-                embedding_id TEXT
-            )
-            ''')
 
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS archetype_state (
-                id TEXT PRIMARY KEY,
-                user_id TEXT NOT NULL,
-                ts DATETIME DEFAULT CURRENT_TIMESTAMP,
-                axes TEXT,
-                delta_axes TEXT,
-                confidence REAL CHECK(confidence BETWEEN 0 AND 1),
-                source_pattern_ids TEXT
-            )
-            ''')
+class EmbeddingWindow:
+    """Normalized embeddings of the most recent messages of one user, oldest first."""
 
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS loom_state (
-                user_id TEXT PRIMARY KEY,
-                entropy REAL CHECK(entropy BETWEEN 0 AND 1),
-                dormancy BOOLEAN,
-                last_active_ts DATETIME,
-                silence_streak INTEGER,
-                dependency_risk REAL CHECK(dependency_risk BETWEEN 0 AND 1),
-                mask_weights TEXT,
-                last_archetype_state_id TEXT,
-                FOREIGN KEY(last_archetype_state_id) REFERENCES archetype_state(id)
-            )
-            ''')
-
-            # Add Indexes
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_interaction_event_user_ts ON interaction_event(user_id, ts DESC)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_pattern_echo_user ON pattern_echo(user_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_loom_state_user ON loom_state(user_id)")
-
-            # Check for columns that might be missing in existing dbs
-            cursor.execute("PRAGMA table_info(interaction_event)")
-            columns = [info[1] for info in cursor.fetchall()]
-            if "pattern_ids" not in columns:
-                cursor.execute("ALTER TABLE interaction_event ADD COLUMN pattern_ids TEXT")
-            if "embedding_id" not in columns:
-                cursor.execute("ALTER TABLE interaction_event ADD COLUMN embedding_id TEXT")
-
-        # print(f"MVL Database initialized at {self.db_path}")
+    def __init__(self, size: int, vectors: Optional[np.ndarray] = None):
+        self.size = size
+        self.vectors = vectors
+
+    def novelty(self, vector: np.ndarray) -> float:
+        if self.vectors is None or not len(self.vectors):
+            return 1.0 # Max novelty if no history
+        # Novelty is inverse of the highest cosine similarity
+        max_sim = float(np.max(self.vectors @ vector))
+        return min(1.0, max(0.0, 1.0 - max_sim))
+
+    def add(self, vector: np.ndarray):
+        if self.vectors is None:
+            self.vectors = vector[np.newaxis, :]
+        else:
+            self.vectors = np.vstack([self.vectors, vector])[-self.size:]
+
+
+class MVLManager:
+    def __init__(self, db_path: str = "loom.db", agent: Any = None, novelty_window: int = NOVELTY_WINDOW_SIZE):
+        self.db_path = files.get_abs_path(db_path)
+        self.agent = agent
+        self.novelty_window = novelty_window
+        self.store = mvl_store.get_store(self.db_path)
+        self.store.register_novelty_window(novelty_window)
+
+    def _get_db(self):
+        # pooled connection of the shared store, the schema is already in place
+        return self.store.connection()
 
     def get_state(self, user_id):
         with self._get_db() as conn:
@@ -188,38 +148,109 @@ class MVLManager:
 
         new_pattern_ids = []
         if analysis and "pattern_candidates" in analysis:
+            rows = [
+                (
+                    str(uuid.uuid4()),
+                    user_id,
+                    pattern.get("type", "trigger"),
+                    pattern.get("summary", ""),
+                    json.dumps([]), # Placeholder for evidence IDs
+                    0.5, # Default strength
+                    1.0, # Default recency
+                    pattern.get("lore_weight", 0.5),
+                    "active",
+                    None
+                )
+                for pattern in analysis["pattern_candidates"]
+                if isinstance(pattern, dict)
+            ]
             with self._get_db() as conn:
-                cursor = conn.cursor()
-
-                for pattern in analysis["pattern_candidates"]:
-                    pattern_id = str(uuid.uuid4())
-                    try:
-                        cursor.execute('''
-                            INSERT INTO pattern_echo (
-                                id, user_id, type, summary, evidence_event_ids,
-                                first_seen_ts, last_seen_ts, strength, recency,
-                                lore_weight, status, embedding_id
-                            ) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, ?, ?, ?, ?, ?)
-                        ''', (
-                            pattern_id,
-                            user_id,
-                            pattern.get("type", "trigger"),
-                            pattern.get("summary", ""),
-                            json.dumps([]), # Placeholder for evidence IDs
-                            0.5, # Default strength
-                            1.0, # Default recency
-                            pattern.get("lore_weight", 0.5),
-                            "active",
-                            None
-                        ))
-                        new_pattern_ids.append(pattern_id)
-                    except Exception as e:
-                        PrintStyle().print(f"Pattern Insert Error: {e}")
+                new_pattern_ids = self._insert_patterns(conn, rows)
 
         return analysis, new_pattern_ids
 
+    def _insert_patterns(self, conn, rows: List[tuple]) -> List[str]:
+        # all candidates in one statement, one by one only if some of them are invalid
+        cursor = conn.cursor()
+        cursor.execute("SAVEPOINT insert_patterns")
+        try:
+            cursor.executemany(INSERT_PATTERN_SQL, rows)
+            cursor.execute("RELEASE insert_patterns")
+            return [row[0] for row in rows]
+        except sqlite3.Error:
+            cursor.execute("ROLLBACK TO insert_patterns")
+            cursor.execute("RELEASE insert_patterns")
+
+        inserted = []
+        for row in rows:
+            try:
+                cursor.execute(INSERT_PATTERN_SQL, row)
+                inserted.append(row[0])
+            except Exception as e:
+                PrintStyle().print(f"Pattern Insert Error: {e}")
+        return inserted
+
     async def calculate_novelty_async(self, text: str, user_id: str) -> float:
-        # 1. Try embedding model if available and we had a vector store (not implemented yet)
+        return await self._calculate_novelty(text, user_id, await self.embed_message(text))
+
+    async def embed_message(self, text: str) -> Optional[Tuple[str, np.ndarray]]:
+        """Model id and normalized embedding of text, None if the agent has no usable embedding model."""
+        if not self.agent or not hasattr(self.agent, "get_embedding_model"):
+            return None
+        try:
+            model_id, embeddings = self._get_embeddings()
+            if not embeddings.is_cached(text):
+                await self.agent.rate_limiter(
+                    model_config=self.agent.config.embeddings_model, input=text
+                )
+            vector = np.asarray(await embeddings.aembed_query(text), dtype=np.float32)
+        except Exception as e:
+            PrintStyle().print(f"MVL Embedding Error: {e}")
+            return None
+
+        norm = np.linalg.norm(vector) if vector.ndim == 1 else 0
+        if not norm:
+            return None
+        return model_id, vector / norm
+
+    def _get_embeddings(self) -> Tuple[str, CachedQueryEmbeddings]:
+        model_config = self.agent.config.embeddings_model
+        model_id = files.safe_file_name(f"{model_config.provider}_{model_config.name}")
+        with _embeddings_lock:
+            if model_id not in _embeddings:
+                _embeddings[model_id] = CachedQueryEmbeddings(
+                    self.agent.get_embedding_model(), model_id
+                )
+            return model_id, _embeddings[model_id]
+
+    def _get_window(self, user_id: str, model_id: str) -> EmbeddingWindow:
+        # loaded from SQLite once, then kept up to date in memory
+        key = ("novelty", model_id, self.novelty_window)
+        window = self.store.get_window(user_id, key)
+        if window is None:
+            with self._get_db() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT vector FROM message_embedding WHERE user_id = ? AND model = ? ORDER BY rowid DESC LIMIT ?",
+                    (user_id, model_id, self.novelty_window),
+                )
+                rows = cursor.fetchall()
+            vectors = [np.frombuffer(r[0], dtype=np.float32) for r in reversed(rows)]
+            window = EmbeddingWindow(self.novelty_window, np.vstack(vectors) if vectors else None)
+            self.store.set_window(user_id, key, window)
+        return window
+
+    async def _calculate_novelty(
+        self, text: str, user_id: str, embedding: Optional[Tuple[str, np.ndarray]]
+    ) -> float:
+        # 1. Cosine similarity with the user's recent message embeddings
+        if embedding:
+            model_id, vector = embedding
+            try:
+                return self._get_window(user_id, model_id).novelty(vector)
+            except Exception as e:
+                PrintStyle().print(f"Novelty calculation error: {e}")
+
         # 2. Fallback to sequence matching with recent history
         try:
             with self._get_db() as conn:
@@ -263,7 +294,8 @@ class MVLManager:
         current_entropy = state["entropy"]
         silence_streak = state["silence_streak"]
 
-        novelty = await self.calculate_novelty_async(text, user_id)
+        embedding = await self.embed_message(text)
+        novelty = await self._calculate_novelty(text, user_id, embedding)
         narrative_weight = self.calculate_narrative_weight_heuristic(text)
 
         # Detect patterns
@@ -308,20 +340,39 @@ class MVLManager:
 
         # Record event
         event_id = str(uuid.uuid4())
+        embedding_id = str(uuid.uuid4()) if embedding else None
+        # loaded before the insert so the new vector is not read back as well
+        window = self._get_window(user_id, embedding[0]) if embedding else None
 
         with self._get_db() as conn:
             cursor = conn.cursor()
+            if embedding:
+                model_id, vector = embedding
+                cursor.execute(
+                    "INSERT INTO message_embedding (id, user_id, model, vector) VALUES (?, ?, ?, ?)",
+                    (embedding_id, user_id, model_id, vector.astype(np.float32).tobytes()),
+                )
+                # vectors older than the largest window are never read again, the embedding_id
+                # of their events is kept but no longer resolves
+                cursor.execute(
+                    PRUNE_EMBEDDINGS_SQL,
+                    (user_id, model_id, user_id, model_id, self.store.novelty_window),
+                )
             cursor.execute('''
                 INSERT INTO interaction_event (
                     id, user_id, role, text, novelty, narrative_weight,
-                    entropy_delta, meaningfulness, mt_gate, utility_flag, pattern_ids
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    entropy_delta, meaningfulness, mt_gate, utility_flag, pattern_ids,
+                    embedding_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 event_id, user_id, role, text, novelty, narrative_weight,
                 new_entropy - current_entropy, meaningfulness, mt_gate, utility_flag,
-                json.dumps(new_pattern_ids)
+                json.dumps(new_pattern_ids), embedding_id
             ))
 
+        if window and embedding:
+            window.add(embedding[1])
+
         # Update state
         new_silence_streak = silence_streak + 1 if mt_gate == "silence" else 0
         self.update_state(user_id, new_entropy, new_silence_streak)
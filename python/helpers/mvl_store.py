@@ -0,0 +1,243 @@
+"""
+Process-wide SQLite access for the MVL tables.
+
+There is one MVLStore per database file. Its schema is created and migrated
+once, and its connections (with their WAL pragmas and prepared statement
+caches) are kept in a small pool instead of being opened for every query.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+POOL_SIZE = 4
+CONNECT_TIMEOUT = 30.0
+# prepared statements kept per pooled connection
+STATEMENT_CACHE_SIZE = 64
+# users whose in-memory windows are kept per store, least recently used ones are dropped
+WINDOW_USERS = 1000
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS interaction_event (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP,
+        role TEXT CHECK(role IN ('user', 'aria', 'system')),
+        text TEXT,
+        tokens INTEGER,
+        channel TEXT CHECK(channel IN ('chat', 'voice', 'image', 'file')),
+        intent_tag TEXT,
+        utility_flag BOOLEAN,
+        novelty REAL CHECK(novelty BETWEEN 0 AND 1),
+        narrative_weight REAL CHECK(narrative_weight BETWEEN 0 AND 1),
+        entropy_delta REAL CHECK(entropy_delta BETWEEN -1 AND 1),
+        meaningfulness REAL CHECK(meaningfulness BETWEEN 0 AND 1),
+        mt_gate TEXT CHECK(mt_gate IN ('silence', 'reply', 'refuse', 'delay', 'confront')),
+        pattern_ids TEXT,
+        embedding_id TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS pattern_echo (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        type TEXT CHECK(type IN ('contradiction', 'loop', 'confession', 'boundary', 'desire', 'fear', 'goal', 'identity_claim', 'trigger')),
+        summary TEXT,
+        evidence_event_ids TEXT,
+        first_seen_ts DATETIME,
+        last_seen_ts DATETIME,
+        strength REAL CHECK(strength BETWEEN 0 AND 1),
+        recency REAL CHECK(recency BETWEEN 0 AND 1),
+        lore_weight REAL CHECK(lore_weight BETWEEN 0 AND 1),
+        status TEXT CHECK(status IN ('active', 'resolved', 'dormant', 'retired')),
+        embedding_id TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS archetype_state (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP,
+        axes TEXT,
+        delta_axes TEXT,
+        confidence REAL CHECK(confidence BETWEEN 0 AND 1),
+        source_pattern_ids TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS loom_state (
+        user_id TEXT PRIMARY KEY,
+        entropy REAL CHECK(entropy BETWEEN 0 AND 1),
+        dormancy BOOLEAN,
+        last_active_ts DATETIME,
+        silence_streak INTEGER,
+        dependency_risk REAL CHECK(dependency_risk BETWEEN 0 AND 1),
+        mask_weights TEXT,
+        last_archetype_state_id TEXT,
+        FOREIGN KEY(last_archetype_state_id) REFERENCES archetype_state(id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS message_embedding (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        ts DATETIME DEFAULT CURRENT_TIMESTAMP,
+        model TEXT,
+        vector BLOB
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_interaction_event_user_ts ON interaction_event(user_id, ts DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_pattern_echo_user ON pattern_echo(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_loom_state_user ON loom_state(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_message_embedding_user ON message_embedding(user_id, model)",
+]
+
+# columns that might be missing in existing dbs: (table, column, type)
+MIGRATIONS = [
+    ("interaction_event", "pattern_ids", "TEXT"),
+    ("interaction_event", "embedding_id", "TEXT"),
+]
+
+
+def init_schema(conn: sqlite3.Connection):
+    cursor = conn.cursor()
+    for statement in SCHEMA:
+        cursor.execute(statement)
+
+    columns: dict[str, list[str]] = {}
+    for table, column, column_type in MIGRATIONS:
+        if table not in columns:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns[table] = [info[1] for info in cursor.fetchall()]
+        if column not in columns[table]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+class MVLStore:
+    """Pooled connections to one MVL database with the schema in place."""
+
+    def __init__(self, db_path: str, pool_size: int = POOL_SIZE, window_users: int = WINDOW_USERS):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.window_users = window_users
+        self._idle: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # in-memory caches of data in this database by user, e.g. novelty windows
+        self.windows: OrderedDict[str, dict[tuple, Any]] = OrderedDict()
+        # largest novelty window of the managers of this database, message_embedding
+        # keeps this many vectors per user and model
+        self.novelty_window = 0
+        with self.connection() as conn:
+            init_schema(conn)
+        # pooled connections keep the file open, so a replaced file gets a new inode
+        self.file_id = _get_file_id(db_path)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Pooled connection, committed when the block succeeds and rolled back otherwise."""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def get_window(self, user_id: str, key: tuple) -> Any:
+        with self._lock:
+            windows = self.windows.get(user_id)
+            if windows is None:
+                return None
+            self.windows.move_to_end(user_id)
+            return windows.get(key)
+
+    def set_window(self, user_id: str, key: tuple, window: Any):
+        with self._lock:
+            self.windows.setdefault(user_id, {})[key] = window
+            self.windows.move_to_end(user_id)
+            while len(self.windows) > self.window_users:
+                self.windows.popitem(last=False)
+
+    def register_novelty_window(self, size: int):
+        # a smaller window must not prune vectors that a larger one still reads
+        with self._lock:
+            self.novelty_window = max(self.novelty_window, size)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        if not os.path.exists(self.db_path):
+            # sqlite keeps the WAL of a deleted database, a new database created
+            # at the same path would replay it
+            for suffix in ("-wal", "-shm"):
+                try:
+                    os.remove(self.db_path + suffix)
+                except FileNotFoundError:
+                    pass
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=CONNECT_TIMEOUT,
+            check_same_thread=False,  # pooled connections move between threads
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute('PRAGMA journal_mode=WAL;')
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if not self._closed and len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+_stores: dict[str, MVLStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path: str) -> MVLStore:
+    """Shared store of the database file, recreated if the file was deleted or replaced."""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store and store.file_id != _get_file_id(db_path):
+            store.close()
+            store = None
+        if store is None:
+            store = MVLStore(db_path)
+            _stores[db_path] = store
+        return store
+
+
+@atexit.register
+def close_all():
+    # closing the last connection checkpoints the WAL and removes its files
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+def _get_file_id(path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_dev, stat.st_ino
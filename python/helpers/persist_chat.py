@@ -1,6 +1,11 @@
 from collections import OrderedDict
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Any
+import atexit
+import os
+import threading
+import time
 import uuid
 from agents import Agent, AgentConfig, AgentContext, AgentContextType
 from python.helpers import files, history
@@ -8,10 +13,69 @@ import json
 from initialize import initialize_agent
 
 from python.helpers.log import Log, LogItem
+from python.helpers.print_style import PrintStyle
 
 CHATS_FOLDER = "tmp/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
+INDEX_FILE_NAME = "index.json"
+LOG_FILE_NAME = "log.jsonl"
+HISTORY_FILE_NAME = "history_{number}.json"
+# saves requested within this many seconds are written together
+SAVE_DELAY = 1.0
+# the log file is rewritten once it has this many times more lines than items
+LOG_COMPACT_RATIO = 2
+# loaded chats without a running task are unloaded after this many idle seconds
+EVICT_AFTER = 30 * 60
+
+
+@dataclass
+class _SaveState:
+    """What was written for a chat, used to skip unchanged parts."""
+
+    histories: dict[int, tuple[history.History, int]] = field(default_factory=dict)
+    log_guid: str = ""
+    log_cursor: int = 0
+    log_lines: int = 0
+
+
+@dataclass
+class _ChatSnapshot:
+    """Changes of a chat taken on the thread running the agent, writing them
+    only dumps JSON and does the file I/O."""
+
+    folder: str
+    histories: dict[str, dict[str, Any]] = field(default_factory=dict)  # file -> to_dict
+    removed: set[str] = field(default_factory=set)  # history files of gone subordinates
+    log_items: list[dict[str, Any]] = field(default_factory=list)
+    log_rewrite: bool = False  # log_items replace the log file instead of being appended
+    data: dict[str, Any] = field(default_factory=dict)
+    index_entry: dict[str, Any] = field(default_factory=dict)
+
+    def merge(self, newer: "_ChatSnapshot"):
+        """Add the changes of a newer snapshot of the same chat"""
+        for file in newer.removed:
+            self.histories.pop(file, None)
+        self.removed = (self.removed - newer.histories.keys()) | newer.removed
+        self.histories.update(newer.histories)
+        if newer.log_rewrite:
+            self.log_items = newer.log_items
+            self.log_rewrite = True
+        else:
+            self.log_items += newer.log_items
+        self.data = newer.data
+        self.index_entry = newer.index_entry
+
+
+_states: dict[str, _SaveState] = {}
+_index: dict[str, dict[str, Any]] = {}  # chat index, id -> entry
+_save_lock = threading.RLock()
+# held while snapshots are written, taken before _save_lock
+_write_lock = threading.RLock()
+# context id -> time of the first save request and the changes to write
+_pending: dict[str, tuple[float, _ChatSnapshot]] = {}
+_pending_condition = threading.Condition()
+_writer: threading.Thread | None = None
 
 
 def get_chat_folder_path(ctxid: str):
@@ -28,12 +92,75 @@ def get_chat_folder_path(ctxid: str):
 
 
 def save_tmp_chat(context: AgentContext):
-    """Save context to the chats folder"""
-    path = _get_chat_file_path(context.id)
-    files.make_dirs(path)
-    data = _serialize_context(context)
-    js = _safe_json_serialize(data, ensure_ascii=False)
-    files.write_file(path, js)
+    """Save context to the chats folder, histories and log items that did not
+    change since the last save are not written again"""
+    with _write_lock:
+        with _save_lock:
+            snapshot = _take_snapshot(context)
+            with _pending_condition:
+                pending = _pending.pop(context.id, None)
+        if pending:
+            pending[1].merge(snapshot)
+            snapshot = pending[1]
+        _write_snapshot(context.id, snapshot)
+
+
+def save_tmp_chat_later(context: AgentContext):
+    """Queue a save of the context, requests within SAVE_DELAY are coalesced
+    and written by a background thread. The changes are taken here, on the
+    thread running the agent, the writer does not touch the context."""
+    global _writer
+    with _save_lock:
+        snapshot = _take_snapshot(context)
+        with _pending_condition:
+            pending = _pending.get(context.id)
+            if pending:
+                pending[1].merge(snapshot)
+            else:
+                _pending[context.id] = (time.monotonic(), snapshot)
+            if _writer is None or not _writer.is_alive():
+                _writer = threading.Thread(target=_write_pending, name="ChatWriter", daemon=True)
+                _writer.start()
+            _pending_condition.notify()
+
+
+def flush_pending_chats():
+    """Write all queued saves now"""
+    with _pending_condition:
+        ctxids = list(_pending)
+    for ctxid in ctxids:
+        _save_pending(ctxid)
+
+
+def _write_pending():
+    while True:
+        with _pending_condition:
+            now = time.monotonic()
+            due = [ctxid for ctxid, (since, _) in _pending.items() if now - since >= SAVE_DELAY]
+            if not due:
+                oldest = min((since for since, _ in _pending.values()), default=None)
+                _pending_condition.wait(
+                    None if oldest is None else SAVE_DELAY - (now - oldest)
+                )
+                continue
+        for ctxid in due:
+            _save_pending(ctxid)
+
+
+def _save_pending(ctxid: str):
+    # taken under the write lock so snapshots of a chat are written in order
+    with _write_lock:
+        with _pending_condition:
+            pending = _pending.pop(ctxid, None)
+        if not pending:
+            return  # written or removed meanwhile
+        try:
+            _write_snapshot(ctxid, pending[1])
+        except Exception as e:
+            PrintStyle.error(f"Error saving chat {ctxid}: {e}")
+
+
+atexit.register(flush_pending_chats)
 
 
 def save_tmp_chats():
@@ -43,25 +170,117 @@ def save_tmp_chats():
 
 
 def load_tmp_chats():
-    """Load all contexts from the chats folder"""
+    """Register all contexts from the chats folder, they are listed from the
+    chat index and loaded on first access"""
     _convert_v080_chats()
-    folders = files.list_files(CHATS_FOLDER, "*")
-    json_files = []
-    for folder_name in folders:
-        json_files.append(_get_chat_file_path(folder_name))
-
-    ctxids = []
-    for file in json_files:
-        try:
-            js = files.read_file(file)
-            data = json.loads(js)
-            ctx = _deserialize_context(data)
-            ctxids.append(ctx.id)
-        except Exception as e:
-            print(f"Error loading chat {file}: {e}")
+    AgentContext._loader = _load_chat
+    with _save_lock:
+        index_path = files.get_abs_path(CHATS_FOLDER, INDEX_FILE_NAME)
+        index = _read_index(index_path)
+        index_mtime = os.path.getmtime(index_path) if index else 0
+        _index.clear()
+
+        ctxids = []
+        for folder_name in files.list_files(CHATS_FOLDER, "*"):
+            file = _get_chat_file_path(folder_name)
+            if not os.path.isfile(file):
+                continue
+            try:
+                entry = index.get(folder_name)
+                if not entry or os.path.getmtime(file) > index_mtime:
+                    # not indexed yet or saved after the index
+                    with open(file, "r", encoding="utf-8") as f:
+                        entry = _get_index_entry_from_data(json.load(f))
+                _index[folder_name] = entry
+                AgentContext.add_unloaded(entry)
+                ctxids.append(folder_name)
+            except Exception as e:
+                print(f"Error loading chat {file}: {e}")
+        _write_index()
     return ctxids
 
 
+def evict_idle_chats(idle: float = EVICT_AFTER) -> list[str]:
+    """Save and unload chats not accessed for idle seconds and not running"""
+    now = time.monotonic()
+    evicted = []
+    for context in AgentContext.all():
+        if context.type == AgentContextType.MCP or now - context.last_access < idle:
+            continue
+        if context.task and context.task.is_alive():
+            continue
+        with _write_lock, _save_lock:
+            save_tmp_chat(context)
+            AgentContext.unload(context.id, _get_index_entry(context))
+            _states.pop(context.id, None)
+        evicted.append(context.id)
+    return evicted
+
+
+def _load_chat(ctxid: str) -> AgentContext | None:
+    folder = get_chat_folder_path(ctxid)
+    file = _get_chat_file_path(ctxid)
+    if not os.path.isfile(file):
+        return None
+    with open(file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return _deserialize_context(data, folder=folder)
+
+
+def _get_index_entry(context: AgentContext) -> dict[str, Any]:
+    info = _serialize_context_info(context)
+    return {
+        "id": info["id"],
+        "name": info["name"],
+        "created_at": info["created_at"],
+        "last_message": info["last_message"],
+        "type": info["type"],
+        "log_guid": context.log.guid,
+        "log_length": len(context.log.logs),
+    }
+
+
+def _get_index_entry_from_data(data: dict[str, Any]) -> dict[str, Any]:
+    log = data.get("log") or {}
+    epoch = datetime.fromtimestamp(0).isoformat()
+    return {
+        "id": data["id"],
+        "name": data.get("name"),
+        "created_at": data.get("created_at", epoch),
+        "last_message": data.get("last_message", epoch),
+        "type": data.get("type", AgentContextType.USER.value),
+        "log_guid": log.get("guid", ""),
+        "log_length": min(len(log.get("logs", [])), LOG_SIZE),
+    }
+
+
+def _read_index(path: str) -> dict[str, dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_index(ctxid: str, entry: dict[str, Any] | None):
+    with _save_lock:
+        if entry is None:
+            if _index.pop(ctxid, None) is None:
+                return
+        elif _index.get(ctxid) == entry:
+            return
+        else:
+            _index[ctxid] = entry
+        _write_index()
+
+
+def _write_index():
+    files.write_file_atomic(
+        files.get_abs_path(CHATS_FOLDER, INDEX_FILE_NAME),
+        json.dumps(_index, ensure_ascii=False),
+    )
+
+
 def _get_chat_file_path(ctxid: str):
     return files.get_abs_path(CHATS_FOLDER, ctxid, CHAT_FILE_NAME)
 
@@ -69,6 +288,8 @@ def _get_chat_file_path(ctxid: str):
 def _convert_v080_chats():
     json_files = files.list_files(CHATS_FOLDER, "*.json")
     for file in json_files:
+        if file == INDEX_FILE_NAME:
+            continue
         path = files.get_abs_path(CHATS_FOLDER, file)
         name = file.rstrip(".json")
         new = _get_chat_file_path(name)
@@ -96,18 +317,32 @@ def export_json_chat(context: AgentContext):
 
 def remove_chat(ctxid):
     """Remove a chat or task context"""
-    path = get_chat_folder_path(ctxid)
-    files.delete_dir(path)
+    with _write_lock, _save_lock:
+        with _pending_condition:
+            _pending.pop(ctxid, None)
+        _states.pop(ctxid, None)
+        path = get_chat_folder_path(ctxid)
+        files.delete_dir(path)
+        _update_index(ctxid, None)
 
 
-def _serialize_context(context: AgentContext):
-    # serialize agents
+def _get_agents(context: AgentContext) -> list[Agent]:
     agents = []
     agent = context.agent0
     while agent:
-        agents.append(_serialize_agent(agent))
+        agents.append(agent)
         agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+    return agents
+
+
+def _serialize_context(context: AgentContext):
+    data = _serialize_context_info(context)
+    data["agents"] = [_serialize_agent(agent) for agent in _get_agents(context)]
+    data["log"] = _serialize_log(context.log)
+    return data
+
 
+def _serialize_context_info(context: AgentContext):
     return {
         "id": context.id,
         "name": context.name,
@@ -120,16 +355,14 @@ def _serialize_context(context: AgentContext):
             context.last_message.isoformat() if context.last_message
             else datetime.fromtimestamp(0).isoformat()
         ),
-        "agents": agents,
         "streaming_agent": (
             context.streaming_agent.number if context.streaming_agent else 0
         ),
-        "log": _serialize_log(context.log),
     }
 
 
 def _serialize_agent(agent: Agent):
-    data = {k: v for k, v in agent.data.items() if not k.startswith("_")}
+    data = _serialize_agent_data(agent)
 
     history = agent.history.serialize()
 
@@ -140,6 +373,10 @@ def _serialize_agent(agent: Agent):
     }
 
 
+def _serialize_agent_data(agent: Agent):
+    return {k: v for k, v in agent.data.items() if not k.startswith("_")}
+
+
 def _serialize_log(log: Log):
     return {
         "guid": log.guid,
@@ -151,9 +388,108 @@ def _serialize_log(log: Log):
     }
 
 
-def _deserialize_context(data):
+def _take_snapshot(context: AgentContext) -> _ChatSnapshot:
+    """Copy what changed since the last snapshot, call with _save_lock held"""
+    snapshot = _ChatSnapshot(folder=get_chat_folder_path(context.id))
+    state = _states.setdefault(context.id, _SaveState())
+
+    agents = []
+    histories = {}
+    for agent in _get_agents(context):
+        file = HISTORY_FILE_NAME.format(number=agent.number)
+        written = state.histories.get(agent.number)
+        if not written or written[0] is not agent.history or written[1] != agent.history.version:
+            written = (agent.history, agent.history.version)
+            snapshot.histories[file] = agent.history.to_dict()
+        histories[agent.number] = written
+        agents.append(
+            {"number": agent.number, "data": _serialize_agent_data(agent), "history_file": file}
+        )
+    # drop files of subordinates that are gone
+    snapshot.removed = {
+        HISTORY_FILE_NAME.format(number=number)
+        for number in state.histories.keys() - histories.keys()
+    }
+    state.histories = histories
+
+    snapshot.data = _serialize_context_info(context)
+    snapshot.data["agents"] = agents
+    snapshot.data["log"] = _snapshot_log(context.log, state, snapshot)
+    snapshot.index_entry = _get_index_entry(context)
+    return snapshot
+
+
+def _write_snapshot(ctxid: str, snapshot: _ChatSnapshot):
+    folder = snapshot.folder
+    try:
+        for file, data in snapshot.histories.items():
+            files.write_file_atomic(os.path.join(folder, file), history._json_dumps(data))
+        for file in snapshot.removed:
+            path = os.path.join(folder, file)
+            if os.path.exists(path):
+                os.remove(path)
+        log_path = os.path.join(folder, LOG_FILE_NAME)
+        lines = "".join(_serialize_log_line(item) for item in snapshot.log_items)
+        if snapshot.log_rewrite:
+            files.write_file_atomic(log_path, lines)
+        elif lines:
+            files.append_file(log_path, lines)
+        files.write_file_atomic(
+            os.path.join(folder, CHAT_FILE_NAME),
+            _safe_json_serialize(snapshot.data, ensure_ascii=False),
+        )
+    except Exception:
+        # the state already counts these changes, write everything next time
+        with _save_lock:
+            _states.pop(ctxid, None)
+        raise
+    _update_index(ctxid, snapshot.index_entry)
+
+
+def _snapshot_log(log: Log, state: _SaveState, snapshot: _ChatSnapshot):
+    """Take items changed since the last snapshot, they are appended to the log
+    file and items updated repeatedly are appended again, the last line wins
+    on load"""
+    cursor = len(log.updates)
+    max_lines = max(len(log.logs), LOG_SIZE) * LOG_COMPACT_RATIO
+    if state.log_guid == log.guid and state.log_lines <= max_lines:
+        changed = log.updates.since(state.log_cursor)
+        snapshot.log_items = [log.logs[no].output() for no in changed]
+        state.log_lines += len(changed)
+    else:
+        snapshot.log_items = [item.output() for item in log.logs[-LOG_SIZE:]]
+        snapshot.log_rewrite = True
+        state.log_lines = len(snapshot.log_items)
+    state.log_guid = log.guid
+    state.log_cursor = cursor
+    return {
+        "guid": log.guid,
+        "file": LOG_FILE_NAME,
+        "progress": log.progress,
+        "progress_no": log.progress_no,
+    }
+
+
+def _serialize_log_line(item: dict[str, Any]):
+    return _safe_json_serialize(item, ensure_ascii=False) + "\n"
+
+
+def _read_log_file(path: str) -> list[dict[str, Any]]:
+    items: dict[int, dict[str, Any]] = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # line cut off by an interrupted write
+                items[item["no"]] = item
+    return [items[no] for no in sorted(items)]
+
+
+def _deserialize_context(data, folder: str | None = None):
     config = initialize_agent()
-    log = _deserialize_log(data.get("log", None))
+    log = _deserialize_log(data.get("log", None), folder)
 
     context = AgentContext(
         config=config,
@@ -178,7 +514,7 @@ def _deserialize_context(data):
     )
 
     agents = data.get("agents", [])
-    agent0 = _deserialize_agents(agents, config, context)
+    agent0 = _deserialize_agents(agents, config, context, folder)
     streaming_agent = agent0
     while streaming_agent.number != data.get("streaming_agent", 0):
         streaming_agent = streaming_agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
@@ -190,7 +526,10 @@ def _deserialize_context(data):
 
 
 def _deserialize_agents(
-    agents: list[dict[str, Any]], config: AgentConfig, context: AgentContext
+    agents: list[dict[str, Any]],
+    config: AgentConfig,
+    context: AgentContext,
+    folder: str | None = None,
 ) -> Agent:
     prev: Agent | None = None
     zero: Agent | None = None
@@ -202,9 +541,13 @@ def _deserialize_agents(
             context=context,
         )
         current.data = ag.get("data", {})
-        current.history = history.deserialize_history(
-            ag.get("history", ""), agent=current
-        )
+        serialized = ag.get("history", "")
+        if "history" not in ag and folder and ag.get("history_file"):
+            path = os.path.join(folder, ag["history_file"])
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    serialized = f.read()
+        current.history = history.deserialize_history(serialized, agent=current)
         if not zero:
             zero = current
 
@@ -229,14 +572,18 @@ def _deserialize_agents(
 #     return result
 
 
-def _deserialize_log(data: dict[str, Any]) -> "Log":
+def _deserialize_log(data: dict[str, Any], folder: str | None = None) -> "Log":
     log = Log()
     log.guid = data.get("guid", str(uuid.uuid4()))
     log.set_initial_progress()
 
+    items = data.get("logs")
+    if items is None and folder:
+        items = _read_log_file(os.path.join(folder, data.get("file", LOG_FILE_NAME)))
+
     # Deserialize the list of LogItem objects
     i = 0
-    for item_data in data.get("logs", []):
+    for item_data in (items or [])[-LOG_SIZE:]:
         log.logs.append(
             LogItem(
                 log=log,  # restore the log reference
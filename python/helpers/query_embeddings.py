@@ -0,0 +1,124 @@
+"""
+Process-wide LRU cache of query embeddings.
+
+CacheBackedEmbeddings only caches document embeddings. Memory recall,
+consolidation and document search embed the same queries again and again, the
+wrapper below embeds each (model, query) pair once while it stays in the cache.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.embeddings import Embeddings
+
+CACHE_SIZE = 1024
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU of query vectors keyed by (model id, text hash)."""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._vectors: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_key(model_id: str, text: str) -> tuple[str, str]:
+        return model_id, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, model_id: str, text: str) -> list[float] | None:
+        key = self.get_key(model_id, text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._vectors.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, model_id: str, text: str, vector: list[float]):
+        key = self.get_key(model_id, text)
+        with self._lock:
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.size:
+                self._vectors.popitem(last=False)
+
+    def contains(self, model_id: str, text: str) -> bool:
+        with self._lock:
+            return self.get_key(model_id, text) in self._vectors
+
+    def clear(self):
+        with self._lock:
+            self._vectors.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._vectors),
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+_cache = QueryEmbeddingCache()
+
+
+def get_cache() -> QueryEmbeddingCache:
+    return _cache
+
+
+def is_cached(embeddings: Embeddings, text: str) -> bool:
+    """True if embedding text as a query will not call the model."""
+    return isinstance(embeddings, CachedQueryEmbeddings) and embeddings.is_cached(text)
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embeddings with queries served from the shared cache, documents pass through."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_id: str,
+        cache: QueryEmbeddingCache | None = None,
+    ):
+        self.embeddings = embeddings
+        self.model_id = model_id
+        self.cache = cache if cache is not None else _cache
+
+    @property
+    def underlying_embeddings(self) -> Embeddings:
+        # the embedding scheduler reads provider limits from the wrapped model
+        return getattr(self.embeddings, "underlying_embeddings", self.embeddings)
+
+    def is_cached(self, text: str) -> bool:
+        return self.cache.contains(self.model_id, text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        vector = self.cache.get(self.model_id, text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(self.model_id, text, vector)
+        return list(vector)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        vector = self.cache.get(self.model_id, text)
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            self.cache.put(self.model_id, text, vector)
+        return list(vector)
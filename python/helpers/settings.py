@@ -69,6 +69,8 @@ class Settings(TypedDict):
     memory_memorize_enabled: bool
     memory_memorize_consolidation: bool
     memory_memorize_replace_threshold: float
+    memory_index_type: str
+    memory_index_ann_threshold: int
     
 
     api_keys: dict[str, str]
@@ -729,7 +731,7 @@ def convert_out(settings: Settings) -> SettingsOutput:
         {
             "id": "memory_memorize_consolidation",
             "title": "Auto-memorize AI consolidation",
-            "description": "A0 will automatically consolidate similar memories using utility LLM. Improves memory quality over time, adds 2 utility LLM calls per memory.",
+            "description": "A0 will automatically consolidate similar memories using utility LLM. Improves memory quality over time, adds 2 utility LLM calls per memorization.",
             "type": "switch",
             "value": settings["memory_memorize_consolidation"],
         }
@@ -748,6 +750,32 @@ def convert_out(settings: Settings) -> SettingsOutput:
         }
     )
 
+    memory_fields.append(
+        {
+            "id": "memory_index_type",
+            "title": "Memory index type",
+            "description": "Vector index used for memory search. Flat is exact but scans every memory, IVF and HNSW are approximate and much faster on large memory folders. HNSW rebuilds on every deletion, so it suits memories that are rarely removed. Auto uses IVF.",
+            "type": "select",
+            "value": settings["memory_index_type"],
+            "options": [
+                {"value": "auto", "label": "Auto"},
+                {"value": "flat", "label": "Flat (exact)"},
+                {"value": "ivf", "label": "IVF"},
+                {"value": "hnsw", "label": "HNSW"},
+            ],
+        }
+    )
+
+    memory_fields.append(
+        {
+            "id": "memory_index_ann_threshold",
+            "title": "Memory approximate index threshold",
+            "description": "Number of memories above which the memory folder is migrated from the flat index to the approximate one when loaded.",
+            "type": "number",
+            "value": settings["memory_index_ann_threshold"],
+        }
+    )
+
     memory_section: SettingsSection = {
         "id": "memory",
         "title": "Memory",
@@ -1290,6 +1318,8 @@ def get_default_settings() -> Settings:
         memory_memorize_enabled=True,
         memory_memorize_consolidation=True,
         memory_memorize_replace_threshold=0.9,
+        memory_index_type="auto",
+        memory_index_ann_threshold=20000,
         api_keys={},
         auth_login="",
         auth_password="",
@@ -1334,11 +1364,14 @@ async def _apply_settings(previous: Settings | None):
         if not previous or _settings["stt_model_size"] != previous["stt_model_size"]:
             await whisper.preload(_settings["stt_model_size"])
 
-        # force memory reload on embedding model change
+        # force memory reload on embedding model or index type change
         if not previous or (
             _settings["embed_model_name"] != previous["embed_model_name"]
             or _settings["embed_model_provider"] != previous["embed_model_provider"]
             or _settings["embed_model_kwargs"] != previous["embed_model_kwargs"]
+            or _settings["memory_index_type"] != previous["memory_index_type"]
+            or _settings["memory_index_ann_threshold"]
+            != previous["memory_index_ann_threshold"]
         ):
             from python.helpers.memory import reload as memory_reload
 
@@ -1,12 +1,67 @@
 import asyncio
+import codecs
 import sys
-import time
 from typing import Optional, Tuple
 
+# stdout and stderr are drained in chunks of this size as soon as data arrives
+READ_CHUNK_SIZE = 64 * 1024
+# after new output arrives, wait this long for more before returning it,
+# long bursts are returned in few large pieces instead of many small ones
+OUTPUT_COALESCE_DELAY = 0.05
+# output kept per command, the middle of very long output is dropped
+OUTPUT_HEAD_CHARS = 50_000
+OUTPUT_TAIL_CHARS = 200_000
+
+
+class OutputBuffer:
+    """Text with a bounded size, keeps the beginning and the most recent tail."""
+
+    def __init__(self, head_size: int = OUTPUT_HEAD_CHARS, tail_size: int = OUTPUT_TAIL_CHARS):
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.clear()
+
+    def clear(self):
+        self.head = ""
+        self.tail = ""
+        self.dropped = 0
+
+    def __bool__(self):
+        return bool(self.head)
+
+    def append(self, text: str):
+        if len(self.head) < self.head_size:
+            free = self.head_size - len(self.head)
+            self.head += text[:free]
+            text = text[free:]
+        if not text:
+            return
+        self.tail += text
+        # trim in batches, not on every append
+        if len(self.tail) > self.tail_size * 2:
+            excess = len(self.tail) - self.tail_size
+            self.tail = self.tail[excess:]
+            self.dropped += excess
+
+    def text(self) -> str:
+        if self.dropped:
+            tail = self.tail[-self.tail_size :]
+            dropped = self.dropped + len(self.tail) - len(tail)
+            return f"{self.head}\n[... {dropped} characters of output dropped ...]\n{tail}"
+        return self.head + self.tail
+
+
 class LocalInteractiveSession:
     def __init__(self):
         self.process: Optional[asyncio.subprocess.Process] = None
-        self.full_output = ''
+        self._output = OutputBuffer()  # output returned since the last command
+        self._pending = OutputBuffer()  # output not yet returned by read_output
+        self._data = asyncio.Event()
+        self._readers: list[asyncio.Task] = []
+
+    @property
+    def full_output(self) -> str:
+        return self._output.text()
 
     async def connect(self):
         # Start a new subprocess with the appropriate shell for the OS
@@ -27,6 +82,13 @@ class LocalInteractiveSession:
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
             )
+        # drain both pipes continuously, a full pipe would block the shell
+        self._data = asyncio.Event()
+        self._readers = [
+            asyncio.create_task(self._read_stream(stream))
+            for stream in (self.process.stdout, self.process.stderr)
+            if stream
+        ]
 
     async def close(self):
         if self.process:
@@ -35,15 +97,19 @@ class LocalInteractiveSession:
                 await self.process.wait()
             except:
                 pass
+        for reader in self._readers:
+            reader.cancel()
 
     async def send_command(self, command: str):
         if not self.process or not self.process.stdin:
             raise Exception("Shell not connected")
-        self.full_output = ""
+        self._output.clear()
         self.process.stdin.write((command + '\n').encode())
         await self.process.stdin.drain()
- 
+
     async def read_output(self, timeout: float = 5.0, reset_full_output: bool = False) -> Tuple[str, Optional[str]]:
+        """Output of the current command and the part that is new since the last
+        call, waits up to timeout for new output to arrive."""
         if not self.process or not self.process.stdout:
             raise Exception("Shell not connected")
 
@@ -51,34 +117,43 @@ class LocalInteractiveSession:
             raise ValueError("timeout must be positive")
 
         if reset_full_output:
-            self.full_output = ""
-
-        partial_output = ''
-        start_time = time.time()
+            self._output.clear()
 
-        while time.time() - start_time < timeout:
+        if not self._pending and not self._closed:
+            self._data.clear()
             try:
-                # Use wait_for to implement a timeout on the read operation
-                # We read one line at a time
-                line_bytes = await asyncio.wait_for(self.process.stdout.readline(), timeout=0.1)
-                if not line_bytes:
-                    break  # End of stream
+                await asyncio.wait_for(self._data.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
 
-                line = line_bytes.decode(errors='replace')
-                partial_output += line
-                self.full_output += line
+        if self._pending and not self._closed:
+            # Give the subprocess a tiny bit of time to flush any
+            # additional output before returning it.
+            await asyncio.sleep(OUTPUT_COALESCE_DELAY)
 
-                # Give the subprocess a tiny bit of time to flush any
-                # additional output before we loop back around.
-                await asyncio.sleep(0.1)
-            except asyncio.TimeoutError:
-                # No data available within the short timeout
-                break
-            except Exception as e:
-                # Possible issues like decoding or stream errors
-                break
+        partial_output = self._pending.text()
+        self._pending.clear()
+        self._output.append(partial_output)
 
         if not partial_output:
             return self.full_output, None
 
         return self.full_output, partial_output
+
+    @property
+    def _closed(self) -> bool:
+        return all(reader.done() for reader in self._readers)
+
+    async def _read_stream(self, stream: asyncio.StreamReader):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                chunk = await stream.read(READ_CHUNK_SIZE)
+                text = decoder.decode(chunk, final=not chunk)
+                if text:
+                    self._pending.append(text)
+                    self._data.set()
+                if not chunk:
+                    break  # End of stream
+        finally:
+            self._data.set()  # wake up readers waiting for output that will not come
@@ -22,6 +22,7 @@ from python.helpers.print_style import PrintStyle
 from python.helpers.defer import DeferredTask
 from python.helpers.files import get_abs_path, make_dirs, read_file, write_file
 from python.helpers.localization import Localization
+from python.helpers import change_feed
 import pytz
 from typing import Annotated
 
@@ -447,6 +448,7 @@ class SchedulerTaskList(BaseModel):
     __instance: ClassVar[Optional["SchedulerTaskList"]] = PrivateAttr(default=None)
 
     # lock: threading.Lock = Field(exclude=True, default=threading.Lock())
+    _loaded_json: str = PrivateAttr(default="")
 
     @classmethod
     def get(cls) -> "SchedulerTaskList":
@@ -469,9 +471,14 @@ class SchedulerTaskList(BaseModel):
         path = get_abs_path(SCHEDULER_FOLDER, "tasks.json")
         if exists(path):
             with self._lock:
-                data = self.__class__.model_validate_json(read_file(path))
+                json_data = read_file(path)
+                data = self.__class__.model_validate_json(json_data)
                 self.tasks.clear()
                 self.tasks.extend(data.tasks)
+                # periodic reloads mostly read an unchanged file, only report real changes
+                if json_data != self._loaded_json:
+                    self._loaded_json = json_data
+                    change_feed.notify("tasks")
         return self
 
     async def add_task(self, task: Union[ScheduledTask, AdHocTask, PlannedTask]) -> "SchedulerTaskList":
@@ -509,6 +516,8 @@ class SchedulerTaskList(BaseModel):
                 )
 
             write_file(path, json_data)
+            self._loaded_json = json_data
+            change_feed.notify("tasks")
 
             # Debug: Verify after saving
             if exists(path):
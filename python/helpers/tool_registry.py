@@ -0,0 +1,145 @@
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from python.helpers import extract_tools, files, runtime
+from python.helpers.print_style import PrintStyle
+
+if TYPE_CHECKING:
+    from python.helpers.tool import Tool
+
+# tool folders in lookup order, the agent profile folder is checked first
+DEFAULT_TOOLS_FOLDER = "python/tools"
+SHARED_TOOLS_FOLDERS = ["agents/screenwriting/tools"]
+PROFILE_TOOLS_FOLDER = "agents/{profile}/tools"
+
+
+def normalize_tool_name(tool_name: str) -> str:
+    """Convert various tool name formats to snake_case."""
+    tool_name = tool_name.strip()
+    tool_name = re.sub(r"(?<!^)(?=[A-Z])", "_", tool_name)
+    tool_name = re.sub(r"[^\w]", "_", tool_name)
+    return tool_name.lower()
+
+
+@dataclass
+class ToolEntry:
+    file: str
+    mtime: float
+    classes: list[type["Tool"]] = field(default_factory=list)
+    seconds: float = 0.0
+    error: str = ""
+
+
+class ToolRegistry:
+    """Tool classes by folder and normalized name, each module is executed once.
+    With hot_reload, changed or added tool files are picked up on lookup."""
+
+    def __init__(self, hot_reload: bool = False):
+        self.hot_reload = hot_reload
+        self._folders: dict[str, tuple[float, dict[str, str]]] = {}
+        self._entries: dict[str, ToolEntry] = {}
+        self._lock = threading.RLock()
+
+    def get_folders(self, profile: str = "") -> list[str]:
+        folders = [DEFAULT_TOOLS_FOLDER, *SHARED_TOOLS_FOLDERS]
+        if profile:
+            folders.insert(0, PROFILE_TOOLS_FOLDER.format(profile=profile))
+        return folders
+
+    def build(self):
+        """Load all tools of all profiles, used at startup."""
+        folders = [DEFAULT_TOOLS_FOLDER, *SHARED_TOOLS_FOLDERS] + [
+            PROFILE_TOOLS_FOLDER.format(profile=profile)
+            for profile in files.get_subdirectories("agents")
+        ]
+        for folder in folders:
+            for file in self._scan(folder).values():
+                self._load(file)
+
+    def get(self, name: str, profile: str = "") -> type["Tool"] | None:
+        name = normalize_tool_name(name)
+        for folder in self.get_folders(profile):
+            file = self._scan(folder).get(name)
+            if file:
+                entry = self._load(file)
+                if entry.classes:
+                    return entry.classes[0]
+        return None
+
+    def report(self) -> str:
+        entries = sorted(self._entries.values(), key=lambda e: e.seconds, reverse=True)
+        loaded = [e for e in entries if e.classes]
+        failed = [e for e in entries if e.error]
+        total = sum(e.seconds for e in entries)
+        lines = [f"Loaded {len(loaded)} tools in {total:.2f}s"]
+        for entry in loaded[:5]:
+            lines.append(f"  {files.deabsolute_path(entry.file)}: {entry.seconds * 1000:.0f}ms")
+        for entry in failed:
+            lines.append(f"  {files.deabsolute_path(entry.file)} failed: {entry.error}")
+        return "\n".join(lines)
+
+    def _scan(self, folder: str) -> dict[str, str]:
+        abs_folder = files.get_abs_path(folder)
+        cached = self._folders.get(abs_folder)
+        if cached and not self.hot_reload:
+            return cached[1]
+        mtime = _get_mtime(abs_folder)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        tools: dict[str, str] = {}
+        if os.path.isdir(abs_folder):
+            for file_name in sorted(os.listdir(abs_folder)):
+                if file_name.endswith(".py") and not file_name.startswith("__"):
+                    tools[file_name[:-3]] = os.path.join(abs_folder, file_name)
+        with self._lock:
+            self._folders[abs_folder] = (mtime, tools)
+        return tools
+
+    def _load(self, file: str) -> ToolEntry:
+        entry = self._entries.get(file)
+        if entry and not (self.hot_reload and entry.mtime != _get_mtime(file)):
+            return entry
+        with self._lock:
+            # another thread may have loaded it meanwhile
+            entry = self._entries.get(file)
+            mtime = _get_mtime(file)
+            if entry and entry.mtime == mtime:
+                return entry
+            from python.helpers.tool import Tool
+
+            entry = ToolEntry(file=file, mtime=mtime)
+            start = time.perf_counter()
+            try:
+                entry.classes = extract_tools.load_classes_from_file(file, Tool)
+            except Exception as e:
+                entry.error = str(e)
+            entry.seconds = time.perf_counter() - start
+            self._entries[file] = entry
+            return entry
+
+
+def _get_mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+_registry: ToolRegistry | None = None
+
+
+def get_registry() -> ToolRegistry:
+    global _registry
+    if _registry is None:
+        _registry = ToolRegistry(hot_reload=runtime.is_development())
+    return _registry
+
+
+def initialize():
+    registry = get_registry()
+    registry.build()
+    PrintStyle.standard(registry.report())
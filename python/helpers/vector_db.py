@@ -13,11 +13,13 @@ from langchain_community.vectorstores.utils import (
     DistanceStrategy,
 )
 from langchain.embeddings import CacheBackedEmbeddings
+from python.helpers.metadata_index import MetadataIndexedFaiss
+from python.helpers.query_embeddings import CachedQueryEmbeddings, is_cached
 
 from agents import Agent
 
 
-class MyFaiss(FAISS):
+class MyFaiss(MetadataIndexedFaiss):
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -34,7 +36,7 @@ class MyFaiss(FAISS):
 
 class VectorDB:
 
-    _cached_embeddings: dict[str, CacheBackedEmbeddings] = {}
+    _cached_embeddings: dict[str, CachedQueryEmbeddings] = {}
 
     @staticmethod
     def _get_embeddings(agent: Agent, cache: bool = True):
@@ -48,12 +50,13 @@ class VectorDB:
         )
         if namespace not in VectorDB._cached_embeddings:
             store = InMemoryByteStore()
-            VectorDB._cached_embeddings[namespace] = (
+            VectorDB._cached_embeddings[namespace] = CachedQueryEmbeddings(
                 CacheBackedEmbeddings.from_bytes_store(
                     model,
                     store,
                     namespace=namespace,
-                )
+                ),
+                model_id=namespace,
             )
         return VectorDB._cached_embeddings[namespace]
 
@@ -74,34 +77,45 @@ class VectorDB:
         )
 
     async def search_by_similarity_threshold(
-        self, query: str, limit: int, threshold: float, filter: str = ""
+        self,
+        query: str,
+        limit: int,
+        threshold: float,
+        filter: str = "",
+        with_scores: bool = False,
     ):
         comparator = get_comparator(filter) if filter else None
+        # restrict the vector search to documents the metadata index allows
+        candidates = self.db.filter_candidates(filter) if filter else None
 
-        # rate limiter
-        await self.agent.rate_limiter(
-            model_config=self.agent.config.embeddings_model, input=query
-        )
+        # rate limiter, cached queries are not sent to the model
+        if not is_cached(self.embeddings, query):
+            await self.agent.rate_limiter(
+                model_config=self.agent.config.embeddings_model, input=query
+            )
 
+        kwargs = {} if candidates is None else {"candidate_ids": candidates}
+        if with_scores:
+            # (document, relevance) pairs, most relevant first
+            return await self.db.asimilarity_search_with_relevance_scores(
+                query,
+                k=limit,
+                score_threshold=threshold,
+                filter=comparator,
+                **kwargs,
+            )
         return await self.db.asearch(
             query,
             search_type="similarity_score_threshold",
             k=limit,
             score_threshold=threshold,
             filter=comparator,
+            **kwargs,
         )
 
     async def search_by_metadata(self, filter: str, limit: int = 0) -> list[Document]:
-        comparator = get_comparator(filter)
-        all_docs = self.db.get_all_docs()
-        result = []
-        for doc in all_docs.values():
-            if comparator(doc.metadata):
-                result.append(doc)
-                # stop if limit reached and limit > 0
-                if limit > 0 and len(result) >= limit:
-                    break
-        return result
+        # only documents in the metadata index candidates are evaluated
+        return self.db.search_by_metadata(filter, get_comparator(filter), limit)
 
     async def insert_documents(self, docs: list[Document]):
         ids = [str(uuid.uuid4()) for _ in range(len(docs))]
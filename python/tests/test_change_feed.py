@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from python.helpers import change_feed
+from python.helpers.log import Log
+
+
+class TestChangeFeed(unittest.TestCase):
+    def test_wait_returns_on_notify(self):
+        since = change_feed.get_version()
+        timer = threading.Timer(0.05, change_feed.notify, args=("tasks",))
+        timer.start()
+        start = time.monotonic()
+        version = change_feed.wait(since, timeout=5)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertGreater(version, since)
+        self.assertEqual(change_feed.get_version("tasks"), version)
+
+    def test_wait_times_out(self):
+        since = change_feed.get_version()
+        self.assertEqual(change_feed.wait(since, timeout=0.01), since)
+
+    def test_log_versions_are_unique_and_follow_changes(self):
+        first, second = Log(), Log()
+        self.assertNotEqual(first.version, second.version)
+
+        before = first.version
+        item = first.log(type="info", heading="hello")
+        after_log = first.version
+        self.assertGreater(after_log, before)
+
+        item.stream(content="world")
+        self.assertGreater(first.version, after_log)
+
+        after_stream = first.version
+        first.set_progress("working")
+        self.assertGreater(first.version, after_stream)
+
+
+class TestContextLists(unittest.TestCase):
+    def test_version_follows_log_updates_and_boot(self):
+        from agents import AgentContext
+        from python.api import poll
+
+        log = Log()
+        ctx = SimpleNamespace(
+            id="ctx", name="chat", paused=False, last_message=None, type="user", log=log
+        )
+        serialized = []
+
+        def serialize(contexts, unloaded):
+            serialized.append(len(log.updates))
+            return [], []
+
+        with patch.object(AgentContext, "all", return_value=[ctx]), patch.object(
+            AgentContext, "get_unloaded", return_value=[]
+        ), patch.object(poll, "_serialize_contexts", serialize):
+            first, _ = poll.get_context_lists()
+            self.assertEqual(poll.get_context_lists()[0], first)
+
+            # an update of an existing item changes the log version sent with the list
+            item = log.log(type="info", heading="hello")
+            second, _ = poll.get_context_lists()
+            item.update(heading="changed")
+            third, _ = poll.get_context_lists()
+            self.assertEqual(len({first, second, third}), 3)
+            self.assertEqual(serialized[-1], len(log.updates))
+
+            # a restarted server does not reuse versions of the previous one
+            with patch.object(poll, "_boot_id", "restarted"):
+                self.assertNotEqual(poll.get_context_lists()[0], third)
+
+
+if __name__ == "__main__":
+    unittest.main()
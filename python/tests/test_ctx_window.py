@@ -0,0 +1,60 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agents import Agent
+from python.api.ctx_window_get import GetCtxWindow
+from python.helpers import persist_chat
+
+
+class FakeAgent:
+    DATA_NAME_CTX_WINDOW = Agent.DATA_NAME_CTX_WINDOW
+    DATA_NAME_CTX_WINDOW_PROMPT = Agent.DATA_NAME_CTX_WINDOW_PROMPT
+
+    def __init__(self, data: dict):
+        self.data = data
+
+    def get_data(self, field: str):
+        return self.data.get(field)
+
+
+class FakeContext:
+    def __init__(self, agent: FakeAgent):
+        self.agent0 = agent
+        self.streaming_agent = None
+
+
+class TestCtxWindow(unittest.TestCase):
+    def get_window(self, agent: FakeAgent):
+        handler = GetCtxWindow(None, threading.Lock())  # type: ignore
+        with patch.object(handler, "get_context", return_value=FakeContext(agent)):
+            return asyncio.run(handler.process({"context": "ctx"}, None))  # type: ignore
+
+    def test_prompt_is_rendered_and_not_persisted(self):
+        agent = FakeAgent({
+            Agent.DATA_NAME_CTX_WINDOW: {"tokens": 7},
+            Agent.DATA_NAME_CTX_WINDOW_PROMPT: [
+                SystemMessage(content="be brief"), HumanMessage(content="hello"),
+            ],
+        })
+        window = self.get_window(agent)
+        self.assertIn("hello", window["content"])
+        self.assertEqual(window["tokens"], 7)
+
+        data = json.loads(persist_chat._safe_json_serialize(
+            persist_chat._serialize_agent_data(agent)  # type: ignore
+        ))
+        self.assertEqual(list(data), [Agent.DATA_NAME_CTX_WINDOW])
+
+    def test_restored_chat_without_prompt_has_empty_window(self):
+        # chats saved before the prompt was kept out of the persisted data
+        agent = FakeAgent({Agent.DATA_NAME_CTX_WINDOW: {"prompt": [None, None], "tokens": 7}})
+        self.assertEqual(self.get_window(agent), {"content": "", "tokens": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
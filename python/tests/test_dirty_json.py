@@ -4,7 +4,8 @@ import os
 
 # Add python directory to path
 sys.path.append(os.path.join(os.getcwd(), 'python'))
-from helpers.dirty_json import DirtyJson
+import json
+from helpers.dirty_json import DirtyJson, DirtyJsonStream
 
 class TestDirtyJson(unittest.TestCase):
     def test_multiline_string(self):
@@ -44,5 +45,59 @@ class TestDirtyJson(unittest.TestCase):
         result = parser.parse(json_str)
         self.assertEqual(result, "line1\nline2")
 
+class TestDirtyJsonStream(unittest.TestCase):
+    def feed_all(self, text, size):
+        parser = DirtyJsonStream()
+        for i in range(0, len(text), size):
+            parser.feed(text[i:i + size])
+        return parser
+
+    def test_matches_json_for_any_chunk_size(self):
+        value = {
+            "thoughts": ["a \"quoted\" line", "x\ny"],
+            "tool_name": "response",
+            "tool_args": {"text": "caf\u00e9 {not json}", "n": -1.5e3, "ok": [True, None, 3]},
+        }
+        text = "Sure: " + json.dumps(value, indent=2)
+        for size in (1, 2, 3, 7, len(text)):
+            parser = self.feed_all(text, size)
+            self.assertEqual(parser.result, value)
+            self.assertTrue(parser.done)
+
+    def test_dirty_input_matches_parse_string(self):
+        text = "{tool_name: response, 'a': 'x', b: true, c: [1,2,], /*c*/ d: \"\"\"m\"l\"\"\"}"
+        self.assertEqual(self.feed_all(text, 1).result, DirtyJson.parse_string(text))
+
+    def test_partial_values_and_completed_paths(self):
+        parser = DirtyJsonStream()
+        parser.feed('{"tool_name": "resp')
+        self.assertEqual(parser.result, {"tool_name": "resp"})
+        self.assertEqual(parser.completed, [])
+        result = parser.feed('onse", "tool_args": {"text": "Hel')
+        self.assertEqual(parser.completed, [("tool_name",)])
+        self.assertEqual(result["tool_args"], {"text": "Hel"})
+        parser.feed('lo"}}')
+        self.assertEqual(parser.completed, [("tool_args", "text"), ("tool_args",), ()])
+        self.assertEqual(parser.length, 57)
+
+    def test_push_reports_partial_path_and_delta(self):
+        parser = DirtyJsonStream()
+        parser.push('{"tool_name": "response", "tool_args": {"text": "He')
+        self.assertEqual(parser.partial, ("tool_args", "text"))
+        self.assertEqual(parser.delta, "He")
+        # the partial value is only joined into the result when it is read
+        self.assertIsNone(parser.root["tool_args"]["text"])
+        parser.push('l\\nlo')
+        self.assertEqual(parser.delta, "l\nlo")
+        self.assertEqual(parser.result["tool_args"]["text"], "Hel\nlo")
+        parser.push(' world')
+        self.assertEqual(parser.delta, " world")
+        parser.push('!"}')
+        self.assertIsNone(parser.partial)
+        self.assertEqual(parser.delta, "")
+        self.assertEqual(parser.completed, [("tool_args", "text"), ("tool_args",)])
+        self.assertEqual(parser.root["tool_args"]["text"], "Hel\nlo world!")
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from python.helpers import document_parser
+
+
+class TestDocumentParser(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch.object(document_parser, "CACHE_FOLDER", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parses_in_worker_and_caches_by_content(self):
+        html = b"<html><body><h1>Title</h1><p>Some <b>bold</b> text</p></body></html>"
+        text = asyncio.run(document_parser.parse("html", html))
+        self.assertIn("# Title", text)
+        self.assertIn("**bold**", text)
+
+        def no_worker(*args):
+            raise AssertionError("parsed again")
+
+        with patch.object(document_parser, "_run_worker", no_worker):
+            self.assertEqual(asyncio.run(document_parser.parse("html", html)), text)
+            # same content as another kind is a different entry
+            with self.assertRaises(AssertionError):
+                asyncio.run(document_parser.parse("unstructured", html, ".html"))
+
+    def test_cache_is_pruned_by_last_use(self):
+        with patch.object(document_parser, "CACHE_MAX_FILES", 2):
+            for key in ("a", "b"):
+                document_parser._write_cache(key, key)
+            os.utime(os.path.join(self.tmp.name, "a.txt"), (1, 1))
+            os.utime(os.path.join(self.tmp.name, "b.txt"), (2, 2))
+            self.assertEqual(document_parser._read_cache("a"), "a")  # touched
+            document_parser._write_cache("c", "c")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["a.txt", "c.txt"])
+
+    def test_worker_errors_are_reported(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(document_parser.parse("exe", b""))
+        # not a pdf, and the OCR fallback is not installed here either
+        with self.assertRaisesRegex(ValueError, "Document parsing failed"):
+            asyncio.run(document_parser.parse("pdf", b"not a pdf", ".pdf"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from langchain_core.documents import Document
+
+from python.helpers.document_query import DocumentQueryHelper, select_chunks
+
+
+def chunk(id: str, index: int) -> Document:
+    return Document(page_content=f"chunk {id}", metadata={"id": id, "chunk_index": index})
+
+
+class TestSelectChunks(unittest.TestCase):
+    def test_dedupes_and_prefers_diverse_chunks(self):
+        a, a_copy, b, c = chunk("a", 3), chunk("a2", 4), chunk("b", 1), chunk("c", 2)
+        vectors = {
+            "a": np.array([1.0, 0.0]),
+            "a2": np.array([1.0, 0.01]),  # near duplicate of a
+            "b": np.array([0.8, 0.6]),  # similar to a
+            "c": np.array([0.0, 1.0]),  # different topic
+        }
+        scored = [(a, 0.9), (a_copy, 0.89), (b, 0.8), (c, 0.75), (a, 0.7)]
+
+        selected = select_chunks(scored, vectors, limit=2, diversity=0.5)
+        # c beats the more relevant but redundant b, result is in document order
+        self.assertEqual([doc.metadata["id"] for doc in selected], ["c", "a"])
+
+        selected = select_chunks(scored, vectors, limit=10, diversity=0.5)
+        self.assertEqual([doc.metadata["id"] for doc in selected], ["b", "c", "a"])
+
+    def test_ranks_by_relevance_without_vectors(self):
+        scored = [(chunk("a", 1), 0.6), (chunk("b", 2), 0.9), (chunk("c", 3), 0.7)]
+        selected = select_chunks(scored, {}, limit=2)
+        self.assertEqual([doc.metadata["id"] for doc in selected], ["b", "c"])
+
+
+class FakeAgent:
+    async def call_utility_model(self, system: str, message: str):
+        await asyncio.sleep(0.05)
+        question = message.split('"')[1]
+        return f" {question} keywords "
+
+    async def call_chat_model(self, messages):
+        return messages[1].content, ""
+
+    def parse_prompt(self, file: str):
+        return file
+
+
+class FakeStore:
+    def __init__(self):
+        self.queries = []
+
+    def normalize_uri(self, uri: str):
+        return uri
+
+    async def search_document_with_scores(self, document_uri, query, limit, threshold):
+        self.queries.append(query)
+        await asyncio.sleep(0.05)
+        return [(chunk("shared", 0), 0.8), (chunk(query, len(self.queries)), 0.7)]
+
+    def get_chunk_vectors(self, ids):
+        return {}
+
+
+class TestDocumentQa(unittest.TestCase):
+    def test_questions_are_processed_concurrently(self):
+        progress = []
+        helper = DocumentQueryHelper.__new__(DocumentQueryHelper)
+        helper.agent = FakeAgent()  # type: ignore
+        helper.store = FakeStore()  # type: ignore
+        helper.progress_callback = progress.append
+
+        async def get_content(document_uri, add_to_db=False):
+            return ""
+
+        questions = [f"question {i}" for i in range(5)]
+        with patch.object(helper, "document_get_content", get_content):
+            start = time.perf_counter()
+            ok, answer = asyncio.run(helper.document_qa("file:///doc.txt", questions))
+            elapsed = time.perf_counter() - start
+
+        self.assertTrue(ok)
+        # two rounds of five 50ms calls, sequential would take 500ms
+        self.assertLess(elapsed, 0.3)
+        self.assertEqual(helper.store.queries, [f"{q} keywords" for q in questions])  # type: ignore
+        self.assertEqual(answer.count("chunk shared"), 1)
+        self.assertIn("Selected 6 of 6 distinct chunks", "\n".join(progress))
+        self.assertTrue(progress[-1].startswith("Q&A process completed in"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+
+from langchain_core.embeddings import Embeddings
+
+from python.helpers.embedding_scheduler import EmbeddingScheduler
+
+
+class CountingEmbeddings(Embeddings):
+    batch_size = 3
+    concurrency = 2
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+        self.active = 0
+        self.max_active = 0
+
+    def embed_documents(self, texts):
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text))]
+
+    async def aembed_documents(self, texts):
+        self.calls.append(texts)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        return self.embed_documents(texts)
+
+
+class TestEmbeddingScheduler(unittest.TestCase):
+    def test_batches_by_count_and_tokens(self):
+        scheduler = EmbeddingScheduler(CountingEmbeddings(), batch_tokens=50)
+        texts = ["a"] * 7 + ["long text " * 20, "b"]
+        batches = scheduler.make_batches(texts)
+        self.assertEqual([len(b) for _, b, _ in batches], [3, 3, 1, 1, 1])
+        self.assertEqual([start for start, _, _ in batches], [0, 3, 6, 7, 8])
+
+    def test_embed_preserves_order_and_limits_concurrency(self):
+        embeddings = CountingEmbeddings()
+        limited: list[str] = []
+
+        async def rate_limit(text: str):
+            limited.append(text)
+
+        scheduler = EmbeddingScheduler(embeddings, rate_limit)
+        texts = ["x" * i for i in range(1, 11)]
+        vectors = asyncio.run(scheduler.embed_documents(texts))
+
+        self.assertEqual(vectors, [[float(i)] for i in range(1, 11)])
+        self.assertEqual(len(embeddings.calls), 4)
+        self.assertEqual(len(limited), 4)
+        self.assertLessEqual(embeddings.max_active, 2)
+        self.assertEqual(scheduler.stats.texts, 10)
+        self.assertEqual(scheduler.stats.batches, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from python.helpers import extension
+from python.helpers.extension import Extension
+
+
+class FakeAgent:
+    def __init__(self):
+        self.data = {}
+        self.config = type("Config", (), {"profile": ""})()
+
+    def get_data(self, field):
+        return self.data.get(field)
+
+    def set_data(self, field, value):
+        self.data[field] = value
+
+
+def make_extension(name: str, events: list, concurrent=False, depends_on=(), delay=0.02):
+    async def execute(self, **kwargs):
+        events.append(f"start {name}")
+        await asyncio.sleep(delay)
+        events.append(f"end {name}")
+
+    cls = type(
+        name,
+        (Extension,),
+        {"execute": execute, "CONCURRENT": concurrent, "DEPENDS_ON": depends_on},
+    )
+    cls.__module__ = f"extensions.{name}"
+    return cls
+
+
+class TestExtensionConcurrency(unittest.TestCase):
+    def run_point(self, classes: list):
+        async def get_extensions(folder):
+            return classes if folder.endswith("point") else []
+
+        agent = FakeAgent()
+        with patch.object(extension, "_get_extensions", get_extensions):
+            asyncio.run(extension.call_extensions("point", agent=agent))  # type: ignore
+        return agent
+
+    def test_sequential_by_default(self):
+        events = []
+        self.run_point([make_extension("_10_a", events), make_extension("_20_b", events)])
+        self.assertEqual(events, ["start _10_a", "end _10_a", "start _20_b", "end _20_b"])
+
+    def test_concurrent_with_dependencies_and_barriers(self):
+        events = []
+        agent = self.run_point(
+            [
+                make_extension("_10_a", events, concurrent=True, delay=0.05),
+                make_extension("_20_b", events, concurrent=True),
+                make_extension("_30_c", events, concurrent=True, depends_on=("_10_a",)),
+                make_extension("_40_d", events),
+            ]
+        )
+        # a and b overlap, c waits for a, d waits for everything
+        self.assertEqual(events[:2], ["start _10_a", "start _20_b"])
+        self.assertLess(events.index("end _10_a"), events.index("start _30_c"))
+        self.assertEqual(events[-2:], ["start _40_d", "end _40_d"])
+
+        timings = extension.get_extension_timings(agent)  # type: ignore
+        self.assertEqual(set(timings["point"]), {"_10_a", "_20_b", "_30_c", "_40_d"})
+        self.assertGreaterEqual(timings["point"]["_10_a"], 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
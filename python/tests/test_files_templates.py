@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+import unittest
+
+from python.helpers import files
+
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.default = os.path.join(self.tmp.name, "prompts")
+        self.profile = os.path.join(self.tmp.name, "profile")
+        os.makedirs(self.default)
+        os.makedirs(self.profile)
+        self.writes = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, directory: str, name: str, content: str):
+        path = os.path.join(directory, name)
+        with open(path, "w") as f:
+            f.write(content)
+        # make sure the change is visible to mtime checks on coarse filesystems
+        self.writes += 1
+        stamp = time.time() + self.writes
+        os.utime(path, (stamp, stamp))
+        os.utime(directory, (stamp, stamp))
+        return path
+
+    def read(self, file: str, **kwargs):
+        return files.read_file(
+            os.path.join(self.profile, file), _backup_dirs=[self.default], **kwargs
+        )
+
+    def test_placeholders_and_includes(self):
+        self.write(self.default, "main.md", "Hi {{name}}, {{missing}}\n{{ include 'part.md' }}")
+        self.write(self.default, "part.md", "part for {{name}}")
+        self.assertEqual(self.read("main.md", name="Bob"), "Hi Bob, {{missing}}\npart for Bob")
+
+    def test_invalidation_on_change_and_override(self):
+        self.write(self.default, "main.md", "v1 {{x}}")
+        self.assertEqual(self.read("main.md", x=1), "v1 1")
+        self.write(self.default, "main.md", "v2 {{x}}")
+        self.assertEqual(self.read("main.md", x=1), "v2 1")
+        # a profile file added later overrides the default one
+        self.write(self.profile, "main.md", "profile {{x}}")
+        self.assertEqual(self.read("main.md", x=1), "profile 1")
+
+    def test_parse_json_and_plugin_variables(self):
+        self.write(self.default, "data.md", '```json\n{"value": {{value}}}\n```')
+        parsed = files.parse_file(
+            os.path.join(self.profile, "data.md"), _backup_dirs=[self.default], value=[1, 2]
+        )
+        self.assertEqual(parsed, {"value": [1, 2]})
+
+        self.write(self.default, "plug.md", "~~~\n{{dynamic}} {{arg}}\n~~~")
+        self.write(
+            self.default,
+            "plug.py",
+            "from python.helpers import files\n"
+            "class Plug(files.VariablesPlugin):\n"
+            "    calls = 0\n"
+            "    def get_variables(self, file=None, backup_dirs=None):\n"
+            "        Plug.calls += 1\n"
+            "        return {'dynamic': Plug.calls}\n",
+        )
+        path = os.path.join(self.profile, "plug.md")
+        first = files.parse_file(path, _backup_dirs=[self.default], arg="a")
+        second = files.parse_file(path, _backup_dirs=[self.default], arg="a")
+        self.assertEqual(first, "1 a\n")
+        self.assertEqual(second, "2 a\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
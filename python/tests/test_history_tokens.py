@@ -0,0 +1,90 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from python.helpers import history, settings
+
+CTX = {"chat_model_ctx_length": 4000, "chat_model_ctx_history": 0.5}
+
+
+class FakeAgent:
+    async def call_utility_model(self, system: str, message: str):
+        return "summary " * 11
+
+    def read_prompt(self, file: str, **kwargs):
+        return file
+
+    def parse_prompt(self, file: str, **kwargs):
+        return kwargs.get("summary", "")
+
+
+def _recount(hist: history.History) -> int:
+    # reference total computed from scratch without any cached values
+    def record_tokens(record) -> int:
+        if isinstance(record, history.Message):
+            return record.calculate_tokens()
+        if record.summary:
+            return history.tokens.approximate_tokens(record.summary)
+        children = record.messages if isinstance(record, history.Topic) else record.records
+        return sum(record_tokens(child) for child in children)
+
+    return sum(record_tokens(r) for r in [*hist.bulks, *hist.topics, hist.current])
+
+
+class TestHistoryTokens(unittest.TestCase):
+    def setUp(self):
+        self.hist = history.History(agent=FakeAgent())
+
+    def fill(self, topics: int, messages: int):
+        for t in range(topics):
+            self.hist.new_topic()
+            for m in range(messages):
+                self.hist.add_message(m % 2 == 1, f"topic {t} message {m} " * 3)
+                self.hist.get_tokens()  # prime caches between mutations
+
+    def test_totals_follow_additions(self):
+        self.fill(topics=5, messages=10)
+        self.assertEqual(self.hist.get_tokens(), _recount(self.hist))
+
+    def test_totals_follow_compression(self):
+        self.fill(topics=40, messages=20)
+        with patch.object(settings, "get_settings", return_value=CTX):
+            self.assertTrue(self.hist.is_over_limit())
+            asyncio.run(self.hist.compress())
+            self.assertFalse(self.hist.is_over_limit())
+        self.assertTrue(self.hist.bulks)
+        self.assertEqual(self.hist.get_tokens(), _recount(self.hist))
+
+    def test_totals_after_deserialize(self):
+        self.fill(topics=3, messages=4)
+        restored = history.deserialize_history(self.hist.serialize(), FakeAgent())
+        self.assertEqual(restored.get_tokens(), self.hist.get_tokens())
+        restored.add_message(False, "one more message")
+        self.assertEqual(restored.get_tokens(), _recount(restored))
+
+
+class TestLangchainOutputCache(unittest.TestCase):
+    def test_reuses_converted_messages(self):
+        hist = history.History(agent=FakeAgent())
+        hist.add_message(False, "question")
+        hist.add_message(True, {"tool_name": "response", "tool_args": {"text": "a"}})
+        hist.add_message(False, "follow-up")
+        cache = history.LangchainOutputCache()
+
+        converted, total = cache.convert(hist.output())
+        self.assertEqual(converted, history.output_langchain(hist.output()))
+        self.assertEqual(total, hist.get_tokens())
+
+        hist.add_message(False, "appended to the last human message")
+        again, _ = cache.convert(hist.output())
+        self.assertEqual(again, history.output_langchain(hist.output()))
+        self.assertIs(again[1], converted[1])
+
+        hist.current.messages[1].set_summary("shortened")
+        changed, total = cache.convert(hist.output())
+        self.assertEqual(changed[1].content, "shortened")
+        self.assertEqual(total, _recount(hist))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from python.helpers import knowledge_import
+
+
+class TestKnowledgeImport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.hashed: list[str] = []
+        original = knowledge_import.calculate_checksum
+
+        def counting_checksum(file_path):
+            self.hashed.append(os.path.basename(file_path))
+            return original(file_path)
+
+        patcher = patch.object(knowledge_import, "calculate_checksum", counting_checksum)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, content: str, stamp: float | None = None):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            f.write(content)
+        stamp = stamp or time.time()
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def load(self, index):
+        self.hashed = []
+        index = knowledge_import.load_knowledge(None, self.dir, index, {"area": "main"})
+        # what preload_knowledge saves between runs
+        return {
+            file: {k: v for k, v in data.items() if k not in ("state", "documents")}
+            for file, data in index.items()
+        }, {os.path.basename(f): d["state"] for f, d in index.items()}
+
+    def test_unchanged_files_are_not_read(self):
+        a = self.write("a.txt", "alpha", 1000)
+        self.write("b.md", "beta", 1000)
+        self.write("c.bin", "ignored", 1000)
+
+        index, states = self.load({})
+        self.assertEqual(states, {"a.txt": "changed", "b.md": "changed"})
+        self.assertEqual(sorted(self.hashed), ["a.txt", "b.md"])
+
+        index, states = self.load(index)
+        self.assertEqual(states, {"a.txt": "original", "b.md": "original"})
+        self.assertEqual(self.hashed, [])
+
+        # touched with the same content: hashed but not reloaded
+        self.write("a.txt", "alpha", 2000)
+        index, states = self.load(index)
+        self.assertEqual(states["a.txt"], "original")
+        self.assertEqual(self.hashed, ["a.txt"])
+
+        # changed content and a removed file
+        self.write("a.txt", "gamma", 3000)
+        os.remove(os.path.join(self.dir, "b.md"))
+        result = knowledge_import.load_knowledge(None, self.dir, index)
+        self.assertEqual(result[a]["state"], "changed")
+        self.assertEqual(result[a]["documents"][0].page_content, "gamma")
+        self.assertEqual(result[a]["documents"][0].metadata["source_file"], "a.txt")
+        self.assertEqual(result[os.path.join(self.dir, "b.md")]["state"], "removed")
+
+    def test_failed_load_keeps_previous_entry(self):
+        path = self.write("a.txt", "alpha", 1000)
+        index, _ = self.load({})
+        index[path]["ids"] = ["id1"]
+        self.write("a.txt", "beta", 2000)
+
+        with patch.object(knowledge_import, "_import_file", side_effect=OSError("busy")):
+            result = knowledge_import.load_knowledge(None, self.dir, index)
+        self.assertEqual(result[path]["state"], "original")
+        self.assertEqual(result[path]["ids"], ["id1"])
+
+        # retried on the next run
+        index, states = self.load(index)
+        self.assertEqual(states["a.txt"], "changed")
+
+
+if __name__ == "__main__":
+    unittest.main()
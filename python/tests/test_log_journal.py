@@ -0,0 +1,76 @@
+import threading
+import unittest
+
+from python.helpers.log import Log
+
+
+class TestLogJournal(unittest.TestCase):
+    def test_repeated_updates_collapse(self):
+        log = Log()
+        first = log.log("agent", heading="first")
+        second = log.log("agent", heading="second")
+        cursor = len(log.updates)
+        for i in range(500):
+            first.update(content=f"chunk {i}")
+        second.update(content="done")
+
+        self.assertEqual(len(log.updates), cursor + 501)
+        self.assertEqual(len(log.updates._last), 2)
+        out = log.output(start=cursor)
+        self.assertEqual([o["no"] for o in out], [0, 1])
+        self.assertEqual(out[0]["content"], "chunk 499")
+        # only items changed after the cursor are returned, in item order
+        third = log.log("agent", heading="third")
+        first.update(content="again")
+        self.assertEqual([o["no"] for o in log.output(start=len(log.updates) - 2)], [0, 2])
+        self.assertEqual(log.output(start=len(log.updates)), [])
+        self.assertEqual(third.no, 2)
+
+    def test_stream_buffers_until_output(self):
+        log = Log()
+        item = log.log("util", heading="Import", content="a")
+        cursor = len(log.updates)
+        for _ in range(100):
+            item.stream(content="b", progress="\n.")
+        # chunks are kept in buffers, the fields are joined once on output
+        self.assertEqual(item.content, "a")
+        self.assertEqual(len(log.updates), cursor + 100)
+        out = log.output(start=cursor)
+        self.assertEqual(out[0]["content"], "a" + "b" * 100)
+        self.assertEqual(out[0]["kvps"]["progress"], "\n." * 100)
+
+        # an update applies pending chunks first
+        item.stream(content="c")
+        item.update(heading="Imported")
+        self.assertTrue(item.content.endswith("bc"))
+
+    def test_concurrent_output_loses_no_chunks(self):
+        log = Log()
+        item = log.log("agent", heading="stream")
+        done = threading.Event()
+
+        def poll():
+            while not done.is_set():
+                log.output()
+
+        readers = [threading.Thread(target=poll) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+        try:
+            for i in range(3000):
+                item.stream(content="x")
+                if i % 500 == 0:
+                    item.update(kvps={"step": i})
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+
+        out = item.output()
+        self.assertEqual(out["content"], "x" * 3000)
+        self.assertEqual(out["kvps"], {"step": 2500})
+        self.assertIsNot(out["kvps"], item.kvps)
+
+
+if __name__ == "__main__":
+    unittest.main()
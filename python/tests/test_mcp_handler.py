@@ -0,0 +1,252 @@
+import asyncio
+import time
+import unittest
+from contextlib import AsyncExitStack
+from types import SimpleNamespace
+from unittest.mock import patch
+
+try:
+    from mcp.shared.exceptions import McpError
+    from mcp.types import CONNECTION_CLOSED, INVALID_PARAMS, ErrorData
+
+    from python.helpers import mcp_handler
+except ImportError:  # the installed mcp client is not the pinned 1.x one
+    mcp_handler = None
+
+SETTINGS = {"mcp_client_init_timeout": 1, "mcp_client_tool_timeout": 1}
+
+
+class FakeClientSession:
+    """Answers like an mcp ClientSession, errors are set per call."""
+
+    def __init__(self, number: int):
+        self.number = number
+        self.tools = ["read"]
+        self.error: Exception | None = None
+        self.hang = False
+
+    async def list_tools(self):
+        if self.hang:
+            await asyncio.sleep(60)
+        return SimpleNamespace(
+            tools=[
+                SimpleNamespace(name=name, description=f"{name} a file", inputSchema={})
+                for name in self.tools
+            ]
+        )
+
+    async def call_tool(self, name, arguments, read_timeout_seconds=None):
+        await asyncio.sleep(arguments.get("delay", 0))
+        if self.error:
+            error, self.error = self.error, None
+            raise error
+        return f"{name} on session {self.number}"
+
+    async def send_ping(self):
+        pass
+
+
+def fake_client(server_name: str = "files"):
+    class FakeClient(mcp_handler.MCPClientBase):  # type: ignore
+        sessions: list[FakeClientSession] = []
+
+        async def _create_stdio_transport(self, current_exit_stack):
+            raise NotImplementedError
+
+        async def _open_session(self, exit_stack: AsyncExitStack):
+            session = FakeClientSession(len(self.sessions))
+            self.sessions.append(session)
+            return session
+
+    return FakeClient(SimpleNamespace(name=server_name, init_timeout=1))  # type: ignore
+
+
+def fake_config(*names: str):
+    """MCPConfig of remote servers whose clients are fake_client ones"""
+    config = mcp_handler.MCPConfig(
+        servers_list=[{"name": name, "url": f"http://{name}.test/sse"} for name in names]
+    )
+    for server in config.servers:
+        server._MCPServerRemote__client = fake_client(server.name)  # type: ignore
+    return config
+
+
+def client_of(server):
+    return server._MCPServerRemote__client
+
+
+@unittest.skipIf(mcp_handler is None, "mcp client not importable")
+class TestClientSessions(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(mcp_handler.settings, "get_settings", return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = fake_client()
+
+    def test_update_tools_through_pool(self):
+        async def run():
+            await self.client.update_tools()
+            await self.client.update_tools()
+            await self.client.close()
+
+        asyncio.run(run())
+        self.assertEqual([t["name"] for t in self.client.get_tools()], ["read"])
+        self.assertEqual(len(self.client.sessions), 1)
+        self.assertEqual(self.client.get_metrics()["calls"], 2)
+
+    def test_tool_error_keeps_session(self):
+        async def run():
+            await self.client.update_tools()
+            self.client.sessions[0].error = McpError(
+                ErrorData(code=INVALID_PARAMS, message="no such file")
+            )
+            with self.assertRaises(ConnectionError):
+                await self.client.call_tool("read", {"path": "x"})
+            result = await self.client.call_tool("read", {"path": "y"})
+            await self.client.close()
+            return result
+
+        self.assertEqual(asyncio.run(run()), "read on session 0")
+        self.assertEqual(len(self.client.sessions), 1)
+        self.assertEqual(self.client.get_metrics()["dropped"], 0)
+
+    def test_closed_connection_replaces_session(self):
+        async def run():
+            await self.client.update_tools()
+            self.client.sessions[0].error = McpError(
+                ErrorData(code=CONNECTION_CLOSED, message="Connection closed")
+            )
+            with self.assertRaises(ConnectionError):
+                await self.client.call_tool("read", {"path": "x"})
+            result = await self.client.call_tool("read", {"path": "y"})
+            await self.client.close()
+            return result
+
+        self.assertEqual(asyncio.run(run()), "read on session 1")
+        self.assertEqual(self.client.get_metrics()["dropped"], 1)
+
+
+@unittest.skipIf(mcp_handler is None, "mcp client not importable")
+class TestConfigCalls(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(mcp_handler.settings, "get_settings", return_value=SETTINGS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tool_calls_run_concurrently(self):
+        config = fake_config("files")
+
+        async def run():
+            await config.initialize_servers()
+            start = time.monotonic()
+            results = await asyncio.wait_for(
+                asyncio.gather(
+                    config.call_tool("files.read", {"delay": 0.2}),
+                    config.call_tool("files.read", {"delay": 0.2}),
+                ),
+                5,
+            )
+            elapsed = time.monotonic() - start
+            with self.assertRaises(ValueError):
+                await config.call_tool("files.write", {})
+            for server in config.servers:
+                await server.close()
+            return results, elapsed
+
+        results, elapsed = asyncio.run(run())
+        # two pooled sessions served the calls side by side
+        self.assertEqual(sorted(results), ["read on session 0", "read on session 1"])
+        self.assertLess(elapsed, 0.35)
+
+
+@unittest.skipIf(mcp_handler is None, "mcp client not importable")
+class TestToolsPrompt(unittest.TestCase):
+    def setUp(self):
+        for patcher in (
+            patch.object(mcp_handler.settings, "get_settings", return_value=SETTINGS),
+            patch.dict(mcp_handler.MCPConfig._MCPConfig__prompt_fragments, clear=True),
+            patch.object(mcp_handler.MCPConfig, "_MCPConfig__prompt_cache", ((), "")),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.renders = []
+        render = mcp_handler.replace_placeholders_text
+
+        def counting_render(template, **kwargs):
+            self.renders.append(kwargs["tool_name"])
+            return render(template, **kwargs)
+
+        patcher = patch.object(mcp_handler, "replace_placeholders_text", counting_render)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fragments_are_rendered_once_per_catalog(self):
+        config = fake_config("files", "web")
+
+        async def update(server_name: str, tools: list[str]):
+            client = client_of(next(s for s in config.servers if s.name == server_name))
+            client.sessions[0].tools = tools
+            await client.update_tools()
+
+        async def run():
+            await config.initialize_servers()
+            first = config.get_tools_prompt()
+            second = config.get_tools_prompt()
+            renders = list(self.renders)
+            await update("web", ["fetch"])
+            third = config.get_tools_prompt()
+            for server in config.servers:
+                await server.close()
+            return first, second, third, renders
+
+        first, second, third, renders = asyncio.run(run())
+        self.assertEqual(renders, ["files.read", "web.read"])
+        # the combined prompt is reused as long as no catalog changed
+        self.assertIs(first, second)
+        # a changed catalog re-renders only its own server
+        self.assertEqual(self.renders, ["files.read", "web.read", "web.fetch"])
+        self.assertIn("web.fetch", third)
+        self.assertIn("files.read", third)
+        self.assertNotIn("web.read", third)
+
+    def test_hanging_server_times_out_without_blocking_others(self):
+        config = fake_config("slow", "fast")
+        slow, fast = (client_of(server) for server in config.servers)
+        connect = slow.pool.connect
+
+        async def hanging_session(exit_stack):
+            session = await connect(exit_stack)
+            session.hang = True
+            return session
+
+        slow.pool.connect = hanging_session
+
+        async def run():
+            start = time.monotonic()
+            await config.initialize_servers()
+            elapsed = time.monotonic() - start
+            for server in config.servers:
+                await server.close()
+            return elapsed
+
+        with patch.object(mcp_handler, "TOOLS_UPDATE_TIMEOUT_FACTOR", 0.2):
+            elapsed = asyncio.run(run())
+        self.assertLess(elapsed, 5)
+        self.assertEqual([t["name"] for t in fast.get_tools()], ["read"])
+        self.assertEqual(slow.get_tools(), [])
+        self.assertIn("not listed", slow.error)
+
+    def test_update_prunes_fragments_of_removed_servers(self):
+        fragments = mcp_handler.MCPConfig._MCPConfig__prompt_fragments
+        fragments.update({"files": ("key", "prompt"), "gone": ("key", "prompt")})
+        with patch.object(mcp_handler.MCPConfig, "_MCPConfig__instance", None), patch.object(
+            mcp_handler.MCPConfig, "initialize_servers", autospec=True
+        ):
+            asyncio.run(
+                mcp_handler.MCPConfig.update('[{"name": "files", "url": "http://files.test/sse"}]')
+            )
+        self.assertEqual(set(fragments), {"files"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import asyncio
+import unittest
+from contextlib import AsyncExitStack
+
+from python.helpers import mcp_pool
+from python.helpers.mcp_pool import SessionPool
+
+
+class ToolError(Exception):
+    pass
+
+
+class FakeSession:
+    def __init__(self, number: int, events: list):
+        self.number = number
+        self.events = events
+        self.broken = False
+
+    async def call(self, delay: float = 0.0):
+        await asyncio.sleep(delay)
+        if self.broken:
+            raise ConnectionError("broken pipe")
+        return self.number
+
+    async def fail(self):
+        raise ToolError("no such file")
+
+
+class TestSessionPool(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.sessions = []
+
+        async def connect(stack: AsyncExitStack):
+            session = FakeSession(len(self.sessions), self.events)
+            self.sessions.append(session)
+            self.events.append(f"open {session.number}")
+            stack.callback(self.events.append, f"close {session.number}")
+            return session
+
+        self.pool = SessionPool(connect, size=2)
+
+    def test_sessions_are_reused_and_calls_bounded(self):
+        async def run():
+            first = await self.pool.run(lambda s: s.call())
+            second = await self.pool.run(lambda s: s.call())
+            # four concurrent calls share at most two sessions
+            results = await asyncio.gather(
+                *(self.pool.run(lambda s: s.call(0.02)) for _ in range(4))
+            )
+            await self.pool.close()
+            return first, second, results
+
+        first, second, results = asyncio.run(run())
+        self.assertEqual((first, second), (0, 0))
+        self.assertEqual(sorted(set(results)), [0, 1])
+        self.assertEqual(self.events, ["open 0", "open 1", "close 1", "close 0"])
+        metrics = self.pool.metrics.summary()
+        self.assertEqual((metrics["calls"], metrics["connects"]), (6, 2))
+        self.assertGreaterEqual(metrics["p95_ms"], 20)
+        self.assertEqual(self.pool.open_sessions, 0)
+
+    def test_broken_session_is_replaced(self):
+        async def run():
+            await self.pool.run(lambda s: s.call())
+            self.sessions[0].broken = True
+            with self.assertRaises(ConnectionError):
+                await self.pool.run(lambda s: s.call())
+            # next call reconnects, a retried call recovers on a fresh session
+            recovered = await self.pool.run(lambda s: s.call())
+            self.sessions[-1].broken = True
+            retried = await self.pool.run(lambda s: s.call(), retry=True)
+            await self.pool.close()
+            return recovered, retried
+
+        recovered, retried = asyncio.run(run())
+        self.assertEqual((recovered, retried), (1, 2))
+        metrics = self.pool.metrics.summary()
+        self.assertEqual((metrics["errors"], metrics["dropped"]), (2, 2))
+
+    def test_application_error_keeps_session(self):
+        self.pool.application_error = lambda e: isinstance(e, ToolError)
+
+        async def run():
+            with self.assertRaises(ToolError):
+                await self.pool.run(lambda s: s.fail(), retry=True)
+            result = await self.pool.run(lambda s: s.call())
+            await self.pool.close()
+            return result
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(self.events, ["open 0", "close 0"])
+        metrics = self.pool.metrics.summary()
+        self.assertEqual((metrics["calls"], metrics["errors"], metrics["dropped"]), (2, 1, 0))
+
+    def test_failed_health_check_reconnects(self):
+        async def ping(session):
+            if session.number == 0:
+                raise TimeoutError()
+
+        self.pool.ping = ping
+        original = mcp_pool.HEALTH_CHECK_AFTER
+        mcp_pool.HEALTH_CHECK_AFTER = 0.0
+        self.addCleanup(setattr, mcp_pool, "HEALTH_CHECK_AFTER", original)
+
+        async def run():
+            await self.pool.run(lambda s: s.call())
+            result = await self.pool.run(lambda s: s.call())
+            await self.pool.close()
+            return result
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(self.events[:3], ["open 0", "close 0", "open 1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+import asyncio
+import unittest
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
+
+from python.extensions.monologue_end import _50_memorize_fragments, _51_memorize_solutions
+from python.helpers import history, log, memory, memory_consolidation, persist_chat
+
+CTX = {"chat_model_ctx_length": 4000, "chat_model_ctx_history": 0.5}
+
+
+class FakeAgent:
+    def __init__(self):
+        self.data = {}
+        self.context = None
+        self.history = history.History(agent=self)
+
+    async def call_utility_model(self, system: str, message: str):
+        return "summary"
+
+    def read_prompt(self, file: str, **kwargs):
+        return file
+
+    def parse_prompt(self, file: str, **kwargs):
+        return kwargs.get("summary", "")
+
+    def get_data(self, field):
+        return self.data.get(field)
+
+    def set_data(self, field, value):
+        self.data[field] = value
+
+    def concat_messages(self, messages):
+        return history.output_text(messages)
+
+
+def contents(messages: list) -> list:
+    return [m["content"] for m in messages]
+
+
+class TestMemorizeWatermark(unittest.TestCase):
+    def setUp(self):
+        self.agent = FakeAgent()
+        self.hist = self.agent.history
+
+    def add(self, *texts: str):
+        for text in texts:
+            self.hist.add_message(False, text)
+
+    def test_messages_are_numbered_and_persisted(self):
+        self.add("a", "b")
+        self.hist.new_topic()
+        self.add("c")
+        self.assertEqual(self.hist.get_last_no(), 3)
+        self.assertEqual(contents(self.hist.output_since(1)), ["b", "c"])
+
+        restored = history.deserialize_history(self.hist.serialize(), agent=self.agent)
+        self.assertEqual(restored.get_last_no(), 3)
+        self.assertEqual(contents(restored.output_since(2)), ["c"])
+        restored.add_message(False, "d")
+        self.assertEqual(restored.get_last_no(), 4)
+
+    def test_summarized_topic_is_included_while_it_has_new_messages(self):
+        self.add("a", "b")
+        self.hist.new_topic()
+        self.add("c")
+        self.hist.topics[0].summary = "ab"
+        self.assertEqual(contents(self.hist.output_since(1)), ["ab", "c"])
+        self.assertEqual(contents(self.hist.output_since(2)), ["c"])
+
+    def test_only_new_history_is_memorized(self):
+        self.add("one", "two", "three", "four")
+        with patch.object(persist_chat, "save_tmp_chat_later") as save:
+            text, last_no = memory.get_history_to_memorize(self.agent, "fragments")  # type: ignore
+            self.assertEqual(last_no, 4)
+            self.assertIn("one", text)
+
+            memory.set_memorized(self.agent, "fragments", last_no)  # type: ignore
+            save.assert_called_once()
+
+        text, _ = memory.get_history_to_memorize(self.agent, "fragments")  # type: ignore
+        self.assertEqual(text, "")
+        # other kinds keep their own watermark
+        text, _ = memory.get_history_to_memorize(self.agent, "solutions")  # type: ignore
+        self.assertIn("one", text)
+
+        self.add("five")
+        text, last_no = memory.get_history_to_memorize(self.agent, "fragments")  # type: ignore
+        self.assertEqual(last_no, 5)
+        # new message with a small overlap of already memorized ones
+        self.assertEqual(
+            text, history.output_text(self.hist.output_since(4 - memory.MEMORIZE_OVERLAP))
+        )
+        self.assertNotIn("one", text)
+        self.assertIn("five", text)
+
+    def test_replaced_history_resets_watermark(self):
+        self.agent.data[memory.MEMORIZED_DATA_NAME] = {"fragments": 10}
+        self.add("one")
+        text, last_no = memory.get_history_to_memorize(self.agent, "fragments")  # type: ignore
+        self.assertEqual(last_no, 1)
+        self.assertIn("one", text)
+
+    def test_summarized_history_keeps_numbers(self):
+        for t in range(40):
+            self.hist.new_topic()
+            self.add(*[f"topic {t} message {m} " * 3 for m in range(20)])
+        with patch.object(history.settings, "get_settings", return_value=CTX):
+            asyncio.run(self.hist.compress())
+        self.assertTrue(self.hist.topics[0].summary)
+        self.assertEqual(self.hist.get_last_no(), 800)
+        self.assertTrue(self.hist.output_since(799))
+        self.assertEqual(self.hist.output_since(800), [])
+
+
+
+class MemorizingAgent(FakeAgent):
+    async def call_utility_model(self, system: str, message: str, **kwargs):
+        return '["first fact", "second fact"]'
+
+
+class TestMemorizeExtensions(unittest.TestCase):
+    SETTINGS = {"memory_memorize_consolidation": True, "memory_memorize_replace_threshold": 0}
+
+    def memorize(self, extension, kind: str, results=None, error=None):
+        consolidator = MagicMock()
+        consolidator.process_new_memories = AsyncMock(return_value=results, side_effect=error)
+        module = _50_memorize_fragments if kind == "fragments" else _51_memorize_solutions
+        with patch.object(module.settings, "get_settings", return_value=self.SETTINGS), patch.object(
+            module.Memory, "get", AsyncMock()
+        ), patch.object(
+            memory_consolidation, "create_memory_consolidator", return_value=consolidator
+        ), patch.object(module, "set_memorized") as set_memorized:
+            item = log.Log().log("util")
+            asyncio.run(extension(MemorizingAgent()).memorize(None, item, msgs_text="hi", last_no=7))
+        return set_memorized
+
+    def test_watermark_moves_only_when_all_entries_are_stored(self):
+        stored = {"success": True, "memory_ids": ["a"]}
+        failed = {"success": False, "memory_ids": []}
+        for extension, kind in (
+            (_50_memorize_fragments.MemorizeMemories, "fragments"),
+            (_51_memorize_solutions.MemorizeSolutions, "solutions"),
+        ):
+            with self.subTest(kind=kind):
+                set_memorized = self.memorize(extension, kind, [stored, stored])
+                set_memorized.assert_called_once_with(ANY, kind, 7)
+                set_memorized = self.memorize(extension, kind, [stored, failed])
+                set_memorized.assert_not_called()
+                set_memorized = self.memorize(extension, kind, error=RuntimeError("model down"))
+                set_memorized.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
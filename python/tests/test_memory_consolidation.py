@@ -0,0 +1,155 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+from python.helpers import memory_consolidation
+from python.helpers.memory_consolidation import ConsolidationConfig, MemoryConsolidator
+
+
+class FakeStore:
+    def __init__(self, docs: list[Document]):
+        self.docs = {doc.metadata["id"]: doc for doc in docs}
+
+    async def aget_by_ids(self, ids):
+        return [self.docs[id] for id in ids if id in self.docs]
+
+
+class FakeMemory:
+    def __init__(self, docs: list[Document]):
+        self.db = FakeStore(docs)
+        self.embedded: list[list[str]] = []
+        self.queried: list[list[str]] = []
+        self.keys: list[str] = []
+        self.searches = 0
+        self.inserted: list[str] = []
+        self.deleted: list[str] = []
+
+    def vector(self, text: str) -> list[float]:
+        # one direction per text, texts differing only in case and a final dot share it
+        key = text.lower().rstrip(".")
+        if key not in self.keys:
+            self.keys.append(key)
+        return [float(i == self.keys.index(key)) for i in range(32)]
+
+    async def embed_texts(self, texts):
+        self.embedded.append(list(texts))
+        return [self.vector(text) for text in texts]
+
+    async def embed_queries(self, texts):
+        self.queried.append(list(texts))
+        return [self.vector(text) for text in texts]
+
+    async def search_similarity_threshold_by_vectors(self, vectors, limit, threshold, filter=""):
+        self.searches += 1
+        # memories and keywords mentioning "python" find the existing memory
+        return [
+            [self.db.docs["old"]] if "python" in self.keys[v.index(1.0)] else []
+            for v in vectors
+        ]
+
+    async def insert_documents(self, docs):
+        return [await self.insert_text(doc.page_content, doc.metadata) for doc in docs]
+
+    async def insert_text(self, text, metadata={}):
+        self.inserted.append(text)
+        return f"new{len(self.inserted)}"
+
+    async def delete_documents_by_ids(self, ids):
+        self.deleted.extend(ids)
+        return [self.db.docs.pop(id) for id in ids if id in self.db.docs]
+
+
+class FakeAgent:
+    def __init__(self, responses: list[str]):
+        self.responses = responses
+        self.calls: list[str] = []
+
+    def read_prompt(self, file: str, **kwargs):
+        return file + "\n" + json.dumps(kwargs)
+
+    async def call_utility_model(self, system: str, message: str, **kwargs):
+        self.calls.append(message)
+        return self.responses.pop(0)
+
+
+class TestBatchConsolidation(unittest.TestCase):
+    def run_batch(self, memories: list[str], responses: list[str], **config):
+        db = FakeMemory([Document("python basics", metadata={"id": "old"})])
+        agent = FakeAgent(responses)
+        consolidator = MemoryConsolidator(agent, ConsolidationConfig(**config))  # type: ignore
+
+        async def get(_agent):
+            return db
+
+        with patch.object(memory_consolidation.Memory, "get", get):
+            results = asyncio.run(
+                consolidator.process_new_memories(memories, "fragments", {"area": "fragments"})
+            )
+        return results, db, agent
+
+    def test_batch_uses_one_call_per_stage(self):
+        keywords = json.dumps({"1": ["python tips"], "2": ["rust"], "3": ["python lists"]})
+        decisions = json.dumps([
+            {"memory": 3, "action": "skip"},
+            {"memory": 1, "action": "merge", "memories_to_remove": ["old"],
+             "new_memory_content": "python basics and tips"},
+        ])
+        results, db, agent = self.run_batch(
+            ["python tips", "rust ownership", "python lists"], [keywords, decisions]
+        )
+
+        # one keyword request and one grouped consolidation request
+        self.assertEqual(len(agent.calls), 2)
+        self.assertIn("keyword_extraction_batch", agent.calls[0])
+        self.assertIn("consolidation_batch", agent.calls[1])
+        self.assertNotIn("rust ownership", agent.calls[1])
+        # memories embedded as documents, unique keywords as queries, searched together
+        self.assertEqual(db.embedded, [["python tips", "rust ownership", "python lists"]])
+        self.assertEqual(db.queried, [["python tips", "rust", "python lists"]])
+        self.assertEqual(db.searches, 1)
+
+        self.assertTrue(all(result["success"] for result in results))
+        self.assertNotIn("old", db.db.docs)
+        self.assertEqual(
+            sorted(db.inserted), ["python basics and tips", "python lists", "rust ownership"]
+        )
+
+    def test_groups_are_limited_and_missing_decisions_insert(self):
+        keywords = json.dumps({})  # fallback keywords are the memories themselves
+        results, db, agent = self.run_batch(
+            ["python a", "python b", "python c"], [keywords, "[]", "not json"],
+            max_batch_memories=2,
+        )
+        self.assertEqual(len(agent.calls), 3)
+        self.assertTrue(all(result["success"] for result in results))
+        self.assertEqual(sorted(db.inserted), ["python a", "python b", "python c"])
+
+    def test_repeated_memories_of_a_batch_are_stored_once(self):
+        keywords = json.dumps({"1": ["rust"], "2": ["rust"], "3": ["go"]})
+        results, db, agent = self.run_batch(
+            ["Rust ownership.", "rust ownership", "go channels"], [keywords]
+        )
+        self.assertEqual(sorted(db.inserted), ["Rust ownership.", "go channels"])
+        self.assertEqual(results[1], results[0])
+        self.assertTrue(all(result["success"] for result in results))
+
+    def test_consumed_memories_are_not_consolidated_twice(self):
+        keywords = json.dumps({"1": ["python tips"], "2": ["python lists"]})
+        decisions = json.dumps([
+            {"memory": 1, "action": "merge", "memories_to_remove": ["old"],
+             "new_memory_content": "python basics and tips"},
+            {"memory": 2, "action": "replace", "memories_to_remove": ["old"],
+             "new_memory_content": "python basics and lists"},
+        ])
+        results, db, agent = self.run_batch(["python tips", "python lists"], [keywords, decisions])
+        self.assertEqual(db.deleted, ["old"])
+        # the second decision falls back to storing its memory as is
+        self.assertEqual(db.inserted, ["python basics and tips", "python lists"])
+        self.assertTrue(all(result["success"] for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
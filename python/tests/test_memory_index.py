@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from python.helpers import memory_index
+
+
+def _vectors(size: int, dim: int = 8) -> np.ndarray:
+    rng = np.random.default_rng(42)
+    vectors = rng.normal(size=(size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+class TestMemoryIndex(unittest.TestCase):
+    def test_resolve_index_type(self):
+        self.assertEqual(memory_index.resolve_index_type("auto", 10, 100), "flat")
+        self.assertEqual(memory_index.resolve_index_type("auto", 100, 100), "ivf")
+        self.assertEqual(memory_index.resolve_index_type("hnsw", 500, 100), "hnsw")
+        self.assertEqual(memory_index.resolve_index_type("flat", 500, 100), "flat")
+        self.assertEqual(memory_index.resolve_index_type("bogus", 500, 100), "ivf")
+
+    def test_migrate_keeps_positions(self):
+        vectors = _vectors(1000)
+        flat = memory_index.create_index(8, "flat", vectors)
+        for index_type in ("ivf", "hnsw"):
+            index = memory_index.migrate_index(flat, index_type)
+            self.assertEqual(memory_index.get_index_type(index), index_type)
+            _, found = index.search(vectors[:20], 1)
+            self.assertEqual(found[:, 0].tolist(), list(range(20)))
+
+    def test_remove_positions_renumbers(self):
+        vectors = _vectors(1000)
+        removed = [0, 10, 500, 999]
+        keep = np.delete(np.arange(1000), removed)
+        for index_type in ("flat", "ivf", "hnsw"):
+            index = memory_index.create_index(8, index_type, vectors)  # type: ignore
+            index = memory_index.remove_positions(index, np.array(removed))
+            self.assertEqual(index.ntotal, len(keep))
+            # vector that was at position keep[i] must now be found at position i
+            probe = [0, 1, 9, 497, 995]
+            _, found = index.search(vectors[keep[probe]], 1)
+            self.assertEqual(found[:, 0].tolist(), probe, index_type)
+
+            # appended vectors continue the contiguous numbering
+            index.add(vectors[:1] * -1)
+            _, found = index.search(vectors[:1] * -1, 1)
+            self.assertEqual(found[0, 0], len(keep), index_type)
+
+
+if __name__ == "__main__":
+    unittest.main()
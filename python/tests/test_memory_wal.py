@@ -0,0 +1,167 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from python.helpers.faiss_loader import faiss
+from python.helpers.memory_wal import (
+    COMMIT_FILE,
+    COMPACTING_FILE,
+    NEW_SUFFIX,
+    WAL_FILE,
+    MemoryWal,
+)
+
+DIM = 16
+
+
+def _new_db():
+    embeddings = DeterministicFakeEmbedding(size=DIM)
+    return FAISS(
+        embedding_function=embeddings,
+        index=faiss.IndexFlatIP(DIM),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+
+
+def _insert(db, wal: MemoryWal, ids: list[str], texts: list[str]):
+    metadatas = [{"id": id, "area": "main"} for id in ids]
+    vectors = db.embedding_function.embed_documents(texts)
+    db.add_embeddings(zip(texts, vectors), metadatas=metadatas, ids=ids)
+    wal.append_insert(ids, texts, vectors, metadatas)
+
+
+class TestMemoryWal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_replay_restores_inserts_and_deletes(self):
+        db = _new_db()
+        wal = MemoryWal(self.dir)
+        _insert(db, wal, ["a", "b", "c"], ["alpha", "beta", "gamma"])
+        db.delete(ids=["b"])
+        wal.append_delete(["b"])
+
+        restored = _new_db()
+        applied = MemoryWal(self.dir).replay(restored)
+
+        self.assertEqual(applied, 4)
+        self.assertEqual(set(restored.docstore._dict), {"a", "c"})
+        self.assertEqual(restored.index.ntotal, 2)
+        self.assertEqual(restored.docstore._dict["c"].page_content, "gamma")
+
+    def test_replay_is_idempotent(self):
+        db = _new_db()
+        wal = MemoryWal(self.dir)
+        _insert(db, wal, ["a", "b"], ["alpha", "beta"])
+
+        self.assertEqual(wal.replay(db), 0)
+        self.assertEqual(db.index.ntotal, 2)
+
+    def test_compaction_writes_snapshot_and_drops_log(self):
+        db = _new_db()
+        wal = MemoryWal(self.dir, compact_after=2)
+        _insert(db, wal, ["a", "b"], ["alpha", "beta"])
+        self.assertTrue(wal.needs_compaction())
+
+        self.assertTrue(wal.compact(db))
+        wal.wait()
+        # written after the rotation, must stay in the live log
+        _insert(db, wal, ["c"], ["gamma"])
+
+        self.assertFalse(os.path.exists(os.path.join(self.dir, COMPACTING_FILE)))
+        self.assertEqual(wal.entries, 1)
+
+        loaded = FAISS.load_local(
+            self.dir,
+            DeterministicFakeEmbedding(size=DIM),
+            allow_dangerous_deserialization=True,
+        )
+        self.assertEqual(set(loaded.docstore._dict), {"a", "b"})
+        MemoryWal(self.dir).replay(loaded)
+        self.assertEqual(set(loaded.docstore._dict), {"a", "b", "c"})
+        self.assertEqual(loaded.index.ntotal, 3)
+
+    def test_torn_record_is_skipped(self):
+        db = _new_db()
+        wal = MemoryWal(self.dir)
+        _insert(db, wal, ["a"], ["alpha"])
+        with open(os.path.join(self.dir, WAL_FILE), "a", encoding="utf-8") as f:
+            f.write('{"op": "insert", "id": "b", "te')
+
+        restored = _new_db()
+        self.assertEqual(MemoryWal(self.dir).replay(restored), 1)
+        self.assertEqual(set(restored.docstore._dict), {"a"})
+
+    def _load(self):
+        return FAISS.load_local(
+            self.dir,
+            DeterministicFakeEmbedding(size=DIM),
+            allow_dangerous_deserialization=True,
+        )
+
+    def test_interrupted_switch_is_completed(self):
+        db = _new_db()
+        wal = MemoryWal(self.dir)
+        _insert(db, wal, ["a"], ["alpha"])
+        wal.save(db)
+        _insert(db, wal, ["b"], ["beta"])
+
+        # crash after the commit marker, with only the index file moved into place
+        with patch.object(os, "remove", side_effect=OSError("crash")):
+            with self.assertRaises(OSError):
+                wal.save(db)
+        os.replace(
+            os.path.join(self.dir, "index.pkl"),
+            os.path.join(self.dir, "index.pkl" + NEW_SUFFIX),
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.dir, COMMIT_FILE)))
+
+        MemoryWal(self.dir).recover()
+        loaded = self._load()
+        self.assertEqual(set(loaded.docstore._dict), {"a", "b"})
+        self.assertEqual(loaded.index.ntotal, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dir, COMMIT_FILE)))
+
+    def test_uncommitted_snapshot_is_discarded(self):
+        db = _new_db()
+        wal = MemoryWal(self.dir)
+        _insert(db, wal, ["a"], ["alpha"])
+        wal.save(db)
+        _insert(db, wal, ["b"], ["beta"])
+        new_index = os.path.join(self.dir, "index.faiss" + NEW_SUFFIX)
+        with open(new_index, "wb") as f:
+            f.write(b"torn")
+
+        wal = MemoryWal(self.dir)
+        wal.recover()
+        self.assertFalse(os.path.exists(new_index))
+        loaded = self._load()
+        self.assertEqual(set(loaded.docstore._dict), {"a"})
+        wal.replay(loaded)
+        self.assertEqual(set(loaded.docstore._dict), {"a", "b"})
+
+    def test_replay_documents_for_reindexing(self):
+        db = _new_db()
+        wal = MemoryWal(self.dir)
+        _insert(db, wal, ["a", "b"], ["alpha", "beta"])
+        wal.append_delete(["a"])
+
+        docs = MemoryWal(self.dir).replay_documents({"old": Document("kept")})
+        self.assertEqual(set(docs), {"old", "b"})
+        self.assertEqual(docs["b"].page_content, "beta")
+        self.assertEqual(docs["b"].metadata["area"], "main")
+
+
+if __name__ == "__main__":
+    unittest.main()
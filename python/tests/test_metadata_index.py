@@ -0,0 +1,199 @@
+import unittest
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from python.helpers import memory_index
+from python.helpers.faiss_loader import faiss
+from python.helpers.metadata_index import MetadataIndex, MetadataIndexedFaiss
+from python.helpers.vector_db import get_comparator
+
+DIM = 16
+
+
+def _docs() -> dict[str, Document]:
+    return {
+        "a": Document("alpha", metadata={"id": "a", "area": "main", "timestamp": "2025-01-01 10:00:00"}),
+        "b": Document("beta", metadata={"id": "b", "area": "fragments", "timestamp": "2025-02-01 10:00:00"}),
+        "c": Document("gamma", metadata={"id": "c", "area": "solutions", "timestamp": "2025-03-01 10:00:00"}),
+        "d": Document("delta", metadata={"id": "d", "area": "main", "timestamp": "2025-04-01 10:00:00"}),
+    }
+
+
+def _new_db() -> MetadataIndexedFaiss:
+    return MetadataIndexedFaiss(
+        embedding_function=DeterministicFakeEmbedding(size=DIM),
+        index=faiss.IndexFlatIP(DIM),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.COSINE,
+    )
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.docs = _docs()
+        self.index = MetadataIndex.from_documents(self.docs)
+
+    def candidates(self, condition: str):
+        return self.index.candidates(condition, self.docs)
+
+    def test_equality_and_membership(self):
+        self.assertEqual(self.candidates("area == 'main'"), {"a", "d"})
+        self.assertEqual(self.candidates("'main' == area"), {"a", "d"})
+        self.assertEqual(self.candidates("area=='main' or area=='solutions'"), {"a", "c", "d"})
+        self.assertEqual(self.candidates("area in ['fragments', 'solutions']"), {"b", "c"})
+        self.assertEqual(self.candidates("id == 'c'"), {"c"})
+        self.assertEqual(self.candidates("area == 'missing'"), set())
+
+    def test_timestamp_ranges(self):
+        self.assertEqual(self.candidates("timestamp >= '2025-02-01 10:00:00'"), {"b", "c", "d"})
+        self.assertEqual(self.candidates("timestamp > '2025-02-01 10:00:00'"), {"c", "d"})
+        self.assertEqual(self.candidates("timestamp < '2025-02-01 10:00:00'"), {"a"})
+        self.assertEqual(
+            self.candidates("area == 'main' and timestamp > '2025-02-01'"), {"d"}
+        )
+        self.assertEqual(self.index.latest(limit=2), ["d", "c"])
+
+    def test_unsupported_conditions_fall_back(self):
+        self.assertIsNone(self.candidates("area != 'main'"))
+        self.assertIsNone(self.candidates("area == 'main' or len(area) > 3"))
+        self.assertIsNone(self.candidates("area == "))
+        # partially answerable conjunction still narrows the candidates
+        self.assertEqual(self.candidates("area == 'main' and len(area) > 3"), {"a", "d"})
+
+    def test_remove(self):
+        self.index.remove("a", self.docs["a"].metadata)
+        self.assertEqual(self.candidates("area == 'main'"), {"d"})
+        self.assertEqual(self.candidates("timestamp < '2025-02-01'"), set())
+
+
+class TestMetadataIndexedFaiss(unittest.TestCase):
+    def setUp(self):
+        self.db = _new_db()
+        docs = _docs()
+        self.db.add_documents(list(docs.values()), ids=list(docs.keys()))
+
+    def test_filtered_search_uses_candidates(self):
+        condition = "area == 'main'"
+        candidates = self.db.filter_candidates(condition)
+        results = self.db.similarity_search_with_score(
+            "gamma", k=4, filter=get_comparator(condition), candidate_ids=candidates
+        )
+        self.assertEqual({doc.metadata["id"] for doc, _ in results}, {"a", "d"})
+
+    def test_index_follows_mutations(self):
+        self.assertEqual(self.db.filter_candidates("area == 'main'"), {"a", "d"})
+        self.db.delete(ids=["a"])
+        self.db.add_texts(["epsilon"], metadatas=[{"id": "e", "area": "main"}], ids=["e"])
+        self.assertEqual(self.db.filter_candidates("area == 'main'"), {"d", "e"})
+
+        results = self.db.similarity_search_with_score(
+            "epsilon", k=1, candidate_ids={"d", "e"}
+        )
+        self.assertEqual(results[0][0].metadata["id"], "e")
+
+    def test_batched_search_matches_single_searches(self):
+        condition = "area == 'main'"
+        candidates = self.db.filter_candidates(condition)
+        queries = ["alpha", "delta", "gamma"]
+        vectors = self.db.embedding_function.embed_documents(queries)
+        batched = self.db.similarity_search_with_score_by_vectors(
+            vectors, k=2, filter=get_comparator(condition), candidate_ids=candidates
+        )
+        for query, results in zip(queries, batched):
+            single = self.db.similarity_search_with_score(
+                query, k=2, filter=get_comparator(condition), candidate_ids=candidates
+            )
+            self.assertEqual(
+                [doc.metadata["id"] for doc, _ in results],
+                [doc.metadata["id"] for doc, _ in single],
+            )
+        self.assertEqual(batched[0][0][0].metadata["id"], "a")
+        self.assertEqual(
+            self.db.similarity_search_with_score_by_vectors(vectors, candidate_ids=set()),
+            [[], [], []],
+        )
+
+    def test_get_vectors_after_delete(self):
+        self.db.delete(ids=["a"])
+        vectors = self.db.get_vectors(["d", "a", "missing"])
+        self.assertEqual(set(vectors), {"d"})
+        expected = DeterministicFakeEmbedding(size=DIM).embed_documents(["delta"])[0]
+        self.assertTrue(all(abs(x - y) < 1e-5 for x, y in zip(vectors["d"], expected)))
+
+    def test_search_by_metadata(self):
+        condition = "area == 'main' and timestamp > '2025-02-01'"
+        docs = self.db.search_by_metadata(condition, get_comparator(condition))
+        self.assertEqual([doc.metadata["id"] for doc in docs], ["d"])
+
+    def test_limited_search_keeps_docstore_order(self):
+        db = _new_db()
+        ids = [f"doc{(i * 7) % 40}" for i in range(40)]
+        areas = ["main" if i % 2 else "fragments" for i in range(40)]
+        db.add_texts(
+            [f"text {i}" for i in range(40)],
+            metadatas=[{"id": id_, "area": area} for id_, area in zip(ids, areas)],
+            ids=ids,
+        )
+        db.delete(ids=[ids[1]])
+
+        def found(condition: str, limit: int) -> list[str]:
+            docs = db.search_by_metadata(condition, get_comparator(condition), limit=limit)
+            return [doc.metadata["id"] for doc in docs]
+
+        # a large candidate set is scanned, a small one sorted by index position
+        self.assertEqual(found("area == 'main'", 3), [ids[3], ids[5], ids[7]])
+        picked = [ids[30], ids[2], ids[17], ids[9]]
+        condition = f"id in {picked!r}"
+        self.assertEqual(found(condition, 3), [ids[2], ids[9], ids[17]])
+        self.assertEqual(found(condition, 0), [ids[2], ids[9], ids[17], ids[30]])
+
+
+class TestHnswTombstones(unittest.TestCase):
+    def setUp(self):
+        self.db = MetadataIndexedFaiss(
+            embedding_function=DeterministicFakeEmbedding(size=DIM),
+            index=memory_index.create_index(DIM, "hnsw"),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            distance_strategy=DistanceStrategy.COSINE,
+        )
+        texts = [f"text {i}" for i in range(30)]
+        self.db.add_texts(texts, ids=[str(i) for i in range(30)])
+
+    def found(self, query: str, k: int = 30, **kwargs) -> list[str]:
+        results = self.db.similarity_search_with_score(query, k=k, **kwargs)
+        return [doc.page_content for doc, _ in results]
+
+    def test_delete_keeps_graph_and_skips_tombstones(self):
+        graph = self.db.index
+        self.db.delete(ids=["3"])
+        self.assertIs(self.db.index, graph)
+        self.assertEqual(self.db.index.ntotal, 30)
+        self.assertTrue(self.db.index_in_sync())
+
+        self.assertEqual(len(self.found("text 3")), 29)
+        self.assertNotIn("text 3", self.found("text 3"))
+        vectors = self.db.embedding_function.embed_documents(["text 3"])
+        self.assertEqual(len(self.db.similarity_search_with_score_by_vectors(vectors, k=30)[0]), 29)
+
+        # new vectors are appended after the tombstone
+        self.db.add_texts(["new"], ids=["new"])
+        self.assertEqual(self.db.index_to_docstore_id[30], "new")
+        self.assertEqual(self.found("new", k=1), ["new"])
+        self.assertEqual(self.found("new", k=1, candidate_ids={"new", "4"}), ["new"])
+
+    def test_tombstones_are_compacted_past_threshold(self):
+        self.db.delete(ids=["0", "1", "2"])
+        self.assertEqual(self.db.index.ntotal, 30)
+        self.db.delete(ids=["3"])
+        self.assertEqual(self.db.index.ntotal, 26)
+        self.assertEqual(sorted(self.db.index_to_docstore_id), list(range(26)))
+        self.assertEqual(self.found("text 5", k=1), ["text 5"])
+
+
+if __name__ == "__main__":
+    unittest.main()
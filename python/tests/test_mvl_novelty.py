@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+import unittest
+from types import SimpleNamespace
+
+from langchain_core.embeddings import Embeddings
+
+from python.helpers import files, mvl_manager, mvl_store, query_embeddings
+from python.helpers.mvl_manager import MVLManager
+
+
+class WordEmbeddings(Embeddings):
+    """Bag of words hashed into a small vector, same words give the same direction."""
+
+    def __init__(self):
+        self.queries: list[str] = []
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        vector = [0.0] * 32
+        for word in text.lower().replace("!", "").replace(".", "").split():
+            vector[hashlib.sha256(word.encode()).digest()[0] % 32] += 1.0
+        return vector
+
+
+class FakeAgent:
+    def __init__(self, model: Embeddings):
+        self.model = model
+        self.limited: list[str] = []
+        self.config = SimpleNamespace(
+            embeddings_model=SimpleNamespace(provider="test", name="words")
+        )
+
+    def get_embedding_model(self):
+        return self.model
+
+    async def rate_limiter(self, model_config, input: str):
+        self.limited.append(input)
+
+
+class TestMVLNovelty(unittest.TestCase):
+    def setUp(self):
+        self.db_path = "test_mvl_novelty.db"
+        self.abs_path = files.get_abs_path(self.db_path)
+        self.remove_files()
+        mvl_manager._embeddings.clear()
+        query_embeddings.get_cache().clear()
+        self.model = WordEmbeddings()
+        self.agent = FakeAgent(self.model)
+
+    def tearDown(self):
+        mvl_store.close_all()
+        mvl_manager._embeddings.clear()
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.abs_path + suffix):
+                os.remove(self.abs_path + suffix)
+
+    def test_repeated_meaning_has_low_novelty(self):
+        manager = MVLManager(db_path=self.db_path, agent=self.agent)
+
+        async def run():
+            first = await manager.calculate_novelty_async("My cat sleeps all day", "user")
+            await manager.process_message("user", "My cat sleeps all day")
+            repeated = await manager.calculate_novelty_async("my cat sleeps all day!", "user")
+            other_user = await manager.calculate_novelty_async("my cat sleeps all day!", "other")
+            different = await manager.calculate_novelty_async("quantum tunnelling maths", "user")
+            return first, repeated, other_user, different
+
+        first, repeated, other_user, different = asyncio.run(run())
+        self.assertEqual(first, 1.0)
+        self.assertAlmostEqual(repeated, 0.0, places=5)
+        self.assertEqual(other_user, 1.0)
+        self.assertGreater(different, 0.5)
+        # the repeated text was embedded and rate limited once
+        self.assertEqual(self.model.queries.count("My cat sleeps all day"), 1)
+        self.assertEqual(self.agent.limited.count("My cat sleeps all day"), 1)
+
+    def test_window_is_persisted_and_bounded(self):
+        manager = MVLManager(db_path=self.db_path, agent=self.agent, novelty_window=2)
+
+        async def process(*texts):
+            for text in texts:
+                await manager.process_message("user", text)
+
+        asyncio.run(process("apples", "bananas", "cherries"))
+        with manager._get_db() as conn:
+            events = conn.execute(
+                "SELECT embedding_id FROM interaction_event ORDER BY rowid"
+            ).fetchall()
+            embeddings = conn.execute("SELECT id, model FROM message_embedding").fetchall()
+        # only the vectors of the window are kept
+        self.assertEqual({row[0] for row in events[1:]}, {row[0] for row in embeddings})
+        self.assertEqual({row[1] for row in embeddings}, {"test_words"})
+        # other users keep their own vectors
+        asyncio.run(manager.process_message("other", "dates"))
+        with manager._get_db() as conn:
+            counts = dict(conn.execute(
+                "SELECT user_id, COUNT(*) FROM message_embedding GROUP BY user_id"
+            ).fetchall())
+        self.assertEqual(counts, {"user": 2, "other": 1})
+
+        # a new process loads the last two messages from the database
+        mvl_store.close_all()
+        manager = MVLManager(db_path=self.db_path, agent=self.agent, novelty_window=2)
+        novelty = asyncio.run(manager.calculate_novelty_async("cherries", "user"))
+        self.assertAlmostEqual(novelty, 0.0, places=5)
+        novelty = asyncio.run(manager.calculate_novelty_async("apples", "user"))
+        self.assertGreater(novelty, 0.5)
+        window = manager._get_window("user", "test_words")
+        self.assertEqual(window.vectors.shape, (2, 32))  # type: ignore
+
+    def test_smaller_window_keeps_vectors_of_larger_one(self):
+        small = MVLManager(db_path=self.db_path, agent=self.agent, novelty_window=2)
+        large = MVLManager(db_path=self.db_path, agent=self.agent, novelty_window=4)
+
+        async def process(*texts):
+            for text in texts:
+                await small.process_message("user", text)
+
+        asyncio.run(process("apples", "bananas", "cherries", "dates", "figs"))
+        with small._get_db() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM message_embedding").fetchone()[0]
+        self.assertEqual(count, 4)
+        # the larger window still finds a message the smaller one has forgotten
+        novelty = asyncio.run(large.calculate_novelty_async("bananas", "user"))
+        self.assertAlmostEqual(novelty, 0.0, places=5)
+        novelty = asyncio.run(small.calculate_novelty_async("bananas", "user"))
+        self.assertGreater(novelty, 0.5)
+
+    def test_windows_of_least_recent_users_are_dropped(self):
+        manager = MVLManager(db_path=self.db_path, agent=self.agent)
+        manager.store.window_users = 2
+
+        async def process(*users):
+            for user in users:
+                await manager.process_message(user, f"hello from {user}")
+
+        asyncio.run(process("first", "second", "first", "third"))
+        self.assertEqual(list(manager.store.windows), ["first", "third"])
+        # a dropped window is loaded again from the database
+        novelty = asyncio.run(manager.calculate_novelty_async("hello from second", "second"))
+        self.assertAlmostEqual(novelty, 0.0, places=5)
+        self.assertEqual(list(manager.store.windows), ["third", "second"])
+
+    def test_without_embedding_model_falls_back_to_text_similarity(self):
+        manager = MVLManager(db_path=self.db_path)
+
+        async def run():
+            await manager.process_message("user", "My cat sleeps all day")
+            return await manager.calculate_novelty_async("My cat sleeps all day", "user")
+
+        self.assertAlmostEqual(asyncio.run(run()), 0.0)
+        with manager._get_db() as conn:
+            row = conn.execute("SELECT embedding_id FROM interaction_event").fetchone()
+        self.assertIsNone(row[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import os
+import sqlite3
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from python.helpers import files, mvl_store
+from python.helpers.mvl_manager import MVLManager
+
+
+class TestMVLStore(unittest.TestCase):
+    def setUp(self):
+        self.db_path = "test_mvl_store.db"
+        self.abs_path = files.get_abs_path(self.db_path)
+        self.remove_files()
+
+    def tearDown(self):
+        mvl_store.close_all()
+        self.remove_files()
+
+    def remove_files(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.abs_path + suffix):
+                os.remove(self.abs_path + suffix)
+
+    def test_managers_share_store_and_connections(self):
+        with patch.object(mvl_store, "init_schema", wraps=mvl_store.init_schema) as init:
+            first = MVLManager(db_path=self.db_path)
+            second = MVLManager(db_path=self.db_path)
+            self.assertIs(first.store, second.store)
+            self.assertEqual(init.call_count, 1)
+
+        with patch.object(mvl_store.sqlite3, "connect", wraps=sqlite3.connect) as connect:
+            for i in range(5):
+                first.update_state("user", 0.5, i)
+                second.get_state("user")
+            self.assertEqual(connect.call_count, 0)
+        self.assertEqual(second.get_state("user"), {"entropy": 0.5, "silence_streak": 4})
+
+    def test_deleted_database_is_recreated(self):
+        manager = MVLManager(db_path=self.db_path)
+        manager.update_state("user", 0.9, 1)
+        store = manager.store
+        self.remove_files()
+
+        manager = MVLManager(db_path=self.db_path)
+        self.assertIsNot(manager.store, store)
+        self.assertEqual(manager.get_state("user"), {"entropy": 0.5, "silence_streak": 0})
+
+    def test_failed_block_rolls_back(self):
+        manager = MVLManager(db_path=self.db_path)
+        with self.assertRaises(RuntimeError):
+            with manager._get_db() as conn:
+                conn.execute(
+                    "INSERT INTO loom_state (user_id, entropy, silence_streak) VALUES (?, ?, ?)",
+                    ("user", 0.9, 3),
+                )
+                raise RuntimeError("failed")
+        self.assertEqual(manager.get_state("user"), {"entropy": 0.5, "silence_streak": 0})
+
+    def test_patterns_are_inserted_together_and_invalid_ones_skipped(self):
+        agent = MagicMock()
+        agent.call_utility_model = AsyncMock(return_value=json.dumps({
+            "pattern_candidates": [
+                {"type": "loop", "summary": "repeats"},
+                {"type": "not a type", "summary": "invalid"},
+                {"type": "fear", "summary": "afraid"},
+            ]
+        }))
+        manager = MVLManager(db_path=self.db_path, agent=agent)
+        _, ids = asyncio.run(manager.detect_pattern("user", "text"))
+
+        self.assertEqual(len(ids), 2)
+        with manager._get_db() as conn:
+            rows = conn.execute("SELECT id, type FROM pattern_echo ORDER BY type").fetchall()
+        self.assertEqual([row[1] for row in rows], ["fear", "loop"])
+        self.assertEqual({row[0] for row in rows}, set(ids))
+
+
+if __name__ == "__main__":
+    unittest.main()
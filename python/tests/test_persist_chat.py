@@ -0,0 +1,181 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from agents import AgentContext, AgentContextType
+from python.helpers import files, history, persist_chat
+from python.helpers.log import Log
+
+
+class FakeAgent:
+    def __init__(self, number: int):
+        self.number = number
+        self.data = {"iteration": 1}
+        self.history = history.History(agent=self)
+
+
+class FakeContext:
+    def __init__(self, ctxid: str):
+        self.id = ctxid
+        self.name = "chat"
+        self.created_at = datetime(2026, 1, 1)
+        self.last_message = datetime(2026, 1, 2)
+        self.type = AgentContextType.USER
+        self.agent0 = FakeAgent(0)
+        self.streaming_agent = None
+        self.log = Log()
+        self.no = 1
+        self.task = None
+        self.last_access = time.monotonic()
+
+
+class TestPersistChat(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch.object(persist_chat, "CHATS_FOLDER", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.context = FakeContext("ctx1")
+        self.folder = persist_chat.get_chat_folder_path("ctx1")
+        self.addCleanup(persist_chat.remove_chat, "ctx1")
+
+    def isolate_contexts(self):
+        for patcher in (
+            patch.dict(AgentContext._contexts, clear=True),
+            patch.dict(AgentContext._unloaded, clear=True),
+            patch.object(AgentContext, "_loader", None),
+            patch.dict(persist_chat._index, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_log(self):
+        with open(os.path.join(self.folder, persist_chat.LOG_FILE_NAME)) as f:
+            return f.read().splitlines()
+
+    def test_only_changes_are_written(self):
+        self.isolate_contexts()
+        item = self.context.log.log("user", heading="hello", content="hi")
+        self.context.agent0.history.add_message(False, "hi")
+        writes = []
+        write = files.write_file_atomic
+
+        def counting_write(path, content, **kwargs):
+            writes.append(os.path.basename(path))
+            write(path, content, **kwargs)
+
+        with patch.object(files, "write_file_atomic", counting_write):
+            persist_chat.save_tmp_chat(self.context)
+            self.assertEqual(writes, ["history_0.json", "log.jsonl", "chat.json", "index.json"])
+
+            writes.clear()
+            persist_chat.save_tmp_chat(self.context)
+            self.assertEqual(writes, ["chat.json"])
+            self.assertEqual(len(self.read_log()), 1)
+
+            # a changed item is appended, the last line of an item wins
+            writes.clear()
+            item.update(content="edited")
+            persist_chat.save_tmp_chat(self.context)
+            self.assertEqual(writes, ["chat.json"])
+            self.assertEqual(len(self.read_log()), 2)
+
+            self.context.agent0.history.add_message(True, "reply")
+            writes.clear()
+            persist_chat.save_tmp_chat(self.context)
+            self.assertEqual(writes, ["history_0.json", "chat.json"])
+
+        with open(os.path.join(self.folder, persist_chat.CHAT_FILE_NAME)) as f:
+            data = json.load(f)
+        self.assertEqual(data["agents"][0]["history_file"], "history_0.json")
+        log = persist_chat._deserialize_log(data["log"], self.folder)
+        self.assertEqual([i.content for i in log.logs], ["edited"])
+
+        # a reset log is rewritten from scratch
+        self.context.log.reset()
+        self.context.log.log("user", content="new")
+        persist_chat.save_tmp_chat(self.context)
+        self.assertEqual([json.loads(line)["content"] for line in self.read_log()], ["new"])
+
+    def test_saves_are_debounced(self):
+        saves = []
+        with patch.object(persist_chat, "SAVE_DELAY", 0.05), patch.object(
+            persist_chat, "_write_snapshot", lambda ctxid, snapshot: saves.append(ctxid)
+        ):
+            for _ in range(5):
+                persist_chat.save_tmp_chat_later(self.context)
+            deadline = time.monotonic() + 2
+            while not saves and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.1)
+        self.assertEqual(saves, ["ctx1"])
+
+    def test_queued_saves_are_taken_on_the_calling_thread(self):
+        self.isolate_contexts()
+        self.context.log.log("user", content="first")
+        with patch.object(persist_chat, "SAVE_DELAY", 60):
+            persist_chat.save_tmp_chat_later(self.context)
+            self.context.agent0.history.add_message(False, "hi")
+            self.context.log.log("user", content="second")
+            persist_chat.save_tmp_chat_later(self.context)
+            # the writer must not read the context, whatever the agent does meanwhile
+            self.context.agent0.history = None  # type: ignore
+            self.context.log = None  # type: ignore
+            persist_chat.flush_pending_chats()
+
+        self.assertEqual(
+            [json.loads(line)["content"] for line in self.read_log()], ["first", "second"]
+        )
+        with open(os.path.join(self.folder, "history_0.json")) as f:
+            self.assertEqual(json.load(f)["counter"], 1)
+        self.assertEqual(persist_chat._pending, {})
+
+    def test_chats_load_lazily_from_index(self):
+        self.isolate_contexts()
+        self.context.log.log("user", content="hi")
+        persist_chat.save_tmp_chat(self.context)
+        other = FakeContext("ctx2")
+        other.name = "other"
+        persist_chat.save_tmp_chat(other)
+        self.addCleanup(persist_chat.remove_chat, "ctx2")
+        persist_chat._states.clear()
+
+        loaded = []
+
+        def deserialize(data, folder=None):
+            loaded.append((data["id"], folder))
+            return other
+
+        with patch.object(persist_chat, "_deserialize_context", deserialize):
+            ids = persist_chat.load_tmp_chats()
+            self.assertEqual(sorted(ids), ["ctx1", "ctx2"])
+            self.assertEqual(loaded, [])
+            entry = AgentContext._unloaded["ctx2"]
+            self.assertEqual((entry["name"], entry["type"]), ("other", "user"))
+            self.assertEqual(AgentContext._unloaded["ctx1"]["log_length"], 1)
+
+            self.assertIs(AgentContext.get("ctx2"), other)
+            self.assertEqual(loaded, [("ctx2", persist_chat.get_chat_folder_path("ctx2"))])
+
+        with open(os.path.join(self.tmp.name, persist_chat.INDEX_FILE_NAME)) as f:
+            self.assertEqual(set(json.load(f)), {"ctx1", "ctx2"})
+
+    def test_idle_chats_are_evicted(self):
+        self.isolate_contexts()
+        AgentContext._contexts["ctx1"] = self.context  # type: ignore
+        self.context.no = 7
+        self.assertEqual(persist_chat.evict_idle_chats(idle=60), [])
+        self.context.last_access -= 120
+        self.assertEqual(persist_chat.evict_idle_chats(idle=60), ["ctx1"])
+        self.assertNotIn("ctx1", AgentContext._contexts)
+        self.assertEqual(AgentContext._unloaded["ctx1"]["no"], 7)
+        self.assertTrue(os.path.isfile(os.path.join(self.folder, persist_chat.CHAT_FILE_NAME)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.stores import InMemoryByteStore
+
+from python.helpers.memory import Memory
+from python.helpers.query_embeddings import (
+    CachedQueryEmbeddings,
+    QueryEmbeddingCache,
+    is_cached,
+)
+
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.queries: list[str] = []
+        self.documents: list[str] = []
+
+    def embed_documents(self, texts):
+        self.documents += texts
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return [float(len(text)), 1.0]
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+class TestQueryEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.cache = QueryEmbeddingCache(size=2)
+        self.model = CountingEmbeddings()
+        self.embeddings = CachedQueryEmbeddings(self.model, "model", cache=self.cache)
+
+    def test_identical_queries_are_embedded_once(self):
+        self.assertEqual(self.embeddings.embed_query("alpha"), [5.0, 1.0])
+        self.assertEqual(asyncio.run(self.embeddings.aembed_query("alpha")), [5.0, 1.0])
+        # another store of the same model shares the cache
+        other = CachedQueryEmbeddings(CountingEmbeddings(), "model", cache=self.cache)
+        other.embed_query("alpha")
+        self.assertEqual(self.model.queries, ["alpha"])
+        self.assertEqual(other.embeddings.queries, [])  # type: ignore
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 1, "size": 1, "hit_rate": 0.667})
+
+        # models do not share vectors
+        different = CachedQueryEmbeddings(CountingEmbeddings(), "other", cache=self.cache)
+        self.assertFalse(is_cached(different, "alpha"))
+        self.assertTrue(is_cached(self.embeddings, "alpha"))
+        self.assertFalse(is_cached(self.model, "alpha"))
+
+    def test_least_recently_used_is_evicted(self):
+        for text in ["a", "b", "a", "c"]:
+            self.embeddings.embed_query(text)
+        self.assertTrue(self.embeddings.is_cached("a"))
+        self.assertFalse(self.embeddings.is_cached("b"))
+        self.assertTrue(self.embeddings.is_cached("c"))
+        self.assertEqual(self.model.queries, ["a", "b", "c"])
+
+    def test_documents_pass_through(self):
+        self.embeddings.embed_documents(["doc", "doc"])
+        self.assertEqual(self.model.documents, ["doc", "doc"])
+        self.assertFalse(self.embeddings.is_cached("doc"))
+        self.assertIs(self.embeddings.underlying_embeddings, self.model)
+
+
+class TestMemoryQueries(unittest.TestCase):
+    def test_queries_are_not_written_to_the_document_cache(self):
+        model = CountingEmbeddings()
+        store = InMemoryByteStore()
+        embeddings = CachedQueryEmbeddings(
+            CacheBackedEmbeddings.from_bytes_store(model, store, namespace="model"),
+            "model",
+            cache=QueryEmbeddingCache(),
+        )
+        limited = []
+
+        async def rate_limiter(model_config, input):
+            limited.append(input)
+
+        agent = SimpleNamespace(rate_limiter=rate_limiter, config=SimpleNamespace(embeddings_model=None))
+        memory = Memory(agent, SimpleNamespace(embedding_function=embeddings), "test")  # type: ignore
+
+        asyncio.run(memory.embed_texts(["a memory"]))
+        self.assertEqual(len(list(store.yield_keys())), 1)
+        vectors = asyncio.run(memory.embed_queries(["a keyword", "a keyword"]))
+        self.assertEqual(vectors, [[9.0, 1.0], [9.0, 1.0]])
+        asyncio.run(memory.embed_queries(["a keyword"]))
+        # queries stay in the query cache only, cached ones are not rate limited again
+        self.assertEqual(len(list(store.yield_keys())), 1)
+        self.assertEqual(model.queries.count("a keyword"), 1)
+        self.assertEqual(limited.count("a keyword"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
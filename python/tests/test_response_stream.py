@@ -0,0 +1,60 @@
+import asyncio
+import json
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from agents import LoopData
+from python.extensions.response_stream._10_log_from_stream import LogFromStream
+from python.extensions.response_stream._20_live_response import LiveResponse
+from python.helpers.dirty_json import DirtyJsonStream
+from python.helpers.log import Log, LogItem
+
+
+class TestResponseStream(unittest.TestCase):
+    def stream(self, response: str, size: int):
+        log = Log()
+        agent = SimpleNamespace(agent_name="A0", context=SimpleNamespace(log=log))
+        loop_data = LoopData()
+        extensions = [LogFromStream(agent), LiveResponse(agent)]  # type: ignore
+        parser = DirtyJsonStream()
+
+        async def run():
+            for end in range(size, len(response) + size, size):
+                text = response[:end]
+                parser.push(text[parser.length :])
+                for extension in extensions:
+                    await extension.execute(
+                        loop_data=loop_data,
+                        text=text,
+                        parsed=parser.root,
+                        completed=parser.completed,
+                        partial=parser.partial,
+                        delta=parser.delta,
+                    )
+
+        with patch.object(LogItem, "update", autospec=True, side_effect=LogItem.update) as update:
+            asyncio.run(run())
+        return log, update.call_count
+
+    def test_logs_match_the_response_with_few_updates(self):
+        value = {
+            "thoughts": ["first thought", "second thought"],
+            "headline": "Answering",
+            "tool_name": "response",
+            "tool_args": {"text": "word " * 200},
+        }
+        response = json.dumps(value)
+        log, updates = self.stream(response, 3)
+
+        agent_item, response_item = [item.output() for item in log.logs]
+        self.assertEqual(agent_item["content"], response)
+        self.assertEqual(dict(agent_item["kvps"]), value)
+        self.assertTrue(agent_item["heading"].endswith("A0: Answering"))
+        self.assertEqual(response_item["content"], value["tool_args"]["text"])
+        # streamed chunks are appended, updates only follow completed values and headings
+        self.assertLess(updates, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
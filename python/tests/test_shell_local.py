@@ -0,0 +1,76 @@
+import asyncio
+import sys
+import time
+import unittest
+
+from python.helpers.shell_local import LocalInteractiveSession, OutputBuffer
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def test_keeps_head_and_tail(self):
+        buffer = OutputBuffer(head_size=5, tail_size=10)
+        for i in range(10):
+            buffer.append(f"{i:04d}")
+        self.assertEqual(buffer.text()[:5], "00000")
+        self.assertTrue(buffer.text().endswith("\n0700080009"))
+        self.assertIn("[... 25 characters of output dropped ...]", buffer.text())
+
+        buffer.clear()
+        buffer.append("short")
+        self.assertEqual(buffer.text(), "short")
+
+
+@unittest.skipIf(sys.platform.startswith("win"), "bash session")
+class TestLocalInteractiveSession(unittest.TestCase):
+    async def collect(self, session: LocalInteractiveSession, until: str):
+        output = ""
+        reads = 0
+        while until not in output:
+            output, partial = await session.read_output(timeout=5)
+            reads += 1
+            if partial is None:
+                break
+        return output, reads
+
+    def test_reads_large_output_and_stderr(self):
+        async def run():
+            session = LocalInteractiveSession()
+            await session.connect()
+            try:
+                start = time.perf_counter()
+                await session.send_command("seq 1 50000; echo done")
+                output, reads = await self.collect(session, "done")
+                elapsed = time.perf_counter() - start
+
+                await session.send_command("echo oops >&2")
+                errors, _ = await self.collect(session, "oops")
+                return output, reads, elapsed, errors
+            finally:
+                await session.close()
+
+        output, reads, elapsed, errors = asyncio.run(run())
+        lines = output.splitlines()
+        self.assertEqual((lines[0], lines[-2], lines[-1]), ("1", "50000", "done"))
+        # one read per line used to add 0.1s per line
+        self.assertLess(elapsed, 2)
+        self.assertLess(reads, 20)
+        self.assertEqual(errors, "oops\n")
+
+    def test_read_times_out_without_output(self):
+        async def run():
+            session = LocalInteractiveSession()
+            await session.connect()
+            try:
+                start = time.perf_counter()
+                result = await session.read_output(timeout=0.2)
+                return result, time.perf_counter() - start
+            finally:
+                await session.close()
+
+        (full, partial), elapsed = asyncio.run(run())
+        self.assertEqual((full, partial), ("", None))
+        self.assertGreaterEqual(elapsed, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from python.helpers import tool_registry
+from python.helpers.tool_registry import ToolRegistry
+
+TOOL_SOURCE = """
+from python.helpers.tool import Tool, Response
+
+class Probe(Tool):
+    version = {version}
+
+    async def execute(self, **kwargs):
+        return Response(message="", break_loop=False)
+"""
+
+
+class TestToolRegistry(unittest.TestCase):
+    def test_lookup_order_and_caching(self):
+        registry = ToolRegistry()
+        default = registry.get("response")
+        self.assertIsNotNone(default)
+        self.assertEqual(default.__name__, "ResponseTool")  # type: ignore
+        self.assertIs(registry.get("Response"), default)
+        self.assertIsNot(registry.get("response", "_example"), default)
+        self.assertIsNone(registry.get("no_such_tool"))
+
+    def test_hot_reload(self):
+        with tempfile.TemporaryDirectory() as folder, patch.object(
+            tool_registry, "SHARED_TOOLS_FOLDERS", [folder]
+        ):
+            registry = ToolRegistry(hot_reload=True)
+            self.assertIsNone(registry.get("probe"))
+
+            path = os.path.join(folder, "probe.py")
+            with open(path, "w") as f:
+                f.write(TOOL_SOURCE.format(version=1))
+            os.utime(folder, (time.time() + 1, time.time() + 1))
+            self.assertEqual(registry.get("probe").version, 1)  # type: ignore
+
+            with open(path, "w") as f:
+                f.write(TOOL_SOURCE.format(version=2))
+            os.utime(path, (time.time() + 2, time.time() + 2))
+            self.assertEqual(registry.get("probe").version, 2)  # type: ignore
+            self.assertIn("Loaded 1 tools", registry.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
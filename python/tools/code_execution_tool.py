@@ -247,8 +247,11 @@ class CodeExecution(Tool):
             self.log.update(content=prefix)
 
         while True:
-            await asyncio.sleep(sleep_time)
-            full_output, partial_output = await self.state.shells[session].read_output(
+            shell = self.state.shells[session]
+            if isinstance(shell, SSHInteractiveSession):
+                # ssh reads return right away, local reads wait for new output
+                await asyncio.sleep(sleep_time)
+            full_output, partial_output = await shell.read_output(
                 timeout=1, reset_full_output=reset_full_output
             )
             reset_full_output = False  # only reset once
@@ -440,6 +440,8 @@ def init_a0():
     init_chats.result_sync()
 
     initialize.initialize_mcp()
+    # load tool classes once, reports load times
+    initialize.initialize_tools()
     # start job loop
     initialize.initialize_job_loop()
     # preload
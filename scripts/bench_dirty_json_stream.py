@@ -0,0 +1,77 @@
+"""
+Benchmark of parsing a streamed agent response, re-parsing the accumulated
+text on every chunk (DirtyJson.parse_string) vs feeding chunks to
+DirtyJsonStream.
+
+The full re-parse is quadratic, so it is timed on a sample of prefixes and
+extrapolated to the whole stream.
+
+Usage: PYTHONPATH=. python scripts/bench_dirty_json_stream.py [tokens] [samples]
+"""
+
+import json
+import sys
+import time
+
+from python.helpers.dirty_json import DirtyJson, DirtyJsonStream
+
+CHARS_PER_TOKEN = 4
+
+
+def build_response(tokens: int) -> str:
+    words = "the quick brown fox jumps over the lazy dog, \"quoted\"\n".split(" ")
+    text = " ".join(words[i % len(words)] for i in range(tokens))
+    return json.dumps(
+        {
+            "thoughts": ["Writing the final answer", "It is long"],
+            "headline": "Responding",
+            "tool_name": "response",
+            "tool_args": {"text": text},
+        },
+        indent=4,
+    )
+
+
+def run(tokens: int, samples: int):
+    response = build_response(tokens)
+    chunks = [
+        response[i : i + CHARS_PER_TOKEN] for i in range(0, len(response), CHARS_PER_TOKEN)
+    ]
+    print(f"{len(response)} chars in {len(chunks)} chunks")
+
+    parser = DirtyJsonStream()
+    worst = 0.0
+    start = time.perf_counter()
+    for chunk in chunks:
+        chunk_start = time.perf_counter()
+        parser.push(chunk)
+        worst = max(worst, time.perf_counter() - chunk_start)
+    stream_total = time.perf_counter() - start
+    assert parser.result == json.loads(response)
+
+    step = max(1, len(chunks) // samples)
+    sampled = 0.0
+    worst_full = 0.0
+    for i in range(0, len(chunks), step):
+        prefix = response[: (i + 1) * CHARS_PER_TOKEN]
+        chunk_start = time.perf_counter()
+        DirtyJson.parse_string(prefix)
+        elapsed = time.perf_counter() - chunk_start
+        sampled += elapsed
+        worst_full = max(worst_full, elapsed)
+    full_total = sampled * step
+
+    print(
+        f"re-parse: ~{full_total:8.2f}s total (extrapolated), "
+        f"{worst_full * 1000:8.2f}ms worst chunk"
+    )
+    print(
+        f"stream:   {stream_total:9.3f}s total, "
+        f"{worst * 1000:8.3f}ms worst chunk, {stream_total / len(chunks) * 1e6:.1f}us per chunk"
+    )
+
+
+if __name__ == "__main__":
+    tokens = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    run(tokens, samples)
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of History token accounting and compression on a long chat.
+
+Utility model calls are replaced by an instant fake, so the timings show only
+the bookkeeping cost of the message loop.
+
+Usage: PYTHONPATH=. python scripts/bench_history_compress.py [messages] [per_topic]
+"""
+
+import asyncio
+import sys
+import time
+from unittest.mock import patch
+
+from python.helpers import history, settings
+
+CTX = {"chat_model_ctx_length": 100000, "chat_model_ctx_history": 0.7}
+CHECKS = 1000
+
+
+class FakeAgent:
+    async def call_utility_model(self, system: str, message: str):
+        return "summary of the conversation so far " * 2
+
+    def read_prompt(self, file: str, **kwargs):
+        return file
+
+    def parse_prompt(self, file: str, **kwargs):
+        return kwargs.get("summary", "")
+
+
+def build(messages: int, per_topic: int) -> history.History:
+    hist = history.History(agent=FakeAgent())
+    for i in range(messages):
+        if i % per_topic == 0:
+            hist.new_topic()
+        hist.add_message(i % 2 == 1, f"message {i}: " + "lorem ipsum " * 6)
+    return hist
+
+
+def recount(hist: history.History) -> int:
+    # what every get_tokens call cost before totals were cached
+    def total(record) -> int:
+        if isinstance(record, history.Message):
+            return record.get_tokens()
+        if record.summary:
+            return record.summary_tokens
+        children = record.messages if isinstance(record, history.Topic) else record.records
+        return sum(total(child) for child in children)
+
+    return sum(total(r) for r in [*hist.bulks, *hist.topics, hist.current])
+
+
+def run(messages: int, per_topic: int):
+    hist = build(messages, per_topic)
+    print(f"{messages} messages, {per_topic} per topic, {hist.get_tokens()} tokens")
+
+    with patch.object(settings, "get_settings", return_value=CTX):
+        start = time.perf_counter()
+        for _ in range(CHECKS):
+            recount(hist)
+        full = (time.perf_counter() - start) / CHECKS * 1e6
+
+        start = time.perf_counter()
+        for _ in range(CHECKS):
+            hist.is_over_limit()
+        cached = (time.perf_counter() - start) / CHECKS * 1e6
+        print(f"token total: recount {full:9.1f}us  cached {cached:7.1f}us")
+
+        start = time.perf_counter()
+        asyncio.run(hist.compress())
+        elapsed = time.perf_counter() - start
+        print(
+            f"compress: {elapsed * 1000:.1f}ms, {hist.get_tokens()} tokens left "
+            f"in {len(hist.topics)} topics and {len(hist.bulks)} bulks"
+        )
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    per_topic = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    run(messages, per_topic)
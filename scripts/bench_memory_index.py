@@ -0,0 +1,65 @@
+"""
+Recall/latency benchmark of the memory index types on synthetic embeddings.
+
+Usage: PYTHONPATH=. python scripts/bench_memory_index.py [size] [dim]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from python.helpers.memory_index import create_index
+
+QUERIES = 200
+K = 10
+
+
+def synthetic_embeddings(size: int, dim: int, seed: int = 0) -> np.ndarray:
+    # clustered, L2-normalized vectors resemble real text embeddings better than uniform noise
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, size // 200), dim))
+    vectors = centers[rng.integers(0, len(centers), size)] + rng.normal(
+        scale=0.6, size=(size, dim)
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def run(size: int, dim: int):
+    data = synthetic_embeddings(size, dim)
+    # queries are noisy copies of stored memories, like recalling a paraphrase
+    rng = np.random.default_rng(1)
+    queries = data[rng.integers(0, size, QUERIES)] + rng.normal(
+        scale=0.05, size=(QUERIES, dim)
+    ).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    print(f"{size} vectors, dim {dim}, {QUERIES} queries, recall@{K}")
+
+    truth = None
+    for index_type in ("flat", "ivf", "hnsw"):
+        start = time.perf_counter()
+        index = create_index(dim, index_type, data)  # type: ignore
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query.reshape(1, -1), K)
+        latency = (time.perf_counter() - start) / QUERIES * 1000
+
+        _, found = index.search(queries, K)
+        if truth is None:
+            truth = found
+        recall = np.mean(
+            [len(set(f) & set(t)) / K for f, t in zip(found, truth)]
+        )
+        print(
+            f"{index_type:>5}: build {build:7.2f}s  "
+            f"query {latency:7.3f}ms  recall {recall:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    run(size, dim)
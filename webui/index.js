@@ -310,8 +310,8 @@ function adjustTextareaHeight() {
   chatInput.style.height = chatInput.scrollHeight + "px";
 }
 
-export const sendJsonData = async function (url, data) {
-  return await api.callJsonApi(url, data);
+export const sendJsonData = async function (url, data, signal) {
+  return await api.callJsonApi(url, data, signal);
   // const response = await api.fetchApi(url, {
   //     method: 'POST',
   //     headers: {
@@ -356,20 +356,34 @@ function setConnectionStatus(connected) {
 
 let lastLogVersion = 0;
 let lastLogGuid = "";
+let lastLogState = null;
 let lastSpokenNo = 0;
+let lastContextsVersion = null;
+let lastContexts = [];
+let lastTasks = [];
+let lastPollOk = true;
+let pollAbort = null;
 
-async function poll() {
+async function poll(wait = 0, signal = undefined) {
   let updated = false;
   try {
     // Get timezone from navigator
     const timezone = Intl.DateTimeFormat().resolvedOptions().timeZone;
 
     const log_from = lastLogVersion;
-    const response = await sendJsonData("/poll", {
-      log_from: log_from,
-      context: context || null,
-      timezone: timezone,
-    });
+    const response = await sendJsonData(
+      "/poll",
+      {
+        log_from: log_from,
+        context: context || null,
+        timezone: timezone,
+        // versions we already have, server skips unchanged data and can hold the request until something changes
+        log_state: lastLogState,
+        contexts_version: lastContextsVersion,
+        wait: wait,
+      },
+      signal
+    );
 
     // Check if the response is valid
     if (!response) {
@@ -384,6 +398,7 @@ async function poll() {
     if (lastLogGuid != response.log_guid) {
       chatHistory.innerHTML = "";
       lastLogVersion = 0;
+      lastLogState = null;
       lastLogGuid = response.log_guid;
       await poll();
       return;
@@ -421,12 +436,23 @@ async function poll() {
     // Update status icon state
     setConnectionStatus(true);
 
+    // chats and tasks are only sent when their version changed
+    const listsChanged = response.contexts !== undefined;
+    if (listsChanged) {
+      lastContexts = response.contexts || [];
+      lastTasks = response.tasks || [];
+      lastContextsVersion = response.contexts_version;
+    } else {
+      response.contexts = lastContexts;
+      response.tasks = lastTasks;
+    }
+
     // Update chats list and sort by created_at time (newer first)
     let chatsAD = null;
     let contexts = response.contexts || [];
     if (window.Alpine && chatsSection) {
       chatsAD = Alpine.$data(chatsSection);
-      if (chatsAD) {
+      if (chatsAD && listsChanged) {
         chatsAD.contexts = contexts.sort(
           (a, b) => (b.created_at || 0) - (a.created_at || 0)
         );
@@ -437,7 +463,7 @@ async function poll() {
     const tasksSection = document.getElementById("tasks-section");
     if (window.Alpine && tasksSection) {
       const tasksAD = Alpine.$data(tasksSection);
-      if (tasksAD) {
+      if (tasksAD && listsChanged) {
         let tasks = response.tasks || [];
 
         // Always update tasks to ensure state changes are reflected
@@ -528,9 +554,14 @@ async function poll() {
 
     lastLogVersion = response.log_version;
     lastLogGuid = response.log_guid;
+    lastLogState = response.log_state;
+    lastPollOk = true;
   } catch (error) {
+    // aborted long-polls are restarted by the polling loop
+    if (error.name === "AbortError") return updated;
     console.error("Error:", error);
     setConnectionStatus(false);
+    lastPollOk = false;
   }
 
   return updated;
@@ -765,8 +796,12 @@ export const setContext = function (id) {
   // This ensures we get fresh data from the backend
   lastLogGuid = "";
   lastLogVersion = 0;
+  lastLogState = null;
   lastSpokenNo = 0;
 
+  // release a long-poll that is waiting for changes of the previous context
+  if (pollAbort) pollAbort.abort();
+
   // Stop speech when switching chats
   speechStore.stopAudio();
 
@@ -1128,21 +1163,20 @@ chatInput.addEventListener("input", adjustTextareaHeight);
 // setInterval(poll, 250);
 
 async function startPolling() {
-  const shortInterval = 25;
-  const longInterval = 250;
-  const shortIntervalPeriod = 100;
-  let shortIntervalCount = 0;
+  const longPollWait = 10; // seconds the server may hold the request until something changes
+  const minInterval = 25; // batches rapid updates while streaming
+  const errorInterval = 250;
 
   async function _doPoll() {
-    let nextInterval = longInterval;
+    let nextInterval = minInterval;
 
     try {
-      const result = await poll();
-      if (result) shortIntervalCount = shortIntervalPeriod; // Reset the counter when the result is true
-      if (shortIntervalCount > 0) shortIntervalCount--; // Decrease the counter on each call
-      nextInterval = shortIntervalCount > 0 ? shortInterval : longInterval;
+      pollAbort = new AbortController();
+      await poll(longPollWait, pollAbort.signal);
+      if (!lastPollOk) nextInterval = errorInterval;
     } catch (error) {
       console.error("Error:", error);
+      nextInterval = errorInterval;
     }
 
     // Call the function again after the selected interval
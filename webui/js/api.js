@@ -3,9 +3,10 @@
  * Data is automatically serialized
  * @param {string} endpoint - The API endpoint to call
  * @param {any} data - The data to send to the API
+ * @param {AbortSignal} [signal] - Optional signal to abort the request
  * @returns {Promise<any>} The JSON response from the API
  */
-export async function callJsonApi(endpoint, data) {
+export async function callJsonApi(endpoint, data, signal) {
   const response = await fetchApi(endpoint, {
     method: "POST",
     headers: {
@@ -13,6 +14,7 @@ export async function callJsonApi(endpoint, data) {
     },
     credentials: "same-origin",
     body: JSON.stringify(data),
+    signal: signal,
   });
 
   if (!response.ok) {